@@ -0,0 +1,390 @@
+"""
+Lokálny analytický sklad (SQLite) nad silver výstupmi.
+
+Otázky typu "top skladby na rádiu tento týždeň vážené poslucháčmi" sa doteraz
+dali zodpovedať iba načítaním MySQL alebo celých JSON súborov. Sklad drží
+bázové tabuľky
+  play             – jedna song session (rádio, deň, identita skladby, žáner)
+  session_listener – poslucháči session (listener_rollup_session.json)
+  song, artist, song_artist – názvy pre identity skladieb a autorov
+  song_alias       – varianty zlúčené s inou identitou (aby ďalší beh zlúčil rovnako)
+a z nich materializované agregácie po dňoch a rádiách:
+  agg_song_day, agg_artist_day, agg_genre_day, agg_radio_day
+  (plays, listener_minutes, listeners_total/listener_plays pre priemer, peak)
+
+Refresh je inkrementálny: vstupy sa nahrajú do dočasných tabuliek, porovnajú
+sa s bázovými a agregácie sa prepočítajú iba pre dni, ktorých sa zmena
+dotkla. Session, ktoré vo vstupe chýbajú (napr. beh s --since), v sklade
+ostávajú. Rebríčky potom čítajú iba malé agregačné tabuľky.
+
+Použitie:
+  python analytics_store.py refresh [--songs FILE] [--sessions FILE] [--db PATH]
+  python analytics_store.py top [--level song|artist|genre|radio] [--by listener_minutes|plays|avg_listeners]
+                                [--radio R] [--overall] [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+                                [--days N] [--limit N] [--db PATH]
+"""
+import argparse
+import os
+import sqlite3
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import listener_rollups
+import merge_listeners
+import silver_pipeline
+import timestamps as ts
+from json_stream import iter_json_array
+from song_identity import SongIndex, fold_artist, identity_key, split_artists
+
+DB_PATH = str(merge_listeners.OUTPUT_DIR / "analytics.sqlite")
+SONGS_FILE = silver_pipeline.OUTPUT_FILE
+SESSIONS_FILE = str(merge_listeners.OUTPUT_DIR / listener_rollups.ROLLUP_SESSION_FILE)
+
+UNKNOWN_GENRE = "unknown"
+DEFAULT_DAYS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS play (
+    song_session_id TEXT PRIMARY KEY,
+    radio           TEXT NOT NULL,
+    day             TEXT NOT NULL,
+    played_at       INTEGER NOT NULL,
+    song_key        TEXT NOT NULL,
+    genre           TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_play_day ON play(day);
+CREATE TABLE IF NOT EXISTS session_listener (
+    song_session_id  TEXT PRIMARY KEY,
+    avg_listeners    REAL NOT NULL,
+    peak_listeners   INTEGER NOT NULL,
+    listener_minutes REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS song (
+    song_key TEXT PRIMARY KEY,
+    title    TEXT NOT NULL,
+    artists  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS song_alias (
+    alias    TEXT PRIMARY KEY,
+    song_key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artist (
+    artist_key TEXT PRIMARY KEY,
+    name       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS song_artist (
+    song_key   TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    PRIMARY KEY (song_key, artist_key)
+);
+CREATE TABLE IF NOT EXISTS agg_song_day (
+    day TEXT NOT NULL, radio TEXT NOT NULL, song_key TEXT NOT NULL,
+    plays INTEGER NOT NULL, listener_plays INTEGER NOT NULL,
+    listener_minutes REAL NOT NULL, listeners_total REAL NOT NULL, peak_listeners INTEGER,
+    PRIMARY KEY (day, radio, song_key)
+);
+CREATE TABLE IF NOT EXISTS agg_artist_day (
+    day TEXT NOT NULL, radio TEXT NOT NULL, artist_key TEXT NOT NULL,
+    plays INTEGER NOT NULL, listener_plays INTEGER NOT NULL,
+    listener_minutes REAL NOT NULL, listeners_total REAL NOT NULL, peak_listeners INTEGER,
+    PRIMARY KEY (day, radio, artist_key)
+);
+CREATE TABLE IF NOT EXISTS agg_genre_day (
+    day TEXT NOT NULL, radio TEXT NOT NULL, genre TEXT NOT NULL,
+    plays INTEGER NOT NULL, listener_plays INTEGER NOT NULL,
+    listener_minutes REAL NOT NULL, listeners_total REAL NOT NULL, peak_listeners INTEGER,
+    PRIMARY KEY (day, radio, genre)
+);
+CREATE TABLE IF NOT EXISTS agg_radio_day (
+    day TEXT NOT NULL, radio TEXT NOT NULL,
+    plays INTEGER NOT NULL, listener_plays INTEGER NOT NULL,
+    listener_minutes REAL NOT NULL, listeners_total REAL NOT NULL, peak_listeners INTEGER,
+    songs INTEGER NOT NULL,
+    PRIMARY KEY (day, radio)
+);
+"""
+
+_MEASURES = """
+    COUNT(*), COUNT(l.song_session_id),
+    COALESCE(SUM(l.listener_minutes), 0), COALESCE(SUM(l.avg_listeners), 0), MAX(l.peak_listeners)
+"""
+
+# agregácia -> SELECT nad bázovými tabuľkami obmedzený na dirty_day
+_AGGREGATES = {
+    "agg_song_day": f"""
+        SELECT p.day, p.radio, p.song_key, {_MEASURES}
+        FROM play p LEFT JOIN session_listener l USING (song_session_id)
+        WHERE p.day IN (SELECT day FROM dirty_day)
+        GROUP BY p.day, p.radio, p.song_key
+    """,
+    "agg_artist_day": f"""
+        SELECT p.day, p.radio, sa.artist_key, {_MEASURES}
+        FROM play p JOIN song_artist sa USING (song_key)
+        LEFT JOIN session_listener l USING (song_session_id)
+        WHERE p.day IN (SELECT day FROM dirty_day)
+        GROUP BY p.day, p.radio, sa.artist_key
+    """,
+    "agg_genre_day": f"""
+        SELECT p.day, p.radio, COALESCE(p.genre, '{UNKNOWN_GENRE}'), {_MEASURES}
+        FROM play p LEFT JOIN session_listener l USING (song_session_id)
+        WHERE p.day IN (SELECT day FROM dirty_day)
+        GROUP BY p.day, p.radio, COALESCE(p.genre, '{UNKNOWN_GENRE}')
+    """,
+    "agg_radio_day": f"""
+        SELECT p.day, p.radio, {_MEASURES}, COUNT(DISTINCT p.song_key)
+        FROM play p LEFT JOIN session_listener l USING (song_session_id)
+        WHERE p.day IN (SELECT day FROM dirty_day)
+        GROUP BY p.day, p.radio
+    """,
+}
+
+# úroveň rebríčka -> (agregácia, kľúč, popis, join)
+LEVELS = {
+    "song": ("agg_song_day", "a.song_key", "s.title || ' – ' || s.artists", "JOIN song s USING (song_key)"),
+    "artist": ("agg_artist_day", "a.artist_key", "ar.name", "JOIN artist ar USING (artist_key)"),
+    "genre": ("agg_genre_day", "a.genre", "a.genre", ""),
+    "radio": ("agg_radio_day", "a.radio", "a.radio", ""),
+}
+RANK_BY = ("listener_minutes", "plays", "avg_listeners")
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# --------- NAČÍTANIE VSTUPOV ---------
+
+def _stage(conn: sqlite3.Connection, table: str, like: str) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    conn.execute(f"CREATE TEMP TABLE {table} AS SELECT * FROM {like} WHERE 0")
+
+
+def stage_songs(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]], stats: Counter) -> None:
+    """Silver skladby -> temp.stage_play; nové skladby a autori rovno do dimenzií."""
+    _stage(conn, "stage_play", "play")
+    index = SongIndex(k for (k,) in conn.execute("SELECT song_key FROM song"))
+    aliases = dict(conn.execute("SELECT alias, song_key FROM song_alias"))
+    plays: Dict[str, Tuple] = {}  # song_session_id -> riadok (pri duplicitách vyhrá posledný)
+    songs: Dict[str, Tuple[str, str, str]] = {}
+    artists: Dict[str, str] = {}
+    song_artists = set()
+
+    for rec in records:
+        sid, radio, title = rec.get("song_session_id"), rec.get("radio"), rec.get("title")
+        played_at = ts.combine_epoch(str(rec.get("date") or ""), str(rec.get("time") or ""))
+        if not sid or not radio or not title or played_at is None:
+            stats["songs_skipped"] += 1
+            continue
+        names = split_artists(rec.get("artists"))
+        key = aliases.get(identity_key(title, names)) or index.resolve(title, names)
+        genre = rec.get("genre")
+        genre = genre.strip().lower() if isinstance(genre, str) and genre.strip() else None
+        plays[sid] = (sid, radio, ts.format_mysql(played_at)[:10], played_at, key, genre)
+
+        if key not in songs:
+            songs[key] = (key, title, ", ".join(names))
+        for name in names:
+            artist_key = fold_artist(name)
+            if artist_key:
+                artists.setdefault(artist_key, name.strip())
+                song_artists.add((key, artist_key))
+
+    conn.executemany("INSERT INTO temp.stage_play VALUES (?, ?, ?, ?, ?, ?)", plays.values())
+    conn.executemany("INSERT OR IGNORE INTO song VALUES (?, ?, ?)", songs.values())
+    conn.executemany("INSERT OR IGNORE INTO artist VALUES (?, ?)", artists.items())
+    conn.executemany("INSERT OR IGNORE INTO song_artist VALUES (?, ?)", song_artists)
+    conn.executemany("INSERT OR IGNORE INTO song_alias VALUES (?, ?)", index.aliases().items())
+    stats["songs_staged"] = len(plays)
+
+
+def stage_sessions(conn: sqlite3.Connection, rows: Iterable[Dict[str, Any]], stats: Counter) -> None:
+    """Session agregácie poslucháčov -> temp.stage_session_listener."""
+    _stage(conn, "stage_session_listener", "session_listener")
+    staged: Dict[str, Tuple] = {}
+    for row in rows:
+        sid = row.get("song_session_id")
+        if not sid or row.get("avg_listeners") is None:
+            continue
+        staged[sid] = (sid, row["avg_listeners"], row.get("peak_listeners") or 0, row.get("listener_minutes") or 0)
+    conn.executemany("INSERT INTO temp.stage_session_listener VALUES (?, ?, ?, ?)", staged.values())
+    stats["sessions_staged"] = len(staged)
+
+
+# --------- INKREMENTÁLNY REFRESH ---------
+
+def merge_staged(conn: sqlite3.Connection, stats: Counter) -> None:
+    """Zapíše zmenené riadky stagingu do bázových tabuliek a naplní temp.dirty_day."""
+    conn.execute("DROP TABLE IF EXISTS temp.dirty_day")
+    conn.execute("CREATE TEMP TABLE dirty_day (day TEXT PRIMARY KEY)")
+
+    # zmenené alebo nové session: dotknutý je nový aj pôvodný deň
+    conn.execute("DROP TABLE IF EXISTS temp.changed_play")
+    conn.execute("""
+        CREATE TEMP TABLE changed_play AS
+        SELECT s.*, p.day AS old_day FROM temp.stage_play s
+        LEFT JOIN play p USING (song_session_id)
+        WHERE p.song_session_id IS NULL
+           OR p.radio IS NOT s.radio OR p.day IS NOT s.day OR p.played_at IS NOT s.played_at
+           OR p.song_key IS NOT s.song_key OR p.genre IS NOT s.genre
+    """)
+    conn.execute("INSERT OR IGNORE INTO dirty_day SELECT day FROM temp.changed_play")
+    conn.execute("INSERT OR IGNORE INTO dirty_day SELECT old_day FROM temp.changed_play WHERE old_day IS NOT NULL")
+    stats["plays_changed"] = conn.execute("SELECT COUNT(*) FROM temp.changed_play").fetchone()[0]
+    conn.execute("""
+        INSERT INTO play SELECT song_session_id, radio, day, played_at, song_key, genre FROM temp.changed_play WHERE 1
+        ON CONFLICT (song_session_id) DO UPDATE SET
+            radio = excluded.radio, day = excluded.day, played_at = excluded.played_at,
+            song_key = excluded.song_key, genre = excluded.genre
+    """)
+
+    conn.execute("DROP TABLE IF EXISTS temp.changed_listener")
+    conn.execute("""
+        CREATE TEMP TABLE changed_listener AS
+        SELECT s.* FROM temp.stage_session_listener s
+        LEFT JOIN session_listener l USING (song_session_id)
+        WHERE l.song_session_id IS NULL
+           OR l.avg_listeners IS NOT s.avg_listeners OR l.peak_listeners IS NOT s.peak_listeners
+           OR l.listener_minutes IS NOT s.listener_minutes
+    """)
+    stats["listener_sessions_changed"] = conn.execute("SELECT COUNT(*) FROM temp.changed_listener").fetchone()[0]
+    conn.execute("""
+        INSERT INTO session_listener SELECT * FROM temp.changed_listener WHERE 1
+        ON CONFLICT (song_session_id) DO UPDATE SET
+            avg_listeners = excluded.avg_listeners, peak_listeners = excluded.peak_listeners,
+            listener_minutes = excluded.listener_minutes
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO dirty_day
+        SELECT p.day FROM temp.changed_listener c JOIN play p USING (song_session_id)
+    """)
+    stats["days_refreshed"] = conn.execute("SELECT COUNT(*) FROM temp.dirty_day").fetchone()[0]
+
+
+def refresh_aggregates(conn: sqlite3.Connection) -> None:
+    """Prepočíta materializované agregácie pre dni v temp.dirty_day."""
+    for table, select in _AGGREGATES.items():
+        conn.execute(f"DELETE FROM {table} WHERE day IN (SELECT day FROM temp.dirty_day)")
+        conn.execute(f"INSERT INTO {table} {select}")
+
+
+def refresh(conn: sqlite3.Connection, songs: Iterable[Dict[str, Any]],
+            sessions: Iterable[Dict[str, Any]]) -> Counter:
+    stats: Counter = Counter()
+    with conn:
+        stage_songs(conn, songs, stats)
+        stage_sessions(conn, sessions, stats)
+        merge_staged(conn, stats)
+        refresh_aggregates(conn)
+    return stats
+
+
+# --------- REBRÍČKY ---------
+
+def day_range(conn: sqlite3.Connection, days: int) -> Tuple[Optional[str], Optional[str]]:
+    """Posledných `days` dní končiac posledným dňom v sklade."""
+    (last,) = conn.execute("SELECT MAX(day) FROM agg_radio_day").fetchone()
+    if last is None:
+        return None, None
+    first_epoch = ts.parse_epoch(f"{last[8:10]}.{last[5:7]}.{last[:4]} 00:00:00") - (days - 1) * 86400
+    return ts.format_mysql(first_epoch)[:10], last
+
+
+def top(conn: sqlite3.Connection, level: str = "song", since: Optional[str] = None,
+        until: Optional[str] = None, radio: Optional[str] = None, by: str = "listener_minutes",
+        limit: int = 10, overall: bool = False) -> List[Tuple]:
+    """
+    Rebríček za dni since..until (vrátane): (rádio|'*', poradie, popis, plays,
+    listener_minutes, avg_listeners, peak). Bez `overall` sa poradie počíta
+    pre každé rádio zvlášť.
+    """
+    table, key, label, join = LEVELS[level]
+    if by not in RANK_BY:
+        raise ValueError(f"neznáme poradie '{by}'")
+    per_radio = not overall and level != "radio"
+    radio_col = "a.radio" if per_radio else "'*'"
+
+    where, params = ["1"], []
+    if since:
+        where.append("a.day >= ?")
+        params.append(since)
+    if until:
+        where.append("a.day <= ?")
+        params.append(until)
+    if radio:
+        where.append("a.radio = ?")
+        params.append(radio)
+
+    sql = f"""
+        SELECT radio, ROW_NUMBER() OVER (PARTITION BY radio ORDER BY {by} DESC, label) AS rank,
+               label, plays, listener_minutes, avg_listeners, peak_listeners
+        FROM (
+            SELECT {radio_col} AS radio, {label} AS label, SUM(a.plays) AS plays,
+                   ROUND(SUM(a.listener_minutes), 1) AS listener_minutes,
+                   ROUND(SUM(a.listeners_total) / NULLIF(SUM(a.listener_plays), 0), 1) AS avg_listeners,
+                   MAX(a.peak_listeners) AS peak_listeners
+            FROM {table} a {join}
+            WHERE {' AND '.join(where)}
+            GROUP BY {radio_col}, {key}
+        )
+        ORDER BY radio, rank
+    """
+    rows = conn.execute(sql, params).fetchall()
+    return [row for row in rows if row[1] <= limit]
+
+
+# --------- MAIN ---------
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lokálny analytický sklad nad silver výstupmi.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite súbor skladu")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ref = sub.add_parser("refresh", help="načíta silver výstupy a prepočíta dotknuté dni")
+    ref.add_argument("--songs", default=SONGS_FILE, help="obohatené silver skladby")
+    ref.add_argument("--sessions", default=SESSIONS_FILE, help="listener_rollup_session.json")
+
+    rank = sub.add_parser("top", help="rebríček z materializovaných agregácií")
+    rank.add_argument("--level", choices=list(LEVELS), default="song")
+    rank.add_argument("--by", choices=RANK_BY, default="listener_minutes")
+    rank.add_argument("--radio", default=None)
+    rank.add_argument("--overall", action="store_true", help="jeden rebríček cez všetky rádiá")
+    rank.add_argument("--since", default=None, help="YYYY-MM-DD")
+    rank.add_argument("--until", default=None, help="YYYY-MM-DD")
+    rank.add_argument("--days", type=int, default=DEFAULT_DAYS,
+                      help="bez --since: posledných N dní v sklade")
+    rank.add_argument("--limit", type=int, default=10)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    conn = connect(args.db)
+    start = time.time()
+
+    if args.command == "refresh":
+        sessions = iter_json_array(args.sessions) if os.path.exists(args.sessions) else []
+        stats = refresh(conn, iter_json_array(args.songs), sessions)
+        print(f"OK: {args.db} ({time.time() - start:.1f}s)")
+        for key, count in sorted(stats.items()):
+            print(f"  {key}: {count}")
+    else:
+        since, until = args.since, args.until
+        if since is None:
+            since, last = day_range(conn, args.days)
+            until = until or last
+        rows = top(conn, args.level, since, until, args.radio, args.by, args.limit, args.overall)
+        elapsed_ms = (time.time() - start) * 1000
+        print(f"Top {args.level} podľa {args.by}, {since} – {until} ({elapsed_ms:.1f} ms)")
+        for radio, rank, label, plays, minutes, avg, peak in rows:
+            print(f"  {radio:10} {rank:>3}. {label}  plays={plays} listener_minutes={minutes} "
+                  f"avg={avg} peak={peak}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
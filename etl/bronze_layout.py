@@ -0,0 +1,215 @@
+"""
+Rozloženie bronzovej vrstvy a jej prechádzanie.
+
+  bronze /
+    RADIO /
+      song /      DD-MM-YYYY / *.json
+      listeners / DD-MM-YYYY / *.json
+    enriched /
+      RADIO-song-enriched* / [RADIO /] [song /] DD-MM-YYYY / *.json
+
+Koreň dát sa dá nastaviť premennou prostredia RADIO_ETL_ROOT
+(predvolene priečinok nad 'etl', kde leží 'bronze'). Silver výstupy všetkých
+krokov (silver_transform_merged0/1, silver_enrich, SQL) ležia pod SILVER_ROOT:
+pri nastavenom RADIO_ETL_ROOT priamo v ňom, inak v priečinku 'etl'.
+
+Prechod sa dá obmedziť na rozsah dní (--since/--until) a na vybrané rádiá
+(--radios). Orezáva sa podľa názvov priečinkov, takže súbory mimo rozsahu
+sa vôbec neotvárajú ani nevypisujú. Výsledok orezaného behu sa cez
+merge_pruned zlúči do úplného silver výstupu (napr. opätovné spracovanie
+jedného chybného dňa), takže ďalšie kroky čítajú stále ten istý súbor.
+"""
+import argparse
+import os
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from json_stream import iter_json_array
+
+ETL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = os.environ.get("RADIO_ETL_ROOT") or os.path.dirname(ETL_DIR)
+BRONZE_DIR = os.path.join(DATA_ROOT, "bronze")
+SILVER_ROOT = os.environ.get("RADIO_ETL_ROOT") or ETL_DIR
+
+ENRICHED_DIR = "enriched"
+ENRICHED_MARK = "-song-enriched"
+
+KIND_SONG = "song"
+KIND_LISTENERS = "listeners"
+BRONZE_KINDS = (KIND_SONG, KIND_LISTENERS)
+
+
+class BronzeFile(NamedTuple):
+    radio: str   # názov priečinka rádia, napr. 'ROCK'
+    kind: str    # 'song' | 'listeners'
+    day: str     # názov dátumového priečinka 'DD-MM-YYYY'
+    path: str
+
+
+class BronzeFilter(NamedTuple):
+    since: Optional[int] = None          # YYYYMMDD vrátane
+    until: Optional[int] = None          # YYYYMMDD vrátane
+    radios: Optional[Set[str]] = None    # názvy rádií lowercase
+
+    @property
+    def active(self) -> bool:
+        return self.since is not None or self.until is not None or bool(self.radios)
+
+    def accepts_radio(self, radio_dir_name: str) -> bool:
+        return not self.radios or radio_dir_name.lower() in self.radios
+
+    def accepts_day(self, day_dir_name: str) -> bool:
+        if self.since is None and self.until is None:
+            return True
+        day = parse_day(day_dir_name)
+        if day is None:
+            return False
+        if self.since is not None and day < self.since:
+            return False
+        if self.until is not None and day > self.until:
+            return False
+        return True
+
+
+NO_FILTER = BronzeFilter()
+
+
+def parse_day(value: str) -> Optional[int]:
+    """'DD-MM-YYYY' (názov priečinka) alebo 'YYYY-MM-DD' -> YYYYMMDD, inak None."""
+    if len(value) != 10:
+        return None
+    try:
+        if value[2] == "-" and value[5] == "-":
+            day, month, year = int(value[0:2]), int(value[3:5]), int(value[6:10])
+        elif value[4] == "-" and value[7] == "-":
+            year, month, day = int(value[0:4]), int(value[5:7]), int(value[8:10])
+        else:
+            return None
+    except ValueError:
+        return None
+    if not 1 <= month <= 12 or not 1 <= day <= 31:
+        return None
+    return year * 10000 + month * 100 + day
+
+
+def add_filter_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--since", help="prvý deň (DD-MM-YYYY alebo YYYY-MM-DD), vrátane")
+    parser.add_argument("--until", help="posledný deň (DD-MM-YYYY alebo YYYY-MM-DD), vrátane")
+    parser.add_argument("--radios", help="zoznam rádií oddelený čiarkou, napr. rock,jazz")
+
+
+def filter_from_args(args: argparse.Namespace) -> BronzeFilter:
+    def day_arg(value: Optional[str], name: str) -> Optional[int]:
+        if not value:
+            return None
+        day = parse_day(value.strip())
+        if day is None:
+            raise SystemExit(f"Neplatný dátum pre {name}: {value}")
+        return day
+
+    radios = None
+    if args.radios:
+        radios = {r.strip().lower() for r in args.radios.split(",") if r.strip()}
+    return BronzeFilter(day_arg(args.since, "--since"), day_arg(args.until, "--until"), radios)
+
+
+def merge_pruned(fresh: List[Dict[str, Any]], full_path: str,
+                 key: Callable[[Dict[str, Any]], Hashable]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Záznamy orezaného behu vložené do úplného výstupu `full_path`: starý záznam
+    s rovnakým kľúčom sa nahradí na svojom mieste, nové sa pridajú na koniec.
+    Zhoda je podľa kľúča, nie podľa dňa – dátum záznamu sa pri polnoci môže
+    líšiť od priečinka, z ktorého pochádza. Záznam, ktorý opravený beh už
+    nevyrobí, ostane; taký odstráni iba úplný beh. -> (záznamy, nahradených)
+    """
+    if not os.path.exists(full_path):
+        return list(fresh), 0
+
+    pending: Dict[Hashable, List[Dict[str, Any]]] = {}
+    for rec in fresh:
+        pending.setdefault(key(rec), []).append(rec)
+
+    merged: List[Dict[str, Any]] = []
+    placed: Set[Hashable] = set()
+    replaced = 0
+    for rec in iter_json_array(full_path):
+        k = key(rec)
+        if k in placed:
+            replaced += 1  # ďalší starý duplikát už nahradeného záznamu
+        elif k in pending:
+            merged.extend(pending.pop(k))
+            placed.add(k)
+            replaced += 1
+        else:
+            merged.append(rec)
+    for recs in pending.values():
+        merged.extend(recs)
+    return merged, replaced
+
+
+def _subdirs(path: str) -> Iterator[os.DirEntry]:
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                yield entry
+
+
+def iter_bronze_files(bronze_dir: str = BRONZE_DIR,
+                      kinds: Iterable[str] = BRONZE_KINDS,
+                      prune: BronzeFilter = NO_FILTER) -> Iterator[BronzeFile]:
+    """
+    Jeden prechod stromom bronze – vráti všetky JSON súbory požadovaných druhov.
+    Priečinky, ktoré nie sú druhom z `kinds` (napr. bronze/enriched), sa preskočia,
+    rovnako ako rádiá a dni, ktoré nevyhovujú `prune`.
+    """
+    if not os.path.isdir(bronze_dir):
+        raise FileNotFoundError(f"Adresár {bronze_dir} neexistuje")
+
+    wanted = {k.lower() for k in kinds}
+
+    for radio_entry in _subdirs(bronze_dir):
+        if not prune.accepts_radio(radio_entry.name):
+            continue
+
+        for kind_entry in _subdirs(radio_entry.path):
+            kind = kind_entry.name.lower()
+            if kind not in wanted:
+                continue
+
+            for day_entry in _subdirs(kind_entry.path):
+                if not prune.accepts_day(day_entry.name):
+                    continue
+
+                with os.scandir(day_entry.path) as files:
+                    for f in files:
+                        if f.name.lower().endswith(".json") and f.is_file():
+                            yield BronzeFile(radio_entry.name, kind, day_entry.name, f.path)
+
+
+def iter_enriched_files(bronze_dir: str = BRONZE_DIR,
+                        prune: BronzeFilter = NO_FILTER) -> Iterator[BronzeFile]:
+    """
+    Obohatené snapshoty skladieb v bronze/enriched (duration_ms, genre).
+    Hĺbka pod priečinkom rádia sa líši ('song/' a 'MELODY/song/' sú voliteľné),
+    deň je vždy priečinok priamo nad súborom. `radio` je časť názvu pred
+    '-song-enriched', napr. 'funradio'.
+    """
+    enriched_dir = os.path.join(bronze_dir, ENRICHED_DIR)
+    if not os.path.isdir(enriched_dir):
+        return
+
+    for source_entry in _subdirs(enriched_dir):
+        mark = source_entry.name.lower().find(ENRICHED_MARK)
+        if mark <= 0:
+            continue
+        radio = source_entry.name[:mark]
+        if not prune.accepts_radio(radio):
+            continue
+
+        for root, dirs, files in os.walk(source_entry.path):
+            dirs.sort()
+            day = os.path.basename(root)
+            if parse_day(day) is None or not prune.accepts_day(day):
+                continue
+            for name in sorted(files):
+                if name.lower().endswith(".json"):
+                    yield BronzeFile(radio, KIND_SONG, day, os.path.join(root, name))
@@ -0,0 +1,125 @@
+"""
+Jednoprechodové spracovanie bronzovej vrstvy.
+
+Strom bronze sa prejde raz; súbory 'song' idú do normalizácie z transform_merge,
+súbory 'listeners' do normalizácie z merge_listeners. Dávky (jeden dátumový
+priečinok jedného rádia) sa spracúvajú paralelne v procesoch a na konci sa
+zapíšu oba silver výstupy naraz.
+
+Použitie:
+  python bronze_reader.py [--bronze DIR] [--songs-out FILE] [--listeners-out FILE] [--workers N]
+                          [--since DD-MM-YYYY] [--until DD-MM-YYYY] [--radios rock,jazz]
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import merge_listeners
+import transform_merge
+from bronze_layout import (BRONZE_DIR, KIND_LISTENERS, KIND_SONG, NO_FILTER, BronzeFile, BronzeFilter,
+                           add_filter_args, filter_from_args, iter_bronze_files, merge_pruned)
+
+# (druh, rádio, cesty k súborom)
+Batch = Tuple[str, str, List[str]]
+
+
+def make_batches(files: Iterable[BronzeFile]) -> List[Batch]:
+    """Zoskupí súbory po sebe z jedného priečinka (rádio + druh + deň) do jednej dávky."""
+    batches: List[Batch] = []
+    for (radio, kind, _day), group in groupby(files, key=lambda bf: (bf.radio, bf.kind, bf.day)):
+        batches.append((kind, radio, [bf.path for bf in group]))
+    return batches
+
+
+def process_batch(batch: Batch) -> Tuple[str, List[Dict[str, Any]], Counter]:
+    """Spustí normalizáciu podľa druhu súborov (beží v pracovnom procese)."""
+    kind, radio, paths = batch
+    stats: Counter = Counter()
+    records: List[Dict[str, Any]] = []
+
+    if kind == KIND_SONG:
+        radio_name = transform_merge.normalize_radio_name(radio)
+        for path in paths:
+            records.extend(transform_merge.process_json_file(path, radio_name, stats))
+    elif kind == KIND_LISTENERS:
+        for path in paths:
+            records.extend(merge_listeners.process_listeners_file(path, radio))
+
+    return kind, records, stats
+
+
+def read_bronze(bronze_dir: str = BRONZE_DIR,
+                workers: Optional[int] = None,
+                prune: BronzeFilter = NO_FILTER) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Counter]:
+    """
+    Vráti (skladby, poslucháči, štatistiky extraktorov) z jedného prechodu stromom.
+    Poradie záznamov zodpovedá poradiu prechádzania, bez ohľadu na počet procesov.
+    """
+    batches = make_batches(iter_bronze_files(bronze_dir, prune=prune))
+
+    songs: List[Dict[str, Any]] = []
+    listeners: List[Dict[str, Any]] = []
+    stats: Counter = Counter()
+
+    def collect(results) -> None:
+        for kind, records, batch_stats in results:
+            (songs if kind == KIND_SONG else listeners).extend(records)
+            stats.update(batch_stats)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        collect(map(process_batch, batches))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(process_batch, batches, chunksize=4))
+
+    return songs, listeners, stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Jeden prechod bronze -> silver skladby aj poslucháči")
+    parser.add_argument("--bronze", default=BRONZE_DIR, help="koreň bronzovej vrstvy")
+    parser.add_argument("--songs-out", help="predvolene výstup transform_merge "
+                                            "(orezaný beh bez --songs-out sa doň zlúči)")
+    parser.add_argument("--listeners-out", help="predvolene výstup merge_listeners "
+                                                "(orezaný beh bez --listeners-out sa doň zlúči)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="počet procesov (1 = bez paralelizmu, predvolene počet CPU)")
+    add_filter_args(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start = time.time()
+
+    prune = filter_from_args(args)
+    songs_out = args.songs_out or transform_merge.OUTPUT_FILE
+    listeners_out = Path(args.listeners_out) if args.listeners_out else merge_listeners.OUTPUT_FILE
+
+    songs, listeners, stats = read_bronze(args.bronze, args.workers, prune)
+    if prune.active and not args.songs_out:
+        songs, replaced = merge_pruned(songs, songs_out, transform_merge.song_record_key)
+        print(f"Skladby: {replaced} nahradených v úplnom výstupe")
+    if prune.active and not args.listeners_out:
+        listeners, replaced = merge_pruned(listeners, str(listeners_out), merge_listeners.listener_record_key)
+        print(f"Poslucháči: {replaced} nahradených v úplnom výstupe")
+
+    transform_merge.save_merged_json(songs, songs_out)
+    merge_listeners.save_listeners_json(listeners, listeners_out)
+
+    print(f"Skladby: {len(songs)} -> {songs_out}")
+    transform_merge.print_schema_stats(stats)
+    print(f"Poslucháči: {len(listeners)} -> {listeners_out}")
+    print(f"Čas behu: {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,38 @@
+import argparse
+import gzip
 import json
+import os
 import re
-from datetime import datetime
+import time
+from collections import Counter
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Iterable
+from typing import Any, Dict, List, Optional, Iterable, Iterator, Sequence, Set, TextIO, Tuple
 
-# ====== CESTY ======
-DDL_SQL_PATH = r"schema_radioDB.sql"  # Workbench DDL
-MAIN_JSON_PATH = r"silver_transform_merged1/silver_enrich_durationsec_genresOK.json"
-LISTENERS_JSON_PATH = r"silver_transform_merged1/merged_listeners.json"
-OUT_SQL_PATH = r"radioDB_full_load.sql"
+import timestamps as ts
+from bronze_layout import SILVER_ROOT
+from json_stream import iter_json_array
+from song_identity import SongIndex
+
+# ====== CESTY ====== (pod SILVER_ROOT, viď bronze_layout)
+DDL_SQL_PATH = os.path.join(SILVER_ROOT, "schema_radioDB.sql")  # Workbench DDL
+MAIN_JSON_PATH = os.path.join(SILVER_ROOT, "silver_transform_merged1", "silver_enrich_durationsec_genresOK.json")
+LISTENERS_JSON_PATH = os.path.join(SILVER_ROOT, "silver_transform_merged1", "merged_listeners.json")
+OUT_SQL_PATH = os.path.join(SILVER_ROOT, "radioDB_full_load.sql")
+DELTA_SQL_PATH = os.path.join(SILVER_ROOT, "radioDB_delta_load.sql")
+STATE_PATH = os.path.join(SILVER_ROOT, "radioDB_load_state.json")  # vodoznak pre --delta
 
 DB_SCHEMA = "radioDB"
 
+# Generovaná schéma: mesačné partície listener_measurement aj na toľko mesiacov dopredu
+PARTITION_AHEAD_MONTHS = 3
+
+# Bulk režim: riadkov v jednom INSERT a riadkov medzi COMMIT
+BULK_BATCH_ROWS = 5000
+BULK_TRANSACTION_ROWS = 100000
+
+# Delta režim: o koľko (s) staršie skladby než vodoznak sa ešte porovnajú so známymi session
+DELTA_LATE_SECONDS = 2 * 24 * 3600
+
 # Rádio -> headquarters
 HQ_MAP = {
     "vlna": "Bratislava",
@@ -28,12 +49,16 @@ def load_json(path: str) -> Any:
     return json.loads(Path(path).read_text(encoding="utf-8"))
 
 def iter_records(obj: Any) -> Iterable[Dict[str, Any]]:
-    if isinstance(obj, list):
+    if isinstance(obj, dict):
+        yield obj
+    elif isinstance(obj, Iterable) and not isinstance(obj, (str, bytes)):
         for x in obj:
             if isinstance(x, dict):
                 yield x
-    elif isinstance(obj, dict):
-        yield obj
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Záznamy silver JSON poľa postupne (celý súbor sa nenačíta do pamäte)."""
+    return iter_records(iter_json_array(path))
 
 def sql_escape(s: str) -> str:
     return s.replace("\\", "\\\\").replace("'", "''")
@@ -70,24 +95,27 @@ def as_int(x: Any) -> Optional[int]:
     except ValueError:
         return None
 
-def parse_played_at(date_str: Any, time_str: Any) -> Optional[datetime]:
+def parse_played_at(date_str: Any, time_str: Any) -> Optional[int]:
+    """Silver 'date' (DD.MM.YYYY) + 'time' (HH:MM:SS) -> epoch sekundy."""
     if not date_str or not time_str:
         return None
-    try:
-        return datetime.strptime(f"{str(date_str).strip()} {str(time_str).strip()}", "%d.%m.%Y %H:%M:%S")
-    except ValueError:
-        return None
+    return ts.combine_epoch(str(date_str).strip(), str(time_str).strip())
 
-def parse_recorded_at(s: Any) -> Optional[datetime]:
+def parse_recorded_at(s: Any) -> Optional[int]:
+    """'DD.MM.YYYY HH:MM:SS' -> epoch sekundy."""
     if s is None:
         return None
-    try:
-        return datetime.strptime(str(s).strip(), "%d.%m.%Y %H:%M:%S")
-    except ValueError:
-        return None
+    return ts.parse_epoch(str(s).strip())
 
-def dt_to_mysql(dt: datetime) -> str:
-    return dt.strftime("%Y-%m-%d %H:%M:%S")
+def dt_to_mysql(epoch: int) -> str:
+    return ts.format_mysql(epoch)
+
+def sql_value(v: Any) -> str:
+    if v is None:
+        return "NULL"
+    if isinstance(v, int):
+        return str(v)
+    return f"'{sql_escape(str(v))}'"
 
 # ====== DDL SANITIZER ======
 def sanitize_workbench_ddl(ddl: str) -> str:
@@ -102,34 +130,187 @@ def read_and_sanitize_ddl(path: str) -> str:
         raise FileNotFoundError(f"DDL file not found: {path}")
     return sanitize_workbench_ddl(p.read_text(encoding="utf-8"))
 
-# ====== GENEROVANIE SQL ======
-def main():
-    ddl_text = read_and_sanitize_ddl(DDL_SQL_PATH)
-
-    main_rows = list(iter_records(load_json(MAIN_JSON_PATH)))
-    listener_rows = list(iter_records(load_json(LISTENERS_JSON_PATH)))
-
-    sql: List[str] = []
+# ====== DDL (generovaná schéma) ======
+# Indexy, ktoré potrebujú dohľadávania v generovanom SQL (zľava prefix stĺpcov)
+REQUIRED_INDEXES: Dict[str, List[Tuple[str, ...]]] = {
+    "genre": [("genre",)],
+    "radio": [("name", "headquarters", "genre_id")],
+    "song": [("title", "artists", "release_year", "genre_id")],
+    "song_session": [("song_session_uuid",), ("played_at",)],
+    "listener_measurement": [("song_session_id", "recorded_at"), ("recorded_at",)],
+}
 
-    # 0) DDL
-    sql.extend([
-        "-- =====================",
-        "-- DDL (sanitized from Workbench)",
-        "-- =====================",
-        ddl_text.strip(),
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:`?\w+`?\.)?`?(\w+)`?", re.IGNORECASE)
+_INDEX_RE = re.compile(
+    r"(?:PRIMARY\s+KEY|UNIQUE(?:\s+(?:INDEX|KEY))?|INDEX|KEY)\s*(?:`?\w+`?\s*)?\(((?:[^()]|\([^()]*\))*)\)",
+    re.IGNORECASE,
+)
+
+def next_month(month: str) -> str:
+    year, mon = map(int, month.split("-"))
+    return f"{year + mon // 12}-{mon % 12 + 1:02d}"
+
+def month_range(first: str, last: str) -> List[str]:
+    """'YYYY-MM' od first po last vrátane."""
+    months = [first]
+    while months[-1] < last:
+        months.append(next_month(months[-1]))
+    return months
+
+def partition_months(first: int, last: int) -> List[str]:
+    """Mesiace pre partície: od mesiaca `first` po mesiac `last` + PARTITION_AHEAD_MONTHS."""
+    last_month = dt_to_mysql(last)[:7]
+    for _ in range(PARTITION_AHEAD_MONTHS):
+        last_month = next_month(last_month)
+    return month_range(dt_to_mysql(first)[:7], last_month)
+
+def session_months(main_rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    partition_months pre rozsah played_at skladieb (bez skladieb od aktuálneho
+    mesiaca). Vkladajú sa iba merania známych session, ich recorded_at leží
+    od začiatku session najviac niekoľko hodín za ním – to pokryje
+    PARTITION_AHEAD_MONTHS. Skladby sú oproti meraniam malý súbor, takže
+    rozsah partícií je známy ešte pred DML bez druhého čítania meraní.
+    """
+    first = last = None
+    for r in main_rows:
+        dt = parse_played_at(r.get("date"), r.get("time"))
+        if dt is None:
+            continue
+        if first is None or dt < first:
+            first = dt
+        if last is None or dt > last:
+            last = dt
+    if first is None:
+        first = last = int(time.time())
+    return partition_months(first, last)
+
+def month_partitions(months: Iterable[str]) -> List[str]:
+    return [
+        f"  PARTITION p{m.replace('-', '')} VALUES LESS THAN ('{next_month(m)}-01'),"
+        for m in months
+    ] + ["  PARTITION pmax VALUES LESS THAN (MAXVALUE)"]
+
+def generate_ddl(months: List[str]) -> str:
+    """
+    Schéma, do ktorej create_sql zapisuje, s indexmi pre jeho dohľadávania
+    (REQUIRED_INDEXES). listener_measurement je rozdelená podľa mesiaca
+    recorded_at: primárny aj unikátny kľúč preto obsahujú recorded_at a
+    tabuľka nemá cudzí kľúč (MySQL ich pri partíciách nepodporuje).
+    """
+    return "\n".join([
+        f"DROP SCHEMA IF EXISTS `{DB_SCHEMA}`;",
+        f"CREATE SCHEMA `{DB_SCHEMA}` DEFAULT CHARACTER SET utf8mb4;",
+        f"USE `{DB_SCHEMA}`;",
         "",
-        "-- =====================",
-        "-- DML (generated inserts)",
-        "-- =====================",
+        "CREATE TABLE genre (",
+        "  id INT NOT NULL AUTO_INCREMENT,",
+        "  genre VARCHAR(45) NOT NULL,",
+        "  PRIMARY KEY (id),",
+        "  UNIQUE KEY uq_genre (genre)",
+        ") ENGINE=InnoDB;",
         "",
-        f"USE `{DB_SCHEMA}`;",
-        "SET FOREIGN_KEY_CHECKS=0;",
-        ""
+        "CREATE TABLE radio (",
+        "  id INT NOT NULL AUTO_INCREMENT,",
+        "  name VARCHAR(45) NOT NULL,",
+        "  headquarters VARCHAR(45) NOT NULL,",
+        "  genre_id INT NULL,",
+        "  PRIMARY KEY (id),",
+        "  KEY idx_radio_lookup (name, headquarters, genre_id),",
+        "  KEY idx_radio_genre (genre_id),",
+        "  CONSTRAINT fk_radio_genre FOREIGN KEY (genre_id) REFERENCES genre (id)",
+        ") ENGINE=InnoDB;",
+        "",
+        "CREATE TABLE song (",
+        "  id INT NOT NULL AUTO_INCREMENT,",
+        "  title VARCHAR(255) NOT NULL,",
+        "  artists VARCHAR(255) NOT NULL,",
+        "  duration INT NULL,",
+        "  release_year INT NULL,",
+        "  genre_id INT NULL,",
+        "  PRIMARY KEY (id),",
+        "  KEY idx_song_lookup (title, artists, release_year, genre_id),",
+        "  KEY idx_song_genre (genre_id),",
+        "  CONSTRAINT fk_song_genre FOREIGN KEY (genre_id) REFERENCES genre (id)",
+        ") ENGINE=InnoDB;",
+        "",
+        "CREATE TABLE song_session (",
+        "  id INT NOT NULL AUTO_INCREMENT,",
+        "  song_session_uuid VARCHAR(45) NOT NULL,",
+        "  song_id INT NULL,",
+        "  radio_id INT NULL,",
+        "  played_at DATETIME NOT NULL,",
+        "  PRIMARY KEY (id),",
+        "  UNIQUE KEY uq_song_session_uuid (song_session_uuid),",
+        "  KEY idx_song_session_played (played_at),",
+        "  KEY idx_song_session_radio_played (radio_id, played_at),",
+        "  KEY idx_song_session_song (song_id),",
+        "  CONSTRAINT fk_song_session_song FOREIGN KEY (song_id) REFERENCES song (id),",
+        "  CONSTRAINT fk_song_session_radio FOREIGN KEY (radio_id) REFERENCES radio (id)",
+        ") ENGINE=InnoDB;",
+        "",
+        "CREATE TABLE listener_measurement (",
+        "  id BIGINT NOT NULL AUTO_INCREMENT,",
+        "  recorded_at DATETIME NOT NULL,",
+        "  listeners INT NOT NULL,",
+        "  song_session_id INT NOT NULL,",
+        "  PRIMARY KEY (id, recorded_at),",
+        "  UNIQUE KEY uq_listener_session_time (song_session_id, recorded_at),",
+        "  KEY idx_listener_recorded (recorded_at)",
+        ") ENGINE=InnoDB",
+        "PARTITION BY RANGE COLUMNS (recorded_at) (",
+        *month_partitions(months),
+        ");",
     ])
 
+def extend_partitions(until: str, months: List[str]) -> List[str]:
+    """Rozdelí pmax na mesačné partície za `until` (delta beh s novšími dátami)."""
+    return [
+        "ALTER TABLE listener_measurement REORGANIZE PARTITION pmax INTO (",
+        *month_partitions(m for m in months if m > until),
+        ");",
+        "",
+    ]
+
+def check_ddl(ddl: str) -> List[str]:
+    """Chýbajúce indexy z REQUIRED_INDEXES a partície v cudzej (Workbench) DDL."""
+    blocks: Dict[str, str] = {}
+    matches = list(_CREATE_TABLE_RE.finditer(ddl))
+    for m, nxt in zip(matches, matches[1:] + [None]):
+        blocks[m.group(1).lower()] = ddl[m.end():nxt.start() if nxt else len(ddl)]
+
+    problems = []
+    for table, required in REQUIRED_INDEXES.items():
+        body = blocks.get(table)
+        if body is None:
+            problems.append(f"chýba tabuľka {table}")
+            continue
+        indexes = [
+            tuple(re.sub(r"\(\d+\)|`|\s+(?:ASC|DESC)\b", "", c, flags=re.IGNORECASE).strip().lower()
+                  for c in m.group(1).split(","))
+            for m in _INDEX_RE.finditer(body)
+        ]
+        for columns in required:
+            if not any(idx[:len(columns)] == columns for idx in indexes):
+                problems.append(f"{table}: chýba index ({', '.join(columns)})")
+    if "listener_measurement" in blocks and not re.search(r"PARTITION\s+BY", blocks["listener_measurement"], re.IGNORECASE):
+        problems.append("listener_measurement nie je rozdelená podľa recorded_at (časové dotazy prejdú celú tabuľku)")
+    return problems
+
+# ====== GENEROVANIE SQL (riadok po riadku) ======
+def row_by_row_dml(main_rows: Iterable[Dict[str, Any]], listener_rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Pôvodný režim: pre každý záznam INSERT ... WHERE NOT EXISTS a dohľadanie id cez @premenné.
+    Riadky SQL sa vracajú priebežne; `sql` drží iba príkazy aktuálneho záznamu.
+    """
+    sql: List[str] = []
+
     seen_genres = set()
     seen_radios = set()
-    seen_songs = set()
+    # identita skladby -> prvý zápis (title, artists, release_year, genre), ktorý sa vložil do DB;
+    # varianty tej istej skladby ('feat.', '(Radio Edit)', iné poradie autorov) sa naň odkážu
+    seen_songs: Dict[str, tuple] = {}
+    song_index = SongIndex()
     seen_sessions = set()
 
     def emit_genre(genre: str):
@@ -194,9 +375,10 @@ def main():
 
         emit_genre(g)
 
-        key = (t.lower(), a.lower(), str(release_year or ""), g.lower())
+        key = song_index.resolve(t, a)
         if key in seen_songs:
             # Aj keď sme song už riešili predtým, musíme nastaviť @song_id na existujúci row
+            t, a, release_year, g = seen_songs[key]
             te = sql_escape(t)
             ae = sql_escape(a)
             ge = sql_escape(g)
@@ -214,7 +396,7 @@ def main():
             ])
             return
 
-        seen_songs.add(key)
+        seen_songs[key] = (t, a, release_year, g)
 
         te = sql_escape(t)
         ae = sql_escape(a)
@@ -243,7 +425,7 @@ def main():
             ""
         ])
 
-    def emit_session(song_session_uuid: str, played_at: datetime):
+    def emit_session(song_session_uuid: str, played_at: int):
         su = (song_session_uuid or "").strip()
         if not su:
             return
@@ -283,9 +465,11 @@ def main():
         emit_radio(radio_name, genre)
         emit_song(title, artists, duration, release_year, genre)
         emit_session(session_uuid, played_at)
+        yield from sql
+        sql.clear()
 
     # 2) Insert listener measurements (s kontrolou existencie session a bez duplicit)
-    sql.append("-- listener measurements")
+    yield "-- listener measurements"
     for r in listener_rows:
         sess_uuid = str(r.get("song_session_id", "")).strip()
         dt = parse_recorded_at(r.get("recorded_at"))
@@ -296,7 +480,7 @@ def main():
         sess_e = sql_escape(sess_uuid)
         dt_e = sql_escape(dt_to_mysql(dt))
 
-        sql.extend([
+        yield from (
             f"SET @song_session_id := (SELECT id FROM song_session WHERE song_session_uuid='{sess_e}' LIMIT 1);",
             "SET @__ss_exists := IF(@song_session_id IS NULL, 0, 1);",
             "INSERT INTO listener_measurement(recorded_at, listeners, song_session_id)",
@@ -307,15 +491,397 @@ def main():
             f"    WHERE song_session_id=@song_session_id AND recorded_at='{dt_e}'",
             "  );",
             ""
+        )
+
+# ====== GENEROVANIE SQL (bulk) ======
+class InsertBatcher:
+    """
+    Viacriadkové INSERT pre viac tabuliek naraz: riadky sa zbierajú po tabuľkách
+    a príkaz sa vráti, keď má tabuľka batch_rows riadkov; COMMIT po ~transaction_rows.
+    """
+
+    def __init__(self, batch_rows: int = BULK_BATCH_ROWS, transaction_rows: int = BULK_TRANSACTION_ROWS):
+        self.batch_rows = batch_rows
+        self.transaction_rows = transaction_rows
+        self._pending: Dict[str, List[str]] = {}
+        self._since_commit = 0
+
+    def _statement(self, table: str) -> List[str]:
+        batch = self._pending.pop(table)
+        sql = [f"INSERT INTO {table}({', '.join(BULK_COLUMNS[table])}) VALUES\n" + ",\n".join(batch) + ";"]
+        self._since_commit += len(batch)
+        if self._since_commit >= self.transaction_rows:
+            sql.append("COMMIT;")
+            self._since_commit = 0
+        return sql
+
+    def add(self, table: str, row: Sequence[Any]) -> List[str]:
+        batch = self._pending.setdefault(table, [])
+        batch.append("(" + ", ".join(sql_value(v) for v in row) + ")")
+        if len(batch) >= self.batch_rows:
+            return self._statement(table)
+        return []
+
+    def flush(self) -> List[str]:
+        sql: List[str] = []
+        for table in [t for t in BULK_COLUMNS if t in self._pending]:
+            sql += self._statement(table)
+        if self._since_commit:
+            sql.append("COMMIT;")
+            self._since_commit = 0
+        return sql
+
+# stĺpce tabuliek v poradí vkladania
+BULK_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "genre": ("id", "genre"),
+    "radio": ("id", "name", "headquarters", "genre_id"),
+    "song": ("id", "title", "artists", "duration", "release_year", "genre_id"),
+    "song_session": ("id", "song_session_uuid", "song_id", "radio_id", "played_at"),
+    "listener_measurement": ("recorded_at", "listeners", "song_session_id"),
+}
+
+# tabuľka, stĺpce, riadky
+BulkTable = Tuple[str, Tuple[str, ...], List[tuple]]
+
+class LoadState:
+    """
+    Čo už je v DB: id dimenzií, známe session a vodoznaky played_at/recorded_at.
+    Prázdny stav = načítanie do prázdnej schémy.
+    """
+
+    def __init__(self):
+        self.genres: Dict[str, int] = {}         # genre (lower) -> id
+        self.radios: Dict[str, int] = {}         # "name|hq|genre" (lower) -> id
+        self.songs: Dict[str, int] = {}          # identita skladby -> id
+        # song_session_uuid -> [id, played_at, posledné načítané recorded_at alebo None]
+        self.sessions: Dict[str, List[Optional[int]]] = {}
+        self.last_session_id = 0
+        self.last_played_at: Optional[int] = None
+        self.last_recorded_at: Optional[int] = None
+        # posledný mesiac s vlastnou partíciou (iba pri generovanej schéme)
+        self.partition_until: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: str) -> "LoadState":
+        data = load_json(path)
+        state = cls()
+        state.genres = data["genres"]
+        state.radios = data["radios"]
+        state.songs = data["songs"]
+        state.sessions = data["sessions"]
+        state.last_session_id = data["last_session_id"]
+        state.last_played_at = data["last_played_at"]
+        state.last_recorded_at = data["last_recorded_at"]
+        state.partition_until = data.get("partition_until")
+        return state
+
+    def prune(self) -> None:
+        """Session staršie než okno oneskorenia sa už nemôžu objaviť znova – netreba ich držať."""
+        if self.last_played_at is None:
+            return
+        cutoff = self.last_played_at - DELTA_LATE_SECONDS
+        self.sessions = {u: v for u, v in self.sessions.items() if v[1] >= cutoff}
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "last_played_at": self.last_played_at,
+                    "last_recorded_at": self.last_recorded_at,
+                    "last_session_id": self.last_session_id,
+                    "partition_until": self.partition_until,
+                    "genres": self.genres,
+                    "radios": self.radios,
+                    "songs": self.songs,
+                    "sessions": self.sessions,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, path)
+
+def bulk_rows(main_rows: Iterable[Dict[str, Any]], listener_rows: Iterable[Dict[str, Any]],
+              state: Optional[LoadState] = None, stats: Optional[Counter] = None) -> Iterator[Tuple[str, tuple]]:
+    """
+    (tabuľka, riadok) na vloženie v poradí objavenia; dimenzia sa vráti skôr ako
+    riadok, ktorý na ňu odkazuje. Id genre/radio/song/song_session sa pridelia tu
+    (pokračujú za id v `state`), takže netreba dohľadávať id v DB.
+    Deduplikácia je rovnaká ako v row_by_row_dml; session a meranie sa však vždy
+    odkážu na rádio a skladbu vlastného záznamu (nie na naposledy nastavené @id).
+    Merania musia prísť zoskupené podľa session (merge_listeners.group_by_session)
+    – duplicitné (session, recorded_at) sa hľadajú iba v rámci skupiny, takže
+    pamäť nerastie s počtom meraní.
+
+    Pri neprázdnom `state` (delta) sa vynechajú skladby staršie než vodoznak
+    mínus DELTA_LATE_SECONDS, už známe session a merania, ktoré session už má
+    (recorded_at do jej vlastného vodoznaku). Vodoznak recorded_at je po session,
+    nie spoločný – oneskorené meranie jednej stanice sa nestratí preto, že iná
+    stanica je už ďalej. Session pridaná v tomto behu dostane všetky svoje merania.
+    Stav zo starších behov bez vodoznaku session použije spoločný last_recorded_at.
+    `state` sa na konci posunie na nové hodnoty.
+    """
+    if state is None:
+        state = LoadState()
+    if stats is None:
+        stats = Counter()
+
+    # nové riadky dimenzií z aktuálneho záznamu (vrátia sa pred jeho session)
+    new_dims: List[Tuple[str, tuple]] = []
+    song_index = SongIndex(state.songs)
+
+    def genre_id(genre: str) -> Optional[int]:
+        g = norm_genre(genre)
+        if not g:
+            return None
+        key = g.lower()
+        if key not in state.genres:
+            state.genres[key] = len(state.genres) + 1
+            new_dims.append(("genre", (state.genres[key], g)))
+        return state.genres[key]
+
+    def radio_id(radio_name: str, radio_genre: str) -> Optional[int]:
+        name = (radio_name or "").strip()
+        if not name:
+            return None
+        hq = HQ_MAP.get(name.lower(), DEFAULT_HEADQUARTERS)
+        g = norm_genre(radio_genre)
+        key = "|".join((name.lower(), hq.lower(), g.lower()))
+        if key not in state.radios:
+            state.radios[key] = len(state.radios) + 1
+            gid = genre_id(g)
+            new_dims.append(("radio", (state.radios[key], name, hq, gid)))
+        return state.radios[key]
+
+    def song_id(title: str, artists: str, duration: Optional[int], release_year: Optional[int],
+                song_genre: str) -> Optional[int]:
+        t = (title or "").strip()
+        a = (artists or "").strip()
+        g = norm_genre(song_genre)
+        if not t or not a or not g:
+            return None
+        key = song_index.resolve(t, a)
+        if key not in state.songs:
+            state.songs[key] = len(state.songs) + 1
+            gid = genre_id(g)
+            new_dims.append(("song", (state.songs[key], t, a, duration, release_year, gid)))
+        return state.songs[key]
+
+    played_from = None if state.last_played_at is None else state.last_played_at - DELTA_LATE_SECONDS
+    last_played_at = state.last_played_at
+    for r in main_rows:
+        played_at = parse_played_at(r.get("date"), r.get("time"))
+        if played_at is None:
+            continue
+        if played_from is not None and played_at < played_from:
+            stats["songs_before_watermark"] += 1
+            continue
+
+        genre = norm_genre(r.get("genre"))
+        rid = radio_id(str(r.get("radio", "")).strip(), genre)
+        sid = song_id(
+            str(r.get("title", "")).strip(),
+            artists_to_str(r.get("artists")),
+            as_int(r.get("duration")),
+            as_int(r.get("release_year")),
+            genre,
+        )
+        yield from new_dims
+        new_dims.clear()
+
+        session_uuid = str(r.get("song_session_id", "")).strip()
+        if not session_uuid:
+            continue
+        if session_uuid in state.sessions:
+            stats["sessions_known"] += 1
+            continue
+        state.last_session_id += 1
+        state.sessions[session_uuid] = [state.last_session_id, played_at, None]
+        yield "song_session", (state.last_session_id, session_uuid, sid, rid, dt_to_mysql(played_at))
+        if last_played_at is None or played_at > last_played_at:
+            last_played_at = played_at
+
+    group_session = None
+    group_seen: Set[int] = set()  # recorded_at aktuálnej skupiny session
+    group_since: Optional[int] = None  # vodoznak session spred tohto behu
+    last_recorded_at = state.last_recorded_at
+    for r in listener_rows:
+        dt = parse_recorded_at(r.get("recorded_at"))
+        listeners = as_int(r.get("listeners"))
+        if dt is None or listeners is None:
+            continue
+        session = state.sessions.get(str(r.get("song_session_id", "")).strip())
+        if session is None:
+            continue
+        if session[0] != group_session:
+            group_session = session[0]
+            group_seen = set()
+            if len(session) < 3:
+                session.append(state.last_recorded_at)
+            group_since = session[2]
+        if group_since is not None and dt <= group_since:
+            stats["measurements_before_watermark"] += 1
+            continue
+        if dt in group_seen:
+            continue
+        group_seen.add(dt)
+        if session[2] is None or dt > session[2]:
+            session[2] = dt
+        yield "listener_measurement", (dt_to_mysql(dt), int(listeners), session[0])
+        if last_recorded_at is None or dt > last_recorded_at:
+            last_recorded_at = dt
+
+    state.last_played_at = last_played_at
+    state.last_recorded_at = last_recorded_at
+    state.prune()
+
+def bulk_tables(main_rows: Iterable[Dict[str, Any]], listener_rows: Iterable[Dict[str, Any]],
+                state: Optional[LoadState] = None, stats: Optional[Counter] = None) -> List[BulkTable]:
+    """Riadky z bulk_rows zoskupené po tabuľkách (v poradí BULK_COLUMNS)."""
+    tables: Dict[str, List[tuple]] = {table: [] for table in BULK_COLUMNS}
+    for table, row in bulk_rows(main_rows, listener_rows, state, stats):
+        tables[table].append(row)
+    return [(table, BULK_COLUMNS[table], rows) for table, rows in tables.items()]
+
+def bulk_dml(main_rows: Iterable[Dict[str, Any]], listener_rows: Iterable[Dict[str, Any]],
+             batch_rows: int = BULK_BATCH_ROWS, state: Optional[LoadState] = None,
+             stats: Optional[Counter] = None) -> Iterator[str]:
+    """
+    Bulk/delta režim: viacriadkové INSERT bez poddotazov (id z bulk_rows).
+    Tabuľky sa prelínajú podľa toho, kedy sa naplní dávka – poradie nevadí,
+    kontrola cudzích kľúčov je počas skriptu vypnutá.
+    """
+    if stats is None:
+        stats = Counter()
+    for table in BULK_COLUMNS:
+        stats[f"new_{table}"] += 0
+    yield from ("SET UNIQUE_CHECKS=0;", "SET autocommit=0;", "")
+    batcher = InsertBatcher(batch_rows)
+    for table, row in bulk_rows(main_rows, listener_rows, state, stats):
+        stats[f"new_{table}"] += 1
+        yield from batcher.add(table, row)
+    yield from batcher.flush()
+    yield from ("", "SET autocommit=1;", "SET UNIQUE_CHECKS=1;", "")
+
+class SqlWriter:
+    """Postupný zápis riadkov SQL (oddelené '\\n'); pri ceste *.gz alebo gz=True cez gzip."""
+
+    def __init__(self, path: str, gz: bool = False):
+        self.path = path
+        self.gz = gz or path.endswith(".gz")
+        self.lines = 0
+        self._f: TextIO = None
+
+    def __enter__(self) -> "SqlWriter":
+        if self.gz:
+            self._f = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            self._f = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def write(self, line: str) -> None:
+        self._f.write(("\n" if self.lines else "") + line)
+        self.lines += 1
+
+    def write_all(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._f.close()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Vygeneruje SQL skript s DDL a naplnením radioDB.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="id sa pridelia v Pythone a dáta idú viacriadkovými INSERT v transakciách "
+                             "(pre načítanie do prázdnej schémy)")
+    parser.add_argument("--batch-rows", type=int, default=BULK_BATCH_ROWS, help="riadkov v jednom INSERT (--bulk)")
+    parser.add_argument("--delta", action="store_true",
+                        help="iba nové session a merania oproti vodoznaku v --state (bez DDL); "
+                             "bez stavového súboru plné načítanie ako --bulk. Stav sa posunie po zapísaní "
+                             "skriptu – skript treba prehrať pred ďalším behom")
+    parser.add_argument("--state", default=STATE_PATH, help="stavový súbor pre --delta")
+    parser.add_argument("--ddl", default=None, metavar="generate|SÚBOR",
+                        help=f"schéma: 'generate' (indexy + mesačné partície) alebo Workbench DDL, ktorá sa "
+                             f"skontroluje (predvolene {DDL_SQL_PATH}, ak existuje, inak generate)")
+    parser.add_argument("--output", default=None,
+                        help=f"výstupný SQL ({OUT_SQL_PATH}, pri delta behu {DELTA_SQL_PATH}); *.gz = gzip")
+    parser.add_argument("--gzip", action="store_true", help="komprimovať výstup (pridá .gz k predvolenému názvu)")
+    args = parser.parse_args(argv)
+
+    state: Optional[LoadState] = None
+    incremental = False
+    if args.delta:
+        incremental = os.path.exists(args.state)
+        state = LoadState.load(args.state) if incremental else LoadState()
+    output = args.output or (DELTA_SQL_PATH if incremental else OUT_SQL_PATH)
+    if args.gzip and not output.endswith(".gz"):
+        output += ".gz"
+
+    # vstupy sa čítajú postupne, SQL sa zapisuje hneď – pamäť nerastie s dĺžkou histórie
+    main_rows = read_records(MAIN_JSON_PATH)
+    listener_rows = read_records(LISTENERS_JSON_PATH)
+
+    # 0) DDL (delta beží nad existujúcou schémou)
+    ddl_header = ddl_text = None
+    if not incremental:
+        ddl_source = args.ddl or (DDL_SQL_PATH if os.path.exists(DDL_SQL_PATH) else "generate")
+        if ddl_source == "generate":
+            months = session_months(read_records(MAIN_JSON_PATH))
+            ddl_header, ddl_text = "-- DDL (generated: lookup indexes, monthly partitions)", generate_ddl(months)
+            if state is not None:
+                state.partition_until = months[-1]
+        else:
+            ddl_header, ddl_text = "-- DDL (sanitized from Workbench)", read_and_sanitize_ddl(ddl_source)
+            for problem in check_ddl(ddl_text):
+                print(f"⚠️ DDL {ddl_source}: {problem}")
+
+    stats: Counter = Counter()
+    with SqlWriter(output) as out:
+        if ddl_text is not None:
+            out.write_all([
+                "-- =====================",
+                ddl_header,
+                "-- =====================",
+                ddl_text.strip(),
+                "",
+            ])
+        out.write_all([
+            "-- =====================",
+            "-- DML (generated inserts)",
+            "-- =====================",
+            "",
+            f"USE `{DB_SCHEMA}`;",
+            "SET FOREIGN_KEY_CHECKS=0;",
+            ""
         ])
 
-    sql.extend([
-        "SET FOREIGN_KEY_CHECKS=1;",
-        ""
-    ])
+        # nové mesiace v delta behu dostanú vlastné partície ešte pred vložením
+        # (pmax je vtedy prázdna, REORGANIZE nepresúva riadky)
+        if incremental and state.partition_until:
+            months = session_months(read_records(MAIN_JSON_PATH))
+            if months[-1] > state.partition_until:
+                out.write_all(extend_partitions(state.partition_until, months))
+                state.partition_until = months[-1]
+
+        if args.bulk or args.delta:
+            out.write_all(bulk_dml(main_rows, listener_rows, args.batch_rows, state, stats))
+        else:
+            out.write_all(row_by_row_dml(main_rows, listener_rows))
+
+        out.write_all([
+            "SET FOREIGN_KEY_CHECKS=1;",
+            ""
+        ])
+
+    print(f"✅ OK: created {output}")
 
-    Path(OUT_SQL_PATH).write_text("\n".join(sql), encoding="utf-8")
-    print(f"✅ OK: created {OUT_SQL_PATH}")
+    if args.delta:
+        state.save(args.state)
+        marks = [dt_to_mysql(v) if v is not None else "-" for v in (state.last_played_at, state.last_recorded_at)]
+        print(f"Stav: {args.state} (played_at <= {marks[0]}, recorded_at <= {marks[1]})")
+        for key, count in sorted(stats.items()):
+            print(f"  {key}: {count}")
 
 if __name__ == "__main__":
     main()
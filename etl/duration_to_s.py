@@ -1,27 +1,50 @@
 import json
+from collections import Counter
 from pathlib import Path
+from typing import Any, Dict, Optional
 
-input_path = Path(r"silver_transform_merged0/silver_enrich.json")
-output_path = Path(r"silver_transform_merged1/silver_enrich_durationsec.json")
-output_path.parent.mkdir(parents=True, exist_ok=True)
+from bronze_layout import SILVER_ROOT
 
-with input_path.open("r", encoding="utf-8") as f:
-    data = json.load(f)
+# vstup je výstup enrich_data
+INPUT_PATH = Path(SILVER_ROOT) / "silver_enrich" / "silver_enrich.json"
+OUTPUT_PATH = Path(SILVER_ROOT) / "silver_transform_merged1" / "silver_enrich_durationsec.json"
 
-for row in data:
+# hodnoty nad touto hranicou sú v milisekundách
+MS_THRESHOLD = 10_000
+
+
+def duration_to_seconds(row: Dict[str, Any], stats: Optional[Counter] = None) -> Dict[str, Any]:
+    """Transform pre silver_pipeline: duration v ms -> sekundy (ostatné hodnoty bez zmeny)."""
     dur = row.get("duration")
     if isinstance(dur, (int, float)) and dur is not None:
         if dur == 0:
-            continue
+            return row
         # všetko nad 10 000 ber ako ms
-        if dur > 10_000:
+        if dur > MS_THRESHOLD:
             row["duration"] = round(dur / 1000)
+            if stats is not None:
+                stats["duration_ms_to_s"] += 1
+    return row
+
+
+def main():
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    with INPUT_PATH.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    for row in data:
+        duration_to_seconds(row)
+
+    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
+        json.dump(
+            data,
+            f,
+            ensure_ascii=False,
+            indent=2,
+            separators=(",", ": ")
+        )
+
 
-with output_path.open("w", encoding="utf-8") as f:
-    json.dump(
-        data,
-        f,
-        ensure_ascii=False,
-        indent=2,
-        separators=(",", ": ")
-    )
+if __name__ == "__main__":
+    main()
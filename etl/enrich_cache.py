@@ -0,0 +1,309 @@
+"""
+Perzistentná cache výsledkov obohatenia (SQLite).
+
+Rádiá opakujú stále tie isté skladby, preto sa výsledok waterfallu
+MusicBrainz -> Last.fm -> iTunes -> Spotify -> ListenBrainz ukladá podľa
+kanonickej identity skladby (song_identity: názov bez značiek verzie +
+množina autorov) a pri ďalšom výskyte (aj v ďalších behoch) sa už nevolá
+žiadne API.
+
+Negatívna cache (song_miss): pole, ktoré po prejdení všetkých zdrojov
+zostalo prázdne, sa zapíše s časom neúspechu; kým záznam neexpiruje (TTL),
+toto pole sa pre skladbu znova nehľadá. Jingle či lokálni autori tak
+nestoja pri každom výskyte päť volaní.
+
+Cache autorov (artist_meta): žáner je prevažne vlastnosťou autora, preto sa
+z každého nájdeného žánru skladby priebežne skladá rozdelenie žánrov autora.
+Nová skladba známeho autora tak dostane
+žáner bez volania API (pôvod 'artist-cache').
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from song_identity import fold_artist, identity_key, split_artists
+
+META_FIELDS = ("duration", "genre", "release_year")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS song_meta (
+    song_key     TEXT PRIMARY KEY,
+    title        TEXT NOT NULL,
+    artists      TEXT NOT NULL,
+    duration     INTEGER,
+    genre        TEXT,
+    release_year INTEGER,
+    sources      TEXT NOT NULL DEFAULT '{}',
+    updated_at   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS song_miss (
+    song_key  TEXT NOT NULL,
+    field     TEXT NOT NULL,
+    missed_at INTEGER NOT NULL,
+    PRIMARY KEY (song_key, field)
+);
+CREATE TABLE IF NOT EXISTS artist_meta (
+    artist_key  TEXT PRIMARY KEY,
+    genres      TEXT NOT NULL DEFAULT '{}',
+    tracks      INTEGER NOT NULL DEFAULT 0,
+    updated_at  INTEGER NOT NULL
+);
+"""
+
+# verzia cache (PRAGMA user_version):
+#   1 = kľúče sú kanonická identita zo song_identity
+#   2 = artist_meta dopočítaná z existujúcich skladieb
+KEY_VERSION = 1
+ARTIST_VERSION = 2
+
+ARTIST_SOURCE = "artist-cache"
+# žáner autora sa použije, ak ho má aspoň ARTIST_MIN_TRACKS skladieb
+# a tvorí aspoň ARTIST_MIN_SHARE jeho známych žánrov
+ARTIST_MIN_TRACKS = 2
+ARTIST_MIN_SHARE = 0.5
+
+
+def song_key(title: str, artists: List[str]) -> str:
+    """Kanonická identita skladby (bez ohľadu na veľkosť písmen, diakritiku, 'feat.', '(Radio Edit)' ...)."""
+    return identity_key(title, artists)
+
+
+def artist_keys(artists: List[str]) -> List[str]:
+    """Kanonické mená jednotlivých autorov ('A & B feat. C' -> ['a', 'b', 'c'])."""
+    keys = {fold_artist(a) for a in split_artists(artists)}
+    keys.discard("")
+    return sorted(keys)
+
+
+class EnrichCache:
+    """
+    Tabuľka song_key -> duration/genre/release_year + zdroj každého poľa.
+    Jedno spojenie zdieľané vláknami, prístup chránený zámkom.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0  # skladby, pri ktorých negatívna cache ušetrila všetky volania
+        self.artist_hits = 0    # žánre doplnené z cache autorov
+        self._migrate_keys()
+        self._backfill_artists()
+
+    def _migrate_keys(self) -> None:
+        """Prepočíta kľúče staršej verzie cache; záznamy, ktoré sa zlejú do jednej identity, sa spoja."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= KEY_VERSION:
+            return
+        rows = self.conn.execute(
+            "SELECT song_key, title, artists, duration, genre, release_year, sources FROM song_meta"
+        ).fetchall()
+        for old_key, title, artists, duration, genre, release_year, sources in rows:
+            artist_list = [a for a in artists.split(", ") if a]
+            new_key = song_key(title, artist_list)
+            if new_key == old_key:
+                continue
+            self.conn.execute("DELETE FROM song_meta WHERE song_key = ?", (old_key,))
+            self.conn.execute("DELETE FROM song_miss WHERE song_key = ?", (old_key,))
+            merged_sources = json.loads(sources)
+            existing = self.conn.execute(
+                "SELECT sources FROM song_meta WHERE song_key = ?", (new_key,)
+            ).fetchone()
+            if existing is not None:
+                merged_sources = {**json.loads(existing[0]), **merged_sources}
+            meta = {"duration": duration, "genre": genre, "release_year": release_year}
+            self._put(new_key, title, artist_list, meta, merged_sources)
+        self.conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        self.conn.commit()
+
+    def _backfill_artists(self) -> None:
+        """Zostaví artist_meta zo skladieb, ktoré boli v cache pred jej zavedením."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= ARTIST_VERSION:
+            return
+        rows = self.conn.execute(
+            "SELECT artists, genre, sources FROM song_meta WHERE genre IS NOT NULL"
+        ).fetchall()
+        for artists, genre, sources in rows:
+            if json.loads(sources).get("genre") != ARTIST_SOURCE:
+                self._observe_artists(artists.split(", "), genre)
+        self.conn.execute(f"PRAGMA user_version = {ARTIST_VERSION}")
+        self.conn.commit()
+
+    def keys(self) -> Iterator[str]:
+        """Všetky identity uložené v cache (na naplnenie SongIndex)."""
+        with self.lock:
+            rows = self.conn.execute("SELECT song_key FROM song_meta").fetchall()
+        return (row[0] for row in rows)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._get(key, count=True)
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Ako get(), ale bez započítania do štatistík zásahov."""
+        return self._get(key, count=False)
+
+    def _get(self, key: str, count: bool) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT duration, genre, release_year, sources FROM song_meta WHERE song_key = ?",
+                (key,),
+            ).fetchone()
+            if count:
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if row is None:
+                return None
+        return {
+            "duration": row[0],
+            "genre": row[1],
+            "release_year": row[2],
+            "sources": json.loads(row[3]),
+        }
+
+    def fresh_misses(self, key: str, ttl: float) -> Set[str]:
+        """Polia, ktoré pre skladbu žiadny zdroj nenašiel za posledných `ttl` sekúnd."""
+        if ttl <= 0:
+            return set()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT field FROM song_miss WHERE song_key = ? AND missed_at > ?",
+                (key, int(time.time() - ttl)),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def put_misses(self, key: str, fields: Iterable[str]) -> None:
+        now = int(time.time())
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO song_miss(song_key, field, missed_at) VALUES (?, ?, ?)",
+                [(key, field, now) for field in fields],
+            )
+
+    def put(self, key: str, title: str, artists: List[str],
+            meta: Dict[str, Optional[Any]], sources: Dict[str, str]) -> None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT genre FROM song_meta WHERE song_key = ?", (key,)
+            ).fetchone()
+            old_genre = row[0] if row else None
+            self._put(key, title, artists, meta, sources)
+            if old_genre is None and sources.get("genre") != ARTIST_SOURCE:
+                self._observe_artists(artists, meta.get("genre"))
+
+    def fill(self, key: str, title: str, artists: List[str],
+             meta: Dict[str, Optional[Any]], source: str) -> List[str]:
+        """
+        Doplní iba polia, ktoré v cache chýbajú (existujúce výsledky zdrojov
+        sa neprepisujú); pôvod doplnených polí bude `source`. Vráti doplnené polia.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT duration, genre, release_year, sources FROM song_meta WHERE song_key = ?",
+                (key,),
+            ).fetchone()
+            current = dict(zip(META_FIELDS, row[:3])) if row else {}
+            sources = json.loads(row[3]) if row else {}
+            filled = [f for f in META_FIELDS
+                      if current.get(f) is None and meta.get(f) is not None]
+            if not filled:
+                return []
+            merged = {f: current.get(f) if current.get(f) is not None else meta.get(f)
+                      for f in META_FIELDS}
+            sources.update({f: source for f in filled})
+            self._put(key, title, artists, merged, sources)
+            if "genre" in filled and source != ARTIST_SOURCE:
+                self._observe_artists(artists, meta.get("genre"))
+        return filled
+
+    def _observe_artists(self, artists: List[str], genre: Optional[str]) -> None:
+        """Započíta novo zistený žáner skladby všetkým jej autorom."""
+        genre = genre.strip().lower() if isinstance(genre, str) and genre.strip() else None
+        if genre is None:
+            return
+        now = int(time.time())
+        for name in artist_keys(artists):
+            row = self.conn.execute(
+                "SELECT genres FROM artist_meta WHERE artist_key = ?", (name,)
+            ).fetchone()
+            genres = json.loads(row[0]) if row else {}
+            genres[genre] = genres.get(genre, 0) + 1
+            self.conn.execute(
+                """
+                INSERT INTO artist_meta(artist_key, genres, tracks, updated_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(artist_key) DO UPDATE SET
+                    genres     = excluded.genres,
+                    tracks     = artist_meta.tracks + 1,
+                    updated_at = excluded.updated_at
+                """,
+                (name, json.dumps(genres, ensure_ascii=False), now),
+            )
+
+    def artist_genre(self, artists: List[str]) -> Optional[str]:
+        """
+        Prevládajúci žáner autorov skladby (súčet ich rozdelení), ak je dosť
+        spoľahlivý (ARTIST_MIN_TRACKS, ARTIST_MIN_SHARE); inak None.
+        """
+        names = artist_keys(artists)
+        if not names:
+            return None
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT genres FROM artist_meta WHERE artist_key IN ({', '.join('?' * len(names))})",
+                names,
+            ).fetchall()
+        totals: Dict[str, int] = {}
+        for (genres,) in rows:
+            for genre, count in json.loads(genres).items():
+                totals[genre] = totals.get(genre, 0) + count
+        if not totals:
+            return None
+        genre, count = max(totals.items(), key=lambda item: (item[1], item[0]))
+        if count < ARTIST_MIN_TRACKS or count / sum(totals.values()) < ARTIST_MIN_SHARE:
+            return None
+        return genre
+
+    def _put(self, key: str, title: str, artists: List[str],
+             meta: Dict[str, Optional[Any]], sources: Dict[str, str]) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO song_meta(song_key, title, artists, duration, genre, release_year, sources, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(song_key) DO UPDATE SET
+                duration     = COALESCE(excluded.duration, song_meta.duration),
+                genre        = COALESCE(excluded.genre, song_meta.genre),
+                release_year = COALESCE(excluded.release_year, song_meta.release_year),
+                sources      = excluded.sources,
+                updated_at   = excluded.updated_at
+            """,
+            (
+                key, title, ", ".join(artists),
+                meta.get("duration"), meta.get("genre"), meta.get("release_year"),
+                json.dumps(sources, ensure_ascii=False), int(time.time()),
+            ),
+        )
+        found = [field for field in META_FIELDS if meta.get(field) is not None]
+        if found:
+            self.conn.execute(
+                f"DELETE FROM song_miss WHERE song_key = ? AND field IN ({', '.join('?' * len(found))})",
+                (key, *found),
+            )
+
+    def commit(self) -> None:
+        with self.lock:
+            self.conn.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
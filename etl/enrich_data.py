@@ -1,40 +1,105 @@
+import argparse
 import os
 import json
+import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
 from requests.exceptions import RequestException
 
 import requests
 
+from bronze_layout import BRONZE_DIR, SILVER_ROOT
+from enrich_cache import ARTIST_SOURCE, META_FIELDS, EnrichCache, song_key
+from enrich_seed import print_seed_stats, seed_cache
+from infer_duration import OUTPUT_FILE as INFERRED_OUTPUT, load_inferred
+from transform_merge import OUTPUT_FILE as SILVER_INPUT
+from song_identity import SongIndex
+from json_stream import JsonArrayWriter
+from provider_stats import ProviderPlanner
+from rate_limit import TokenBucket
+
 # --------- API KEYS / KONŠTANTY ---------
-MUSICBRAINZ_USER_AGENT = os.environ.get("MUSICBRAINZ_USER_AGENT", "")
+MUSICBRAINZ_USER_AGENT = os.environ.get("MUSICBRAINZ_USER_AGENT", "") or "radioETL/1.0 ( https://github.com/Devis28/DE )"
 LASTFM_API_KEY         = os.environ.get("LASTFM_API_KEY", "")
 ITUNES_COUNTRY         = os.environ.get("ITUNES_COUNTRY", "sk")
 SPOTIFY_CLIENT_ID      = os.environ.get("SPOTIFY_CLIENT_ID", "")
 SPOTIFY_CLIENT_SECRET  = os.environ.get("SPOTIFY_CLIENT_SECRET", "")
 LISTENBRAINZ_API_TOKEN = os.environ.get("LISTENBRAINZ_API_TOKEN", "")
 
-# --------- CESTY K SÚBOROM ---------
-ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-SILVER_INPUT = os.path.join(
-    ROOT_DIR,
-    "silver_transform_merged0",
-    "silver_merged.json",
-)
+# --------- ADRESY ZDROJOV ---------
+# Predvolene skutočné API. ENRICH_PROVIDER_BASE presmeruje všetky zdroje na
+# lokálny stand-in server (provider_standins.py), napr. http://127.0.0.1:8765
+UPSTREAM_URLS = {
+    "musicbrainz":      "https://musicbrainz.org",
+    "lastfm":           "https://ws.audioscrobbler.com",
+    "itunes":           "https://itunes.apple.com",
+    "spotify_accounts": "https://accounts.spotify.com",
+    "spotify":          "https://api.spotify.com",
+    "listenbrainz":     "https://api.listenbrainz.org",
+}
+PROVIDER_URLS = dict(UPSTREAM_URLS)
+
+def use_provider_base(base: str) -> None:
+    """Všetky zdroje na {base}/{zdroj}/... (stand-in server); prázdna hodnota = skutočné API."""
+    for name, upstream in UPSTREAM_URLS.items():
+        PROVIDER_URLS[name] = f"{base.rstrip('/')}/{name}" if base else upstream
+
+use_provider_base(os.environ.get("ENRICH_PROVIDER_BASE", ""))
 
-ENRICH_DIR = os.path.join(ROOT_DIR, "silver_enrich")
+# --------- CESTY K SÚBOROM ---------
+# vstup je výstup transform_merge, všetko pod SILVER_ROOT (bronze_layout)
+ENRICH_DIR = os.path.join(SILVER_ROOT, "silver_enrich")
 ENRICH_OUTPUT = os.path.join(ENRICH_DIR, "silver_enrich.json")
 
-PARTIAL_PATH = os.path.join(ENRICH_DIR, "silver_enrich_partial.json")
+PARTIAL_PATH = os.path.join(ENRICH_DIR, "silver_enrich_partial.json")  # starý formát checkpointu
+JOURNAL_PATH = os.path.join(ENRICH_DIR, "silver_enrich_journal.ndjson")
 STATE_PATH   = os.path.join(ENRICH_DIR, "enrich_state.json")
-CHECKPOINT_EVERY = 1000  # uloženie stavu po každom 1000. zázname
+CHECKPOINT_EVERY = 200  # fsync žurnálu a uloženie stavu po každom 200. zázname
+
+CACHE_PATH = os.environ.get("ENRICH_CACHE_PATH", os.path.join(ENRICH_DIR, "enrich_cache.sqlite"))
+# odhady dĺžky z medzier medzi prehratiami (infer_duration.py) a ich minimálna spoľahlivosť
+INFERRED_PATH = os.environ.get("ENRICH_INFERRED_PATH", INFERRED_OUTPUT)
+INFERRED_MIN_CONFIDENCE = os.environ.get("ENRICH_INFERRED_MIN_CONFIDENCE", "medium")
+# ako dlho (dni) sa pole, ktoré nenašiel žiadny zdroj, znova nehľadá; 0 = vypnuté
+NEGATIVE_TTL_DAYS = float(os.environ.get("ENRICH_NEGATIVE_TTL_DAYS", "30"))
+NEGATIVE_TTL = NEGATIVE_TTL_DAYS * 86400
+
+# --------- PARALELIZMUS A LIMITY ---------
+# Počet skladieb obohacovaných naraz; skutočnú rýchlosť určujú limity zdrojov nižšie.
+ENRICH_WORKERS = int(os.environ.get("ENRICH_WORKERS", "8"))
+
+# požiadavky za sekundu pre každý zdroj (MusicBrainz povoľuje 1 req/s)
+PROVIDER_RATES = {
+    "musicbrainz":  float(os.environ.get("MUSICBRAINZ_RPS", "1")),
+    "lastfm":       float(os.environ.get("LASTFM_RPS", "5")),
+    "itunes":       float(os.environ.get("ITUNES_RPS", "0.33")),
+    "spotify":      float(os.environ.get("SPOTIFY_RPS", "5")),
+    "listenbrainz": float(os.environ.get("LISTENBRAINZ_RPS", "2")),
+}
+LIMITERS = {name: TokenBucket(rate) for name, rate in PROVIDER_RATES.items()}
 
 # --------- POMOCNÉ FUNKCIE ---------
 
 def ensure_output_dir() -> None:
     os.makedirs(ENRICH_DIR, exist_ok=True)
 
+# príznak prechodnej chyby (sieť, 429, 5xx) počas volania zdroja v aktuálnom vlákne;
+# neúspech spôsobený chybou sa nesmie zapísať do negatívnej cache
+_CALL_STATE = threading.local()
+
+def provider_get(provider: str, url: str, **kwargs) -> requests.Response:
+    """GET cez token-bucket daného zdroja."""
+    LIMITERS[provider].acquire()
+    try:
+        resp = requests.get(url, **kwargs)
+    except RequestException:
+        _CALL_STATE.failed = True
+        raise
+    if resp.status_code == 429 or resp.status_code >= 500:
+        _CALL_STATE.failed = True
+    return resp
+
 def normalize_query(title: str, artists: List[str]) -> Tuple[str, str]:
     title_q = title.strip()
     artist_q = ", ".join(a.strip() for a in artists if a.strip())
@@ -50,8 +115,9 @@ def mb_search_recording(title: str, artist: str) -> Optional[Dict[str, Any]]:
     }
     headers = {"User-Agent": MUSICBRAINZ_USER_AGENT}
     try:
-        resp = requests.get(
-            "https://musicbrainz.org/ws/2/recording/",
+        resp = provider_get(
+            "musicbrainz",
+            PROVIDER_URLS["musicbrainz"] + "/ws/2/recording/",
             params=params,
             headers=headers,
             timeout=10,
@@ -69,7 +135,9 @@ def enrich_from_musicbrainz(title: str, artists: List[str]) -> Dict[str, Optiona
     rec = mb_search_recording(title_q, artist_q)
     if not rec:
         return {"duration": None, "genre": None, "release_year": None}
+    return mb_recording_meta(rec)
 
+def mb_recording_meta(rec: Dict[str, Any]) -> Dict[str, Optional[Any]]:
     duration = rec.get("length")
     release_year = None
     if rec.get("releases"):
@@ -109,8 +177,9 @@ def enrich_from_lastfm(title: str, artists: List[str]) -> Dict[str, Optional[Any
         "format": "json",
     }
     try:
-        resp = requests.get(
-            "https://ws.audioscrobbler.com/2.0/",
+        resp = provider_get(
+            "lastfm",
+            PROVIDER_URLS["lastfm"] + "/2.0/",
             params=params,
             timeout=10,
         )
@@ -161,7 +230,10 @@ def enrich_from_itunes(title: str, artists: List[str]) -> Dict[str, Optional[Any
         "limit": 1,
         "country": ITUNES_COUNTRY,
     }
-    resp = requests.get("https://itunes.apple.com/search", params=params, timeout=10)
+    try:
+        resp = provider_get("itunes", PROVIDER_URLS["itunes"] + "/search", params=params, timeout=10)
+    except RequestException:
+        return {"duration": None, "genre": None, "release_year": None}
     if resp.status_code != 200:
         return {"duration": None, "genre": None, "release_year": None}
 
@@ -188,21 +260,31 @@ def enrich_from_itunes(title: str, artists: List[str]) -> Dict[str, Optional[Any
 # --------- SPOTIFY ---------
 
 _spotify_token_cache: Dict[str, Any] = {"access_token": None, "expires_at": 0.0}
+_spotify_token_lock = threading.Lock()
 
 def get_spotify_token() -> Optional[str]:
     if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
         return None
 
+    with _spotify_token_lock:
+        return _refresh_spotify_token()
+
+def _refresh_spotify_token() -> Optional[str]:
     now = time.time()
     if _spotify_token_cache["access_token"] and _spotify_token_cache["expires_at"] > now + 60:
         return _spotify_token_cache["access_token"]
 
-    resp = requests.post(
-        "https://accounts.spotify.com/api/token",
-        data={"grant_type": "client_credentials"},
-        auth=(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET),
-        timeout=10,
-    )
+    LIMITERS["spotify"].acquire()
+    try:
+        resp = requests.post(
+            PROVIDER_URLS["spotify_accounts"] + "/api/token",
+            data={"grant_type": "client_credentials"},
+            auth=(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET),
+            timeout=10,
+        )
+    except RequestException:
+        _CALL_STATE.failed = True
+        return None
     if resp.status_code != 200:
         return None
 
@@ -212,19 +294,24 @@ def get_spotify_token() -> Optional[str]:
     return _spotify_token_cache["access_token"]
 
 def spotify_search_track(title: str, artists: List[str]) -> Optional[Dict[str, Any]]:
-    token = get_spotify_token()
-    if not token:
-        return None
-
     title_q, artist_q = normalize_query(title, artists)
     q_parts = [f'track:"{title_q}"']
     if artist_q:
         q_parts.append(f'artist:"{artist_q}"')
-    query = " ".join(q_parts)
+    return spotify_search(" ".join(q_parts))
+
+def spotify_search(query: str) -> Optional[Dict[str, Any]]:
+    """Prvá skladba pre vyhľadávací dotaz Spotify (napr. 'isrc:GBAHS2300345')."""
+    token = get_spotify_token()
+    if not token:
+        return None
 
     headers = {"Authorization": f"Bearer {token}"}
     params = {"q": query, "type": "track", "limit": 1}
-    resp = requests.get("https://api.spotify.com/v1/search", headers=headers, params=params, timeout=10)
+    try:
+        resp = provider_get("spotify", PROVIDER_URLS["spotify"] + "/v1/search", headers=headers, params=params, timeout=10)
+    except RequestException:
+        return None
     if resp.status_code != 200:
         return None
 
@@ -235,7 +322,9 @@ def enrich_from_spotify(title: str, artists: List[str]) -> Dict[str, Optional[An
     track = spotify_search_track(title, artists)
     if not track:
         return {"duration": None, "genre": None, "release_year": None}
+    return spotify_track_meta(track)
 
+def spotify_track_meta(track: Dict[str, Any]) -> Dict[str, Optional[Any]]:
     duration_ms = track.get("duration_ms")
     release_year = None
     if track.get("album", {}).get("release_date"):
@@ -260,8 +349,9 @@ def enrich_from_listenbrainz(title: str, artists: List[str]) -> Dict[str, Option
     headers = {"Authorization": f"Token {LISTENBRAINZ_API_TOKEN}"}
 
     try:
-        resp = requests.get(
-            "https://api.listenbrainz.org/1/metadata/recording",
+        resp = provider_get(
+            "listenbrainz",
+            PROVIDER_URLS["listenbrainz"] + "/1/metadata/recording",
             headers=headers,
             params=params,
             timeout=10,
@@ -299,6 +389,28 @@ def enrich_from_listenbrainz(title: str, artists: List[str]) -> Dict[str, Option
 
 # --------- ENRICH LOGIKA PRE JEDEN ZÁZNAM ---------
 
+# Zdroje: (názov, funkcia, polia, ktoré vie vrátiť). Poradie je len
+# východiskové – počas behu ho preusporiada ProviderPlanner.
+PROVIDERS = [
+    ("musicbrainz", enrich_from_musicbrainz, META_FIELDS),
+    ("lastfm", enrich_from_lastfm, META_FIELDS),
+    ("itunes", enrich_from_itunes, META_FIELDS),
+    ("spotify", enrich_from_spotify, ("duration", "release_year")),
+    ("listenbrainz", enrich_from_listenbrainz, META_FIELDS),
+]
+
+def provider_enabled(name: str) -> bool:
+    """Zdroje bez kľúča by vrátili prázdny výsledok – netreba ich volať."""
+    if name == "lastfm":
+        return bool(LASTFM_API_KEY)
+    if name == "spotify":
+        return bool(SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET)
+    if name == "listenbrainz":
+        return bool(LISTENBRAINZ_API_TOKEN)
+    return True
+
+PLANNER = ProviderPlanner(PROVIDERS, provider_enabled)
+
 def merge_enrich(base: Dict[str, Optional[Any]], new: Optional[Dict[str, Optional[Any]]]) -> Dict[str, Optional[Any]]:
     if new is None:
         return base
@@ -309,83 +421,390 @@ def merge_enrich(base: Dict[str, Optional[Any]], new: Optional[Dict[str, Optiona
             result[key] = new[key]
     return result
 
-def enrich_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+def is_complete(meta: Dict[str, Optional[Any]]) -> bool:
+    return meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None
+
+def missing_fields(meta: Dict[str, Optional[Any]]) -> set:
+    return {key for key in META_FIELDS if meta.get(key) is None}
+
+# --------- ISRC ---------
+#
+# Ak rádio posiela ISRC (Expres), skladba sa najprv hľadá presne podľa neho:
+# MusicBrainz vyhľadávanie zvládne viac kódov v jednom dotaze (isrc:A OR isrc:B),
+# Spotify hľadá 'isrc:KÓD'. Až polia, ktoré tieto zdroje nevrátia, idú do
+# textového waterfallu.
+
+MB_ISRC_BATCH = int(os.environ.get("MB_ISRC_BATCH", "25"))
+SOURCE_MB_ISRC = "musicbrainz-isrc"
+SOURCE_SPOTIFY_ISRC = "spotify-isrc"
+
+ISRC_STATS: Dict[str, int] = {
+    "mb_batches": 0, "mb_codes": 0, "mb_found": 0, "spotify_lookups": 0, "spotify_found": 0,
+}
+_isrc_stats_lock = threading.Lock()
+
+def _count_isrc(**deltas: int) -> None:
+    with _isrc_stats_lock:
+        for name, delta in deltas.items():
+            ISRC_STATS[name] += delta
+
+def mb_lookup_isrc_batch(codes: List[str]) -> Dict[str, Dict[str, Optional[Any]]]:
+    """Jeden dotaz MusicBrainz pre najviac MB_ISRC_BATCH kódov; vráti ISRC -> metadáta."""
+    params = {
+        "query": " OR ".join(f"isrc:{code}" for code in codes),
+        "fmt": "json",
+        "limit": 100,
+    }
+    headers = {"User-Agent": MUSICBRAINZ_USER_AGENT}
+    try:
+        resp = provider_get(
+            "musicbrainz",
+            PROVIDER_URLS["musicbrainz"] + "/ws/2/recording/",
+            params=params,
+            headers=headers,
+            timeout=10,
+        )
+        resp.raise_for_status()
+    except RequestException:
+        return {}
+
+    wanted = set(codes)
+    found: Dict[str, Dict[str, Optional[Any]]] = {}
+    for rec in resp.json().get("recordings") or []:
+        meta = mb_recording_meta(rec)
+        for code in rec.get("isrcs") or []:
+            code = str(code).upper()
+            if code in wanted:
+                found[code] = merge_enrich(found.get(code, meta), meta)
+    _count_isrc(mb_batches=1, mb_codes=len(codes), mb_found=len(found))
+    return found
+
+def mb_lookup_isrcs(codes: List[str],
+                    pool: Optional[ThreadPoolExecutor] = None) -> Dict[str, Dict[str, Optional[Any]]]:
+    """ISRC -> metadáta z MusicBrainz; kódy sa posielajú po dávkach MB_ISRC_BATCH."""
+    if not codes or not provider_enabled("musicbrainz"):
+        return {}
+    batches = [codes[i:i + MB_ISRC_BATCH] for i in range(0, len(codes), MB_ISRC_BATCH)]
+    results = pool.map(mb_lookup_isrc_batch, batches) if pool else map(mb_lookup_isrc_batch, batches)
+    found: Dict[str, Dict[str, Optional[Any]]] = {}
+    for batch_found in results:
+        found.update(batch_found)
+    return found
+
+def spotify_lookup_isrc(isrc: str) -> Optional[Dict[str, Optional[Any]]]:
+    track = spotify_search(f"isrc:{isrc}")
+    _count_isrc(spotify_lookups=1, spotify_found=1 if track else 0)
+    return spotify_track_meta(track) if track else None
+
+def merge_from_source(meta: Dict[str, Optional[Any]], new: Optional[Dict[str, Optional[Any]]],
+                      source: str, sources: Dict[str, str]) -> Dict[str, Optional[Any]]:
+    merged = merge_enrich(meta, new)
+    for key in META_FIELDS:
+        if meta.get(key) is None and merged.get(key) is not None:
+            sources[key] = source
+    return merged
+
+def resolve_by_isrc(isrc: str, isrc_meta: Optional[Dict[str, Optional[Any]]],
+                    meta: Dict[str, Optional[Any]], sources: Dict[str, str],
+                    skip: FrozenSet[str] = frozenset()) -> Dict[str, Optional[Any]]:
+    """Doplní polia z presných ISRC výsledkov (dávkový MusicBrainz, potom Spotify)."""
+    meta = merge_from_source(meta, isrc_meta, SOURCE_MB_ISRC, sources)
+    spotify_fields = {"duration", "release_year"}
+    if (missing_fields(meta) - skip) & spotify_fields and provider_enabled("spotify"):
+        meta = merge_from_source(meta, spotify_lookup_isrc(isrc), SOURCE_SPOTIFY_ISRC, sources)
+    return meta
+
+# --------- ODHAD DĹŽKY Z PREHRATÍ ---------
+
+SOURCE_INFERRED = "inferred-gaps"
+
+# identita -> riadok z infer_duration (duration v ms, plays, mad_s, confidence); plní main()
+INFERRED_DURATIONS: Dict[str, Dict[str, Any]] = {}
+INFERRED_STATS: Dict[str, int] = {"used": 0}
+_inferred_lock = threading.Lock()
+
+def fill_inferred_duration(key: str, meta: Dict[str, Optional[Any]],
+                           sources: Dict[str, str]) -> Dict[str, Optional[Any]]:
+    """Doplní chýbajúcu dĺžku z odhadu; pôvod nesie aj spoľahlivosť (napr. 'inferred-gaps:high')."""
+    row = INFERRED_DURATIONS.get(key)
+    if row is None or meta["duration"] is not None:
+        return meta
+    with _inferred_lock:
+        INFERRED_STATS["used"] += 1
+    return merge_from_source(meta, {"duration": row["duration"]},
+                             f"{SOURCE_INFERRED}:{row['confidence']}", sources)
+
+def run_waterfall(title: str, artists: List[str],
+                  meta: Dict[str, Optional[Any]],
+                  sources: Dict[str, str],
+                  skip: FrozenSet[str] = frozenset()) -> Tuple[Dict[str, Optional[Any]], bool]:
+    """
+    Volá zdroje, kým nie sú vyplnené všetky polia (okrem `skip`); ďalší zdroj
+    vždy vyberie PLANNER podľa toho, čo ešte chýba. Do `sources` zapíše pôvod
+    polí. Druhá hodnota je False, ak niektoré volanie skončilo prechodnou chybou
+    alebo PLANNER niektorý zdroj preskočil (neúspech potom nie je definitívny).
+    """
+    tried: set = set()
+    skipped: set = set()
+    reliable = True
+    missing = missing_fields(meta) - skip
+    while missing:
+        choice = PLANNER.next_provider(missing, tried, skipped)
+        if choice is None:
+            break
+        name, provider = choice
+        tried.add(name)
+
+        started = time.monotonic()
+        _CALL_STATE.failed = False
+        result = None
+        try:
+            result = provider(title, artists)
+        except RequestException:
+            pass  # prechodná chyba (_CALL_STATE.failed)
+        finally:
+            reliable = reliable and not _CALL_STATE.failed
+        PLANNER.record(name, missing, result, time.monotonic() - started, failed=_CALL_STATE.failed)
+
+        merged = merge_enrich(meta, result)
+        for key in missing:
+            if merged[key] is not None:
+                sources[key] = name
+        meta = merged
+        missing = missing_fields(meta) - skip
+    return meta, reliable and not skipped
+
+def record_identity(record: Dict[str, Any]) -> Tuple[str, List[str]]:
     title = record.get("title") or ""
     artists = record.get("artists") or []
     if isinstance(artists, str):
         artists = [artists]
+    return title, artists
+
+def record_isrc(record: Dict[str, Any]) -> Optional[str]:
+    isrc = record.get("isrc")
+    return isrc if isinstance(isrc, str) and isrc else None
 
-    meta: Dict[str, Optional[Any]] = {
+def record_meta(record: Dict[str, Any]) -> Dict[str, Optional[Any]]:
+    return {
         "duration": record.get("duration"),
         "genre": record.get("genre"),
         "release_year": record.get("release_year"),
     }
 
-    if meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None:
+def resolve_song(title: str, artists: List[str],
+                 cache: Optional[EnrichCache] = None,
+                 meta: Optional[Dict[str, Optional[Any]]] = None,
+                 key: Optional[str] = None,
+                 isrc: Optional[str] = None,
+                 isrc_meta: Optional[Dict[str, Optional[Any]]] = None) -> Dict[str, Optional[Any]]:
+    """
+    Metadáta jednej skladby: najprv cache, potom presné vyhľadanie podľa ISRC
+    (`isrc_meta` = už nájdený dávkový výsledok MusicBrainz), potom waterfall zdrojov.
+    Chýbajúci žáner sa najprv doplní z cache autorov a dĺžka z odhadu
+    z medzier medzi prehratiami (infer_duration). Polia v platnej
+    negatívnej cache sa nehľadajú; polia, ktoré nenašiel žiadny zdroj
+    (bez prechodnej chyby), sa do nej zapíšu.
+    `key` je identita zo SongIndex (inak presná kanonická identita).
+    Bezpečné volať z viacerých vlákien naraz.
+    """
+    if meta is None:
+        meta = {"duration": None, "genre": None, "release_year": None}
+
+    if key is None:
+        key = song_key(title, artists)
+    sources: Dict[str, str] = {}
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            meta = merge_enrich(meta, cached)
+            sources.update(cached["sources"])
+            if is_complete(meta):
+                return meta
+
+    before = dict(meta)
+    skip: FrozenSet[str] = frozenset()
+    if cache is not None:
+        # žáner známeho autora netreba hľadať pre každú jeho skladbu
+        if meta["genre"] is None:
+            genre = cache.artist_genre(artists)
+            if genre is not None:
+                meta = merge_from_source(meta, {"genre": genre}, ARTIST_SOURCE, sources)
+                with cache.lock:
+                    cache.artist_hits += 1
+    meta = fill_inferred_duration(key, meta, sources)
+    if cache is not None:
+        skip = frozenset(cache.fresh_misses(key, NEGATIVE_TTL))
+        if skip and not missing_fields(meta) - skip:
+            with cache.lock:
+                cache.negative_hits += 1
+
+    if isrc and missing_fields(meta) - skip:
+        meta = resolve_by_isrc(isrc, isrc_meta, meta, sources, skip)
+    reliable = True
+    if missing_fields(meta) - skip:
+        meta, reliable = run_waterfall(title, artists, meta, sources, skip)
+
+    if cache is not None:
+        if meta != before:
+            cache.put(key, title, artists, meta, sources)
+        still_missing = missing_fields(meta) - skip
+        if reliable and still_missing and NEGATIVE_TTL > 0:
+            cache.put_misses(key, still_missing)
+
+    return meta
+
+def enrich_record(record: Dict[str, Any],
+                  cache: Optional[EnrichCache] = None) -> Tuple[Dict[str, Any], bool]:
+    meta = record_meta(record)
+    if is_complete(meta):
         return record, True
 
-    meta = merge_enrich(meta, enrich_from_musicbrainz(title, artists))
-    if meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None:
-        record.update(meta)
-        return record, True
-
-    meta = merge_enrich(meta, enrich_from_lastfm(title, artists))
-    if meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None:
-        record.update(meta)
-        return record, True
-
-    meta = merge_enrich(meta, enrich_from_itunes(title, artists))
-    if meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None:
-        record.update(meta)
-        return record, True
+    title, artists = record_identity(record)
+    meta = resolve_song(title, artists, cache, meta, isrc=record_isrc(record))
 
-    meta = merge_enrich(meta, enrich_from_spotify(title, artists))
-    if meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None:
-        record.update(meta)
+    record.update(meta)
+    return record, is_complete(meta)
+
+def resolve_distinct(records: List[Dict[str, Any]],
+                     resolved: Dict[str, Dict[str, Optional[Any]]],
+                     cache: EnrichCache,
+                     pool: ThreadPoolExecutor,
+                     index: SongIndex) -> None:
+    """
+    Paralelne obohatí skladby z `records`, ktoré ešte nie sú v `resolved` (každú iba raz).
+    Varianty tej istej skladby (iný zápis autorov, '(Radio Edit)', preklep)
+    sa cez `index` zlúčia do jednej identity ešte v hlavnom vlákne.
+    Skladby s ISRC, ktoré cache nepozná úplne, sa najprv dávkovo vyhľadajú
+    v MusicBrainz podľa ISRC.
+    """
+    songs: Dict[str, Tuple[str, List[str], Optional[str]]] = {}
+    for rec in records:
+        if is_complete(record_meta(rec)):
+            continue
+        title, artists = record_identity(rec)
+        key = index.resolve(title, artists)
+        if key in resolved:
+            continue
+        if key not in songs:
+            songs[key] = (title, artists, record_isrc(rec))
+        elif songs[key][2] is None and record_isrc(rec):
+            songs[key] = (title, artists, record_isrc(rec))
+
+    codes = []
+    for key, (_, _, isrc) in songs.items():
+        if isrc and isrc not in codes:
+            cached = cache.peek(key)
+            if cached is None or not is_complete(cached):
+                codes.append(isrc)
+    isrc_found = mb_lookup_isrcs(codes, pool)
+
+    pending = {
+        key: pool.submit(resolve_song, title, artists, cache, None, key, isrc, isrc_found.get(isrc))
+        for key, (title, artists, isrc) in songs.items()
+    }
+    for key, future in pending.items():
+        resolved[key] = future.result()
+
+def apply_resolved(record: Dict[str, Any],
+                   resolved: Dict[str, Dict[str, Optional[Any]]],
+                   index: SongIndex) -> Tuple[Dict[str, Any], bool]:
+    meta = record_meta(record)
+    if is_complete(meta):
         return record, True
-
-    meta = merge_enrich(meta, enrich_from_listenbrainz(title, artists))
-
+    title, artists = record_identity(record)
+    meta = merge_enrich(meta, resolved.get(index.resolve(title, artists)))
     record.update(meta)
-    all_found = meta["duration"] is not None and meta["genre"] is not None and meta["release_year"] is not None
-    return record, all_found
+    return record, is_complete(meta)
 
-# --------- CHECKPOINT FUNKCIE ---------
+# --------- ŽURNÁL (CHECKPOINT) ---------
+#
+# Obohatené záznamy sa pripisujú do NDJSON žurnálu (jeden záznam na riadok).
+# Po každom bloku sa žurnál fsync-ne a do STATE_PATH sa zapíše potvrdený
+# bajtový offset. Pri obnovení sa žurnál oreže na tento offset (zahodí sa
+# prípadný nedokončený koniec) a pokračuje sa od next_index.
 
-def load_checkpoint() -> Tuple[int, List[Dict[str, Any]], int]:
-    if not os.path.exists(STATE_PATH) or not os.path.exists(PARTIAL_PATH):
-        return 0, [], 0
+def load_checkpoint() -> Tuple[int, int, int]:
+    """Vráti (next_index, fully_found_count, potvrdený offset žurnálu)."""
+    if not os.path.exists(STATE_PATH):
+        return 0, 0, 0
 
     with open(STATE_PATH, "r", encoding="utf-8") as f:
         state = json.load(f)
     start_index = state.get("next_index", 0)
     fully_found_count = state.get("fully_found_count", 0)
 
+    if "journal_offset" not in state:
+        return migrate_partial_checkpoint(start_index, fully_found_count)
+
+    if not os.path.exists(JOURNAL_PATH):
+        return 0, 0, 0
+    return start_index, fully_found_count, state["journal_offset"]
+
+def migrate_partial_checkpoint(start_index: int, fully_found_count: int) -> Tuple[int, int, int]:
+    """Prevod checkpointu zo starého formátu (celý zoznam v PARTIAL_PATH) do žurnálu."""
+    if not os.path.exists(PARTIAL_PATH):
+        return 0, 0, 0
+
     with open(PARTIAL_PATH, "r", encoding="utf-8") as f:
-        enriched_records = json.load(f)
+        enriched_records = json.load(f)[:start_index]
 
-    return start_index, enriched_records, fully_found_count
+    journal = open_journal(0)
+    for rec in enriched_records:
+        append_journal(journal, rec)
+    offset = sync_journal(journal)
+    journal.close()
 
-def save_checkpoint(next_index: int,
-                    enriched_records: List[Dict[str, Any]],
-                    fully_found_count: int) -> None:
+    save_checkpoint(start_index, fully_found_count, offset)
+    os.remove(PARTIAL_PATH)
+    return start_index, fully_found_count, offset
+
+def open_journal(offset: int):
+    """Otvorí žurnál na pripisovanie; všetko za potvrdeným offsetom sa zahodí."""
+    ensure_output_dir()
+    with open(JOURNAL_PATH, "a+b") as f:
+        f.truncate(offset)
+    return open(JOURNAL_PATH, "ab")
+
+def append_journal(journal, record: Dict[str, Any]) -> None:
+    journal.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+def sync_journal(journal) -> int:
+    """Zapíše žurnál na disk a vráti offset, ktorý je bezpečné potvrdiť."""
+    journal.flush()
+    os.fsync(journal.fileno())
+    return journal.tell()
+
+def iter_journal():
+    with open(JOURNAL_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def save_checkpoint(next_index: int, fully_found_count: int, journal_offset: int) -> None:
     ensure_output_dir()
-    with open(PARTIAL_PATH, "w", encoding="utf-8") as f:
-        json.dump(enriched_records, f, ensure_ascii=False, indent=2)
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(
             {
                 "next_index": next_index,
                 "fully_found_count": fully_found_count,
+                "journal_offset": journal_offset,
             },
             f,
             ensure_ascii=False,
             indent=2,
         )
+    os.replace(tmp_path, STATE_PATH)
 
 # --------- MAIN ---------
 
-def main() -> None:
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Obohatenie silver skladieb o duration/genre/release_year.")
+    parser.add_argument("--seed-from-bronze", nargs="?", const=BRONZE_DIR, metavar="BRONZE_DIR",
+                        help="pred obohatením naplní cache z bronze/enriched snapshotov")
+    args = parser.parse_args(argv)
+
     start_time = time.time()
 
     with open(SILVER_INPUT, "r", encoding="utf-8") as f:
@@ -393,47 +812,79 @@ def main() -> None:
 
     total = len(records)
 
-    start_index, enriched_records, fully_found_count = load_checkpoint()
+    start_index, fully_found_count, journal_offset = load_checkpoint()
     if start_index > 0:
-        print(f"Pokračujem od indexu {start_index} z {total} (už spracované: {len(enriched_records)})")
-
-    enriched_records = enriched_records[:start_index]
-
-    for idx in range(start_index, total):
-        rec = records[idx]
-        enriched, all_found = enrich_record(rec)
-        enriched_records.append(enriched)
-        if all_found:
-            fully_found_count += 1
-
-        current = idx + 1
-
-        if current % 100 == 0:
+        print(f"Pokračujem od indexu {start_index} z {total} (žurnál: {journal_offset} B)")
+
+    journal = open_journal(journal_offset)
+    cache = EnrichCache(CACHE_PATH)
+    index = SongIndex(cache.keys())
+    if args.seed_from_bronze:
+        print_seed_stats(seed_cache(cache, args.seed_from_bronze, index=index))
+    INFERRED_DURATIONS.clear()
+    INFERRED_DURATIONS.update(load_inferred(INFERRED_PATH, index, INFERRED_MIN_CONFIDENCE))
+    if INFERRED_DURATIONS:
+        print(f"Odhady dĺžky ({INFERRED_MIN_CONFIDENCE}+): {len(INFERRED_DURATIONS)} skladieb ({INFERRED_PATH})")
+    resolved: Dict[str, Dict[str, Optional[Any]]] = {}
+
+    # spracovanie po blokoch veľkosti CHECKPOINT_EVERY: v rámci bloku sa
+    # odlišné skladby obohacujú paralelne, potom sa výsledky priradia záznamom
+    with ThreadPoolExecutor(max_workers=ENRICH_WORKERS) as pool:
+        for chunk_start in range(start_index, total, CHECKPOINT_EVERY):
+            chunk = records[chunk_start:chunk_start + CHECKPOINT_EVERY]
+            resolve_distinct(chunk, resolved, cache, pool, index)
+
+            for rec in chunk:
+                enriched, all_found = apply_resolved(rec, resolved, index)
+                append_journal(journal, enriched)
+                if all_found:
+                    fully_found_count += 1
+
+            current = chunk_start + len(chunk)
             elapsed = time.time() - start_time
             print(
                 f"[{current}/{total}] spracovaných záznamov, "
                 f"úplne obohatené: {fully_found_count}, "
+                f"odlišných skladieb: {len(resolved)}, "
                 f"čas behu: {elapsed:.1f}s"
             )
 
-        if current % CHECKPOINT_EVERY == 0:
-            save_checkpoint(current, enriched_records, fully_found_count)
-            print(f"Checkpoint uložený pri indexe {current}")
+            cache.commit()
+            save_checkpoint(current, fully_found_count, sync_journal(journal))
 
-    ensure_output_dir()
-    with open(ENRICH_OUTPUT, "w", encoding="utf-8") as f:
-        json.dump(enriched_records, f, ensure_ascii=False, indent=2)
+    journal.close()
+    cache.close()
+
+    # výsledný JSON sa skladá zo žurnálu postupne, bez načítania do pamäte
+    with JsonArrayWriter(ENRICH_OUTPUT) as out:
+        for rec in iter_journal():
+            out.write(rec)
 
     if os.path.exists(STATE_PATH):
         os.remove(STATE_PATH)
-    if os.path.exists(PARTIAL_PATH):
-        os.remove(PARTIAL_PATH)
+    if os.path.exists(JOURNAL_PATH):
+        os.remove(JOURNAL_PATH)
 
     elapsed_total = time.time() - start_time
     print(
         f"Hotovo. Úplne obohatených: {fully_found_count}/{total}, "
         f"celkový čas behu: {elapsed_total:.1f}s"
     )
+    print(f"Cache: {cache.hits} zásahov, {cache.misses} nových skladieb ({CACHE_PATH})")
+    print(f"Cache autorov: {cache.artist_hits} žánrov doplnených bez volaní")
+    print(f"Odhad dĺžky z prehratí: {INFERRED_STATS['used']} skladieb")
+    print(f"Negatívna cache (TTL {NEGATIVE_TTL_DAYS:g} dní): {cache.negative_hits} skladieb bez volaní")
+    print(f"Identity: {len(index)} skladieb, {index.fuzzy_matches} variantov zlúčených podobnosťou")
+    for name, limiter in LIMITERS.items():
+        print(f"  {name}: {limiter.acquired} požiadaviek, čakanie na limit {limiter.waited:.1f}s")
+    print(
+        f"ISRC: MusicBrainz {ISRC_STATS['mb_found']}/{ISRC_STATS['mb_codes']} kódov "
+        f"v {ISRC_STATS['mb_batches']} dotazoch, Spotify "
+        f"{ISRC_STATS['spotify_found']}/{ISRC_STATS['spotify_lookups']}"
+    )
+    print("Zdroje (adaptívne poradie):")
+    for line in PLANNER.report():
+        print(f"  {line}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+"""
+Naplnenie cache obohatenia z už obohatených bronze snapshotov.
+
+bronze/enriched/*-song-enriched*/ obsahuje pre každú session aj výsledky
+zdrojov (duration_ms, genre). Záznamy sa normalizujú rovnakými extraktormi
+ako v transform_merge, zlúčia sa podľa kanonickej identity skladby a do
+cache sa doplnia iba chýbajúce polia s pôvodom 'bronze-enriched'. Nové
+prostredie tak začína s teplou cache a známe skladby sa znova nevyhľadávajú.
+
+Použitie:
+  python enrich_seed.py [--bronze DIR] [--cache PATH] [--since ...] [--radios ...]
+alebo ako súčasť obohatenia:
+  python enrich_data.py --seed-from-bronze
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import transform_merge
+from bronze_layout import BRONZE_DIR, NO_FILTER, BronzeFilter, add_filter_args, filter_from_args, iter_enriched_files
+from enrich_cache import EnrichCache
+from song_identity import SongIndex
+
+SEED_SOURCE = "bronze-enriched"
+
+
+def snapshot_meta(raw: Dict[str, Any]) -> Dict[str, Optional[Any]]:
+    """duration (ms) a genre zo surového obohateného záznamu; prázdne hodnoty -> None."""
+    duration = raw.get("duration_ms")
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration <= 0:
+        duration = None
+    else:
+        duration = int(duration)
+
+    genre = raw.get("genre")
+    if isinstance(genre, list):
+        genre = next((g for g in genre if isinstance(g, str) and g.strip()), None)
+    if not isinstance(genre, str) or not genre.strip():
+        genre = None
+    else:
+        genre = genre.strip()
+
+    return {"duration": duration, "genre": genre, "release_year": None}
+
+
+def collect_seed(bronze_dir: str = BRONZE_DIR,
+                 prune: BronzeFilter = NO_FILTER,
+                 index: Optional[SongIndex] = None,
+                 stats: Optional[Counter] = None) -> Dict[str, Tuple[str, List[str], Dict[str, Optional[Any]]]]:
+    """
+    identita -> (title, artists, meta) zo všetkých obohatených snapshotov.
+    Pri viacerých výskytoch sa berie prvá neprázdna hodnota každého poľa.
+    """
+    if index is None:
+        index = SongIndex()
+    if stats is None:
+        stats = Counter()
+
+    seeds: Dict[str, Tuple[str, List[str], Dict[str, Optional[Any]]]] = {}
+    for bf in iter_enriched_files(bronze_dir, prune):
+        stats["files"] += 1
+        with open(bf.path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                stats["bad_files"] += 1
+                continue
+
+        iterable = data if isinstance(data, list) else [data]
+        for raw, rec in transform_merge.iter_normalized(iterable, bf.radio):
+            stats["records"] += 1
+            meta = snapshot_meta(raw)
+            if meta["duration"] is None and meta["genre"] is None:
+                continue
+            title, artists = rec.get("title"), rec.get("artists") or []
+            if not title or not artists:
+                continue
+            stats["records_with_meta"] += 1
+
+            key = index.resolve(title, artists)
+            if key not in seeds:
+                seeds[key] = (title, artists, meta)
+                continue
+            current = seeds[key][2]
+            for field, value in meta.items():
+                if current[field] is None and value is not None:
+                    current[field] = value
+    return seeds
+
+
+def seed_cache(cache: EnrichCache,
+               bronze_dir: str = BRONZE_DIR,
+               prune: BronzeFilter = NO_FILTER,
+               index: Optional[SongIndex] = None) -> Counter:
+    """Doplní cache z obohatených snapshotov; vráti štatistiku importu."""
+    if index is None:
+        index = SongIndex(cache.keys())
+    stats: Counter = Counter()
+    seeds = collect_seed(bronze_dir, prune, index, stats)
+    stats["songs"] = len(seeds)
+
+    for key, (title, artists, meta) in seeds.items():
+        filled = cache.fill(key, title, artists, meta, SEED_SOURCE)
+        if filled:
+            stats["songs_filled"] += 1
+        for field in filled:
+            stats[f"filled_{field}"] += 1
+    cache.commit()
+    return stats
+
+
+def print_seed_stats(stats: Counter) -> None:
+    print(
+        f"Seed z bronze/enriched: {stats['files']} súborov, {stats['records']} záznamov "
+        f"({stats['records_with_meta']} s metadátami), {stats['songs']} skladieb"
+    )
+    print(
+        f"  doplnené: {stats['songs_filled']} skladieb "
+        f"(duration {stats['filled_duration']}, genre {stats['filled_genre']})"
+    )
+    if stats["bad_files"]:
+        print(f"  poškodené súbory: {stats['bad_files']}")
+
+
+def main():
+    from enrich_data import CACHE_PATH
+
+    parser = argparse.ArgumentParser(description="Naplní cache obohatenia z bronze/enriched snapshotov.")
+    parser.add_argument("--bronze", default=BRONZE_DIR, help="koreň bronzovej vrstvy")
+    parser.add_argument("--cache", default=CACHE_PATH, help="SQLite cache obohatenia")
+    add_filter_args(parser)
+    args = parser.parse_args()
+
+    start = time.time()
+    cache = EnrichCache(args.cache)
+    stats = seed_cache(cache, args.bronze, filter_from_args(args))
+    cache.close()
+
+    print_seed_stats(stats)
+    print(f"Cache: {os.path.abspath(args.cache)} ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 import json
 import re
+from collections import Counter
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import duration_to_s
+from bronze_layout import SILVER_ROOT
+
+INPUT_PATH = duration_to_s.OUTPUT_PATH
+OUTPUT_PATH = Path(SILVER_ROOT) / "silver_transform_merged1" / "silver_enrich_durationsec_genresOK.json"
 
 ALLOWED = {
     "pop", "rock", "hip hop", "rap", "r&b", "soul", "metal", "jazz", "blues",
@@ -9,9 +17,12 @@ ALLOWED = {
     "latin", "world"
 }
 
+_WS_RE = re.compile(r"\s+")
+_SPLIT_RE = re.compile(r"[\/,&;|]+")
+
 def norm(s: str) -> str:
     s = (s or "").strip().lower()
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
     return s
 
 DIRECT_MAP = {
@@ -93,100 +104,141 @@ DIRECT_MAP = {
     "bossa nova": "latin",
 }
 
-def map_to_allowed(raw: str) -> str | None:
-    g = norm(raw)
+# Záložné pravidlá podľa podreťazcov, v poradí priority (prvé splnené vyhráva).
+# Pravidlo je splnené, ak text obsahuje všetky jeho kľúčové slová.
+FALLBACK_RULES: List[Tuple[Tuple[str, ...], str]] = [
+    (("hip", "hop"), "hip hop"),
+    (("rap",), "rap"),
+    (("metal",), "metal"),
+    (("punk",), "punk"),
+    (("reggae",), "reggae"),
+    (("funk",), "funk"),
+    (("blues",), "blues"),
+    (("jazz",), "jazz"),
+    (("house",), "house"),
+    (("techno",), "techno"),
+    (("trance",), "trance"),
+    (("disco",), "disco"),
+    (("dance",), "dance"),
+    (("electro",), "electronic"),
+    (("edm",), "electronic"),
+    (("indie",), "indie"),
+    (("alternat",), "alternative"),
+    (("country",), "country"),
+    (("folk",), "folk"),
+    (("latin",), "latin"),
+    (("reggaeton",), "latin"),
+    (("rock",), "rock"),
+    (("pop",), "pop"),
+]
+
+# Všetky kľúčové slová v jednom regexe; lookahead nájde aj prekrývajúce sa výskyty.
+# Na jednej pozícii vyhrá najdlhšie slovo, preto sa mu priradí najlepšie poradie
+# spomedzi slov, ktoré obsahuje ('reggaeton' -> aj pravidlo 'reggae').
+_KEYWORDS = sorted({kw for keywords, _ in FALLBACK_RULES for kw in keywords}, key=len, reverse=True)
+_KEYWORD_RE = re.compile("(?=(" + "|".join(map(re.escape, _KEYWORDS)) + "))")
+_SINGLE_RANK = {  # slovo -> prvé pravidlo s týmto jediným slovom
+    keywords[0]: rank
+    for rank, (keywords, _) in reversed(list(enumerate(FALLBACK_RULES)))
+    if len(keywords) == 1
+}
+_BEST_RANK = {
+    kw: min((r for other, r in _SINGLE_RANK.items() if other in kw), default=len(FALLBACK_RULES))
+    for kw in _KEYWORDS
+}
+# pravidlá s viacerými slovami sa overia zvlášť (iba ak môžu vyhrať)
+_COMPOUND_RULES = [(rank, keywords) for rank, (keywords, _) in enumerate(FALLBACK_RULES) if len(keywords) > 1]
+
+def fallback_rank(g: str) -> Optional[int]:
+    """Index prvého splneného záložného pravidla; text sa prejde jedným regexom."""
+    best = len(FALLBACK_RULES)
+    for kw in _KEYWORD_RE.findall(g):
+        rank = _BEST_RANK[kw]
+        if rank < best:
+            best = rank
+    for rank, keywords in _COMPOUND_RULES:
+        if rank >= best:
+            break
+        if all(kw in g for kw in keywords):
+            best = rank
+            break
+    return best if best < len(FALLBACK_RULES) else None
+
+def _lookup(g: str) -> Optional[str]:
+    if g in ALLOWED:
+        return g
+    mapped = DIRECT_MAP.get(g)
+    if mapped in ALLOWED:
+        return mapped
+    return None
+
+def _map_normalized(g: str) -> Optional[str]:
     if not g:
         return None
 
-    if g in ALLOWED:
-        return g
+    mapped = _lookup(g)
+    if mapped is not None:
+        return mapped
+
+    for p in map(norm, _SPLIT_RE.split(g)):
+        mapped = _lookup(p)
+        if mapped is not None:
+            return mapped
 
-    if g in DIRECT_MAP and DIRECT_MAP[g] in ALLOWED:
-        return DIRECT_MAP[g]
-
-    parts = re.split(r"[\/,&;|]+", g)
-    for p in map(norm, parts):
-        if p in ALLOWED:
-            return p
-        if p in DIRECT_MAP and DIRECT_MAP[p] in ALLOWED:
-            return DIRECT_MAP[p]
-
-    if "hip" in g and "hop" in g:
-        return "hip hop"
-    if "rap" in g:
-        return "rap"
-    if "metal" in g:
-        return "metal"
-    if "punk" in g:
-        return "punk"
-    if "reggae" in g:
-        return "reggae"
-    if "funk" in g:
-        return "funk"
-    if "blues" in g:
-        return "blues"
-    if "jazz" in g:
-        return "jazz"
-    if "house" in g:
-        return "house"
-    if "techno" in g:
-        return "techno"
-    if "trance" in g:
-        return "trance"
-    if "disco" in g:
-        return "disco"
-    if "dance" in g:
-        return "dance"
-    if "electro" in g or "edm" in g:
-        return "electronic"
-    if "indie" in g:
-        return "indie"
-    if "alternat" in g:
-        return "alternative"
-    if "country" in g:
-        return "country"
-    if "folk" in g:
-        return "folk"
-    if "latin" in g or "reggaeton" in g:
-        return "latin"
-    if "rock" in g:
-        return "rock"
-    if "pop" in g:
-        return "pop"
+    rank = fallback_rank(g)
+    if rank is not None:
+        return FALLBACK_RULES[rank][1]
 
     return None  # nič nesedí → necháme pôvodné
 
+# Rôznych surových žánrov je málo, záznamov veľa – každá hodnota sa mapuje raz
+_MEMO: Dict[str, Optional[str]] = {}
+
+def map_to_allowed(raw: str) -> str | None:
+    try:
+        return _MEMO[raw]
+    except KeyError:
+        pass
+    except TypeError:  # nehashovateľná hodnota (napr. zoznam)
+        return _map_normalized(norm(raw))
+    mapped = _MEMO[raw] = _map_normalized(norm(raw))
+    return mapped
+
+def map_genre(row: Dict[str, Any], stats: Optional[Counter] = None) -> Dict[str, Any]:
+    """Transform pre silver_pipeline: genre -> povolený žáner (bez matchu ostáva pôvodný)."""
+    raw = row.get("genre")
+    if not raw:
+        return row
+
+    mapped = map_to_allowed(raw)
+    if mapped is None:
+        if stats is not None:
+            stats["genre_kept_original"] += 1
+        return row
+
+    if stats is not None and norm(raw) != mapped:
+        stats["genre_mapped"] += 1
+    row["genre"] = mapped
+    return row
+
 def main():
-    in_path = Path(r"silver_transform_merged1\silver_enrich_durationsec.json")
-    out_path = Path(r"silver_transform_merged1\silver_enrich_durationsec_genresOK2.json")
+    in_path = INPUT_PATH
+    out_path = OUTPUT_PATH
 
     with in_path.open("r", encoding="utf-8") as f:
         data = json.load(f)
 
-    changed = 0
-    kept_original = 0
-
+    stats = Counter()
     for item in data:
-        raw = item.get("genre")
-        if not raw:
-            continue
-
-        mapped = map_to_allowed(raw)
-        if mapped is None:
-            kept_original += 1
-            continue
-
-        if norm(raw) != mapped:
-            changed += 1
-        item["genre"] = mapped
+        map_genre(item, stats)
 
     with out_path.open("w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
     print(f"OK: {out_path}")
     print(f"Záznamov: {len(data)}")
-    print(f"Premapovaných: {changed}")
-    print(f"Ponechaných pôvodných (bez matchu): {kept_original}")
+    print(f"Premapovaných: {stats['genre_mapped']}")
+    print(f"Ponechaných pôvodných (bez matchu): {stats['genre_kept_original']}")
 
 if __name__ == "__main__":
     main()
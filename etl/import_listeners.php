@@ -19,7 +19,7 @@ $dbHost = 'localhost';
 $dbName = 'radioDB';
 $dbUser = 'root';
 $dbPass = '';
-$jsonFile = __DIR__ . '/merged_listeners_v2.json';
+$jsonFile = (getenv('RADIO_ETL_ROOT') ?: __DIR__) . '/silver_transform_merged1/merged_listeners.json';
 // ----------------------------------------
 
 // ---------------- PDO -------------------
@@ -15,7 +15,7 @@ $dbHost = 'localhost';
 $dbName = 'radioDB';
 $dbUser = 'root';
 $dbPass = '';
-$jsonFile = __DIR__ . '/silver_enrich_durationsec_genresOK2.json';
+$jsonFile = (getenv('RADIO_ETL_ROOT') ?: __DIR__) . '/silver_transform_merged1/silver_enrich_durationsec_genresOK.json';
 // ----------------------------------------
 
 // ---------------- PDO -------------------
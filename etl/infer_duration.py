@@ -0,0 +1,161 @@
+"""
+Odhad dĺžky skladieb z medzier medzi po sebe idúcimi skladbami.
+
+Silver skladby obsahujú pre každé rádio začiatok každej skladby (date/time).
+Čas do začiatku nasledujúcej skladby na tom istom rádiu je pozorovaná dĺžka
+prehrávania (navyše s prípadným jinglom, reklamou či moderátorom). Z mnohých
+prehratí tej istej skladby sa berie medián a MAD (mediánová absolútna
+odchýlka), ktoré sú voči takým odľahlým medzerám odolné.
+
+Výstup (silver_transform_merged0/inferred_durations.json):
+  [{"song_key", "title", "artists", "duration" (ms), "plays", "mad_s", "confidence"}, ...]
+confidence:
+  high   – aspoň HIGH_MIN_PLAYS prehratí a MAD do HIGH_MAX_MAD s
+  medium – aspoň MEDIUM_MIN_PLAYS prehratí a MAD do MEDIUM_MAX_MAD s
+  low    – ostatné (na obohatenie sa predvolene nepoužíva)
+
+enrich_data tieto hodnoty použije na doplnenie 'duration' ešte pred volaním API.
+
+Použitie:
+  python infer_duration.py [--input FILE] [--output FILE]
+"""
+import argparse
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import timestamps as ts
+import transform_merge
+from json_stream import JsonArrayWriter, iter_json_array
+from song_identity import SongIndex
+
+OUTPUT_FILE = os.path.join(transform_merge.OUTPUT_ROOT, "inferred_durations.json")
+
+# Medzery mimo tohto rozsahu (s) nie sú dĺžkou jednej skladby
+# (duplicitný záznam, výpadok zberu, spravodajstvo, dlhý reklamný blok)
+MIN_GAP = 60
+MAX_GAP = 600
+
+HIGH_MIN_PLAYS = 5
+HIGH_MAX_MAD = 15
+MEDIUM_MIN_PLAYS = 3
+MEDIUM_MAX_MAD = 30
+
+CONFIDENCE_LEVELS = ("low", "medium", "high")
+
+
+def median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def confidence(plays: int, mad: float) -> str:
+    if plays >= HIGH_MIN_PLAYS and mad <= HIGH_MAX_MAD:
+        return "high"
+    if plays >= MEDIUM_MIN_PLAYS and mad <= MEDIUM_MAX_MAD:
+        return "medium"
+    return "low"
+
+
+def collect_gaps(records: Iterable[Dict[str, Any]],
+                 index: Optional[SongIndex] = None) -> Tuple[Dict[str, List[int]], Dict[str, Tuple[str, List[str]]]]:
+    """
+    identita skladby -> pozorované medzery (s) a identita -> (title, artists).
+    Viac záznamov s rovnakým začiatkom na tom istom rádiu sa počíta raz.
+    """
+    if index is None:
+        index = SongIndex()
+
+    starts: Dict[str, Dict[int, str]] = defaultdict(dict)  # rádio -> epoch začiatku -> identita
+    names: Dict[str, Tuple[str, List[str]]] = {}
+    for rec in records:
+        title, date, time = rec.get("title"), rec.get("date"), rec.get("time")
+        if not title or not date or not time:
+            continue
+        epoch = ts.combine_epoch(date, time)
+        if epoch is None:
+            continue
+        artists = rec.get("artists") or []
+        key = index.resolve(title, artists)
+        starts[rec.get("radio") or ""].setdefault(epoch, key)
+        names.setdefault(key, (title, artists))
+
+    gaps: Dict[str, List[int]] = defaultdict(list)
+    for plays in starts.values():
+        ordered = sorted(plays.items())
+        for (start, key), (next_start, next_key) in zip(ordered, ordered[1:]):
+            if next_key == key:
+                continue  # ten istý song zaznamenaný dvakrát za sebou
+            gap = next_start - start
+            if MIN_GAP <= gap <= MAX_GAP:
+                gaps[key].append(gap)
+    return gaps, names
+
+
+def infer_durations(records: Iterable[Dict[str, Any]],
+                    index: Optional[SongIndex] = None) -> List[Dict[str, Any]]:
+    gaps, names = collect_gaps(records, index)
+    rows = []
+    for key in sorted(gaps):
+        observed = gaps[key]
+        med = median(observed)
+        mad = median([abs(g - med) for g in observed])
+        title, artists = names[key]
+        rows.append({
+            "song_key": key,
+            "title": title,
+            "artists": artists,
+            "duration": int(round(med * 1000)),
+            "plays": len(observed),
+            "mad_s": mad,
+            "confidence": confidence(len(observed), mad),
+        })
+    return rows
+
+
+def load_inferred(path: str = OUTPUT_FILE,
+                  index: Optional[SongIndex] = None,
+                  min_confidence: str = "medium") -> Dict[str, Dict[str, Any]]:
+    """
+    identita -> odhad pre odhady aspoň `min_confidence`. Pri zadanom `index`
+    sa identity prepočítajú cez neho, aby sedeli s kľúčmi obohatenia.
+    """
+    if not os.path.exists(path):
+        return {}
+    threshold = CONFIDENCE_LEVELS.index(min_confidence)
+    result: Dict[str, Dict[str, Any]] = {}
+    for row in iter_json_array(path):
+        if CONFIDENCE_LEVELS.index(row["confidence"]) < threshold:
+            continue
+        key = index.resolve(row["title"], row["artists"]) if index is not None else row["song_key"]
+        if key not in result or row["plays"] > result[key]["plays"]:
+            result[key] = row
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Odhad dĺžky skladieb z medzier medzi prehratiami.")
+    parser.add_argument("--input", default=transform_merge.OUTPUT_FILE, help="silver skladby")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    rows = infer_durations(iter_json_array(args.input))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with JsonArrayWriter(args.output) as out:
+        for row in rows:
+            out.write(row)
+
+    counts = {level: 0 for level in CONFIDENCE_LEVELS}
+    for row in rows:
+        counts[row["confidence"]] += 1
+    print(f"{args.output}: {len(rows)} skladieb")
+    for level in reversed(CONFIDENCE_LEVELS):
+        print(f"  {level}: {counts[level]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Postupné čítanie veľkých silver JSON súborov.
+
+Silver výstupy sú jedno veľké pole objektov ([{...}, {...}, ...]). json.load
+ich načíta celé naraz; iter_json_array číta súbor po blokoch a vracia
+objekty jeden po druhom, takže pamäť nezávisí od veľkosti súboru.
+JsonArrayWriter je opačný smer – zapisuje prvky postupne a výsledok je
+zhodný s json.dump(zoznam, indent=2). Zapisuje sa do dočasného súboru, ktorý
+nahradí cieľ až po úspešnom dokončení; prerušený beh tak nenechá orezané,
+no platné pole, ktoré by ďalší krok považoval za úplné.
+"""
+import json
+import os
+from typing import Any, Iterator, TextIO
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Vráti prvky JSON poľa zo súboru. Ak súbor obsahuje jeden objekt
+    (nie pole), vráti iba ten objekt.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = 0
+
+        def fill() -> None:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        # začiatok: '[' alebo samostatný objekt
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            fill()
+
+        if pos >= len(buf):
+            return
+        if buf[pos] != "[":
+            buf = buf[pos:] + f.read()
+            yield json.loads(buf)
+            return
+        pos += 1
+
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: neukončené JSON pole")
+                fill()
+                continue
+            if buf[pos] == "]":
+                return
+
+            try:
+                obj, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+
+            # hodnota na konci bloku môže byť neúplná (napr. číslo) – dočítaj
+            if end >= len(buf) and not eof:
+                fill()
+                continue
+
+            yield obj
+            pos = end
+
+
+class JsonArrayWriter:
+    """
+    Postupný zápis JSON poľa:
+        with JsonArrayWriter(path) as out:
+            for rec in records:
+                out.write(rec)
+    """
+
+    def __init__(self, path: str, indent: int = 2):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.indent = indent
+        self.count = 0
+        self._f: TextIO = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._f = open(self.tmp_path, "w", encoding="utf-8")
+        self._f.write("[")
+        return self
+
+    def write(self, obj: Any) -> None:
+        pad = " " * self.indent
+        text = json.dumps(obj, ensure_ascii=False, indent=self.indent)
+        self._f.write(("," if self.count else "") + "\n" + pad + text.replace("\n", "\n" + pad))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._f.close()
+            os.remove(self.tmp_path)
+            return
+        self._f.write("\n]" if self.count else "]")
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
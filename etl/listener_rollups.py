@@ -0,0 +1,220 @@
+"""
+Agregácie meraní poslucháčov (silver rollup tabuľky).
+
+merged_listeners.json obsahuje každé jednotlivé meranie (~30 s). Tento modul
+ho prejde raz (postupne, bez načítania celého súboru) a vytvorí:
+  listener_rollup_minute.json  – rádio × minúta: min/max/avg/samples
+  listener_rollup_hour.json    – rádio × hodina: min/max/avg/samples
+  listener_rollup_session.json – song_session_id: peak/avg/listener_minutes
+
+Rádio sa berie z merania ('radio' z merge_listeners); staršie výstupy bez neho
+sa doplnia cez song_session_id zo silver skladieb, ak sú k dispozícii.
+
+Použitie:
+  python listener_rollups.py [--input FILE] [--songs FILE] [--out-dir DIR]
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import merge_listeners
+import timestamps as ts
+import transform_merge
+from json_stream import iter_json_array
+
+ROLLUP_MINUTE_FILE = "listener_rollup_minute.json"
+ROLLUP_HOUR_FILE = "listener_rollup_hour.json"
+ROLLUP_SESSION_FILE = "listener_rollup_session.json"
+
+# Interval merania, ak má session iba jedno meranie (sekundy)
+DEFAULT_SAMPLE_SECONDS = 30
+
+
+# --------- AKUMULÁTORY ---------
+
+class BucketStats:
+    """min/max/súčet/počet pre jeden časový kôš."""
+
+    __slots__ = ("min", "max", "total", "samples")
+
+    def __init__(self, listeners: int):
+        self.min = listeners
+        self.max = listeners
+        self.total = listeners
+        self.samples = 1
+
+    def add(self, listeners: int) -> None:
+        if listeners < self.min:
+            self.min = listeners
+        if listeners > self.max:
+            self.max = listeners
+        self.total += listeners
+        self.samples += 1
+
+
+class SessionStats:
+    """Stav jednej song session – nezávisí od poradia meraní."""
+
+    __slots__ = ("radio", "first", "last", "peak", "total", "samples")
+
+    def __init__(self, radio: Optional[str], epoch: int, listeners: int):
+        self.radio = radio
+        self.first = epoch
+        self.last = epoch
+        self.peak = listeners
+        self.total = listeners
+        self.samples = 1
+
+    def add(self, radio: Optional[str], epoch: int, listeners: int) -> None:
+        if self.radio is None:
+            self.radio = radio
+        if epoch < self.first:
+            self.first = epoch
+        if epoch > self.last:
+            self.last = epoch
+        if listeners > self.peak:
+            self.peak = listeners
+        self.total += listeners
+        self.samples += 1
+
+    def listener_minutes(self) -> float:
+        """
+        Priemer poslucháčov × trvanie session. Trvanie = rozpätie meraní
+        + jeden priemerný interval (posledné meranie tiež pokrýva kus času).
+        """
+        span = self.last - self.first
+        interval = span / (self.samples - 1) if self.samples > 1 and span > 0 else DEFAULT_SAMPLE_SECONDS
+        return (self.total / self.samples) * (span + interval) / 60
+
+
+# --------- JEDEN PRECHOD ---------
+
+def load_session_radios(songs_path: str) -> Dict[str, str]:
+    """song_session_id -> rádio zo silver skladieb (fallback pre merania bez 'radio')."""
+    if not songs_path or not os.path.exists(songs_path):
+        return {}
+    radios: Dict[str, str] = {}
+    for rec in iter_json_array(songs_path):
+        sid = rec.get("song_session_id")
+        if sid and rec.get("radio"):
+            radios[sid] = rec["radio"]
+    return radios
+
+
+def compute_rollups(readings: Iterable[Dict[str, Any]],
+                    session_radios: Optional[Dict[str, str]] = None):
+    """
+    Vráti (minúty, hodiny, sessions, štatistiky) z jedného prechodu meraniami.
+    Kľúče košov: (rádio, epoch začiatku koša).
+    """
+    session_radios = session_radios or {}
+    minutes: Dict[tuple, BucketStats] = {}
+    hours: Dict[tuple, BucketStats] = {}
+    sessions: Dict[str, SessionStats] = {}
+    stats: Counter = Counter()
+
+    for rec in readings:
+        listeners = rec.get("listeners")
+        if not isinstance(listeners, int) or isinstance(listeners, bool):
+            stats["skipped_no_listeners"] += 1
+            continue
+        recorded_at = rec.get("recorded_at")
+        epoch = ts.parse_epoch(recorded_at) if isinstance(recorded_at, str) else None
+        if epoch is None:
+            stats["skipped_bad_time"] += 1
+            continue
+
+        sid = rec.get("song_session_id")
+        radio = rec.get("radio") or session_radios.get(sid)
+        stats["readings"] += 1
+
+        if radio:
+            for buckets, size in ((minutes, 60), (hours, 3600)):
+                key = (radio, epoch - epoch % size)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = BucketStats(listeners)
+                else:
+                    bucket.add(listeners)
+        else:
+            stats["no_radio"] += 1
+
+        if sid:
+            session = sessions.get(sid)
+            if session is None:
+                sessions[sid] = SessionStats(radio, epoch, listeners)
+            else:
+                session.add(radio, epoch, listeners)
+
+    return minutes, hours, sessions, stats
+
+
+# --------- VÝSTUP ---------
+
+def bucket_rows(buckets: Dict[tuple, BucketStats]) -> List[Dict[str, Any]]:
+    rows = []
+    for (radio, start), b in sorted(buckets.items()):
+        rows.append({
+            "radio": radio,
+            "bucket_start": ts.format_datetime(ts.epoch_to_parts(start)),
+            "min_listeners": b.min,
+            "max_listeners": b.max,
+            "avg_listeners": round(b.total / b.samples, 2),
+            "samples": b.samples,
+        })
+    return rows
+
+
+def session_rows(sessions: Dict[str, SessionStats]) -> List[Dict[str, Any]]:
+    rows = []
+    for sid, s in sessions.items():
+        rows.append({
+            "song_session_id": sid,
+            "radio": s.radio,
+            "first_recorded_at": ts.format_datetime(ts.epoch_to_parts(s.first)),
+            "last_recorded_at": ts.format_datetime(ts.epoch_to_parts(s.last)),
+            "samples": s.samples,
+            "peak_listeners": s.peak,
+            "avg_listeners": round(s.total / s.samples, 2),
+            "listener_minutes": round(s.listener_minutes(), 1),
+        })
+    return rows
+
+
+def save_json(rows: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minútové/hodinové a session agregácie poslucháčov")
+    parser.add_argument("--input", default=str(merge_listeners.OUTPUT_FILE))
+    parser.add_argument("--songs", default=transform_merge.OUTPUT_FILE,
+                        help="silver skladby pre doplnenie rádia podľa song_session_id")
+    parser.add_argument("--out-dir", default=str(merge_listeners.OUTPUT_DIR))
+    args = parser.parse_args()
+
+    minutes, hours, sessions, stats = compute_rollups(
+        iter_json_array(args.input),
+        load_session_radios(args.songs),
+    )
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    outputs = (
+        (ROLLUP_MINUTE_FILE, bucket_rows(minutes)),
+        (ROLLUP_HOUR_FILE, bucket_rows(hours)),
+        (ROLLUP_SESSION_FILE, session_rows(sessions)),
+    )
+    for name, rows in outputs:
+        path = os.path.join(args.out_dir, name)
+        save_json(rows, path)
+        print(f"{name}: {len(rows)} riadkov")
+
+    for key, count in sorted(stats.items()):
+        print(f"  {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,18 @@
-import os
+import argparse
 import json
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-BASE_DIR = Path(r"C:\Users\david\PycharmProjects\radioETL")
+import timestamps as ts
+from bronze_layout import (DATA_ROOT, KIND_LISTENERS, SILVER_ROOT, NO_FILTER, BronzeFilter, add_filter_args,
+                           filter_from_args, iter_bronze_files, merge_pruned)
+
+BASE_DIR = Path(DATA_ROOT)
 BRONZE_DIR = BASE_DIR / "bronze"
-OUTPUT_DIR = BASE_DIR / "silver_transform_merged1"
+OUTPUT_DIR = Path(SILVER_ROOT) / "silver_transform_merged1"
 OUTPUT_FILE = OUTPUT_DIR / "merged_listeners.json"
 
-IGNORED_SUBDIRS = {"song"}
-
 TARGET_FORMAT = "%d.%m.%Y %H:%M:%S"  # 31.10.2025 22:57:08
 
 def normalize_recorded_at(value: str | None) -> str | None:
@@ -18,6 +21,11 @@ def normalize_recorded_at(value: str | None) -> str | None:
 
     value = value.strip()
 
+    # Rýchla cesta: 'DD.MM.YYYY HH:MM:SS' aj ISO s offsetom sa čítajú z pevných pozícií
+    parts = ts.decode(value)
+    if parts is not None:
+        return ts.format_datetime(parts)
+
     # Už v cieľovom formáte
     try:
         dt = datetime.strptime(value, TARGET_FORMAT)
@@ -37,49 +45,78 @@ def normalize_recorded_at(value: str | None) -> str | None:
     return value
 
 
-def collect_listeners():
-    merged = []
+def process_listeners_file(json_path: str, radio: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Načíta jeden súbor s meraniami poslucháčov a vráti normalizované záznamy.
+    `radio` je názov priečinka rádia; ukladá sa kvôli agregáciám po staniciach.
+    """
+    radio_name = radio.lower() if radio else None
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
 
-    for radio_dir in BRONZE_DIR.iterdir():
-        if not radio_dir.is_dir():
-            continue
+    records = data if isinstance(data, list) else [data]
 
-        for subdir in radio_dir.iterdir():
-            if not subdir.is_dir():
-                continue
-            if subdir.name.lower() in IGNORED_SUBDIRS:
-                continue
+    merged = []
+    for rec in records:
+        recorded_at = rec.get("recorded_at")
+        merged.append({
+            "listeners": rec.get("listeners"),
+            "song_session_id": rec.get("song_session_id"),
+            "recorded_at": normalize_recorded_at(recorded_at),
+            "radio": radio_name,
+        })
+    return merged
 
-            for day_dir in subdir.rglob("*"):
-                if not day_dir.is_dir():
-                    continue
 
-                for json_path in day_dir.glob("*.json"):
-                    with open(json_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
+def collect_listeners(bronze_dir: Path = BRONZE_DIR, prune: BronzeFilter = NO_FILTER):
+    merged = []
+    for bf in iter_bronze_files(str(bronze_dir), kinds=(KIND_LISTENERS,), prune=prune):
+        merged.extend(process_listeners_file(bf.path, bf.radio))
+    return merged
 
-                    records = data if isinstance(data, list) else [data]
 
-                    for rec in records:
-                        recorded_at = rec.get("recorded_at")
-                        merged.append({
-                            "listeners": rec.get("listeners"),
-                            "song_session_id": rec.get("song_session_id"),
-                            "recorded_at": normalize_recorded_at(recorded_at),
-                        })
+def listener_record_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Kľúč merania pre merge_pruned."""
+    return record.get("radio"), record.get("song_session_id"), record.get("recorded_at")
 
-    return merged
 
+def group_by_session(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merania zoskupené podľa session v poradí jej prvého výskytu (vnútri session
+    v pôvodnom poradí). create_sql hľadá duplicitné merania iba v rámci skupiny.
+    """
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    for rec in records:
+        groups.setdefault(rec.get("song_session_id"), []).append(rec)
+    return [rec for group in groups.values() for rec in group]
 
-def main():
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    merged = collect_listeners()
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+def save_listeners_json(merged: List[Dict[str, Any]], output_file: Path = OUTPUT_FILE):
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
         json.dump(merged, f, ensure_ascii=False, indent=2)
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Zlúčenie bronze/*/listeners -> silver")
+    parser.add_argument("--bronze", default=str(BRONZE_DIR), help="koreň bronzovej vrstvy")
+    parser.add_argument("--output", help="výstupný JSON iba so spracovaným rozsahom "
+                                         "(orezaný beh bez --output sa zlúči do úplného výstupu)")
+    add_filter_args(parser)
+    args = parser.parse_args()
+
+    prune = filter_from_args(args)
+    output_file = Path(args.output) if args.output else OUTPUT_FILE
+
+    merged = collect_listeners(Path(args.bronze), prune)
+    if prune.active and not args.output:
+        fresh = len(merged)
+        merged, replaced = merge_pruned(merged, str(output_file), listener_record_key)
+        print(f"Orezaný beh: {fresh} záznamov, {replaced} nahradených v úplnom výstupe")
+    save_listeners_json(group_by_session(merged), output_file)
+
     print(f"Uložených záznamov: {len(merged)}")
-    print(f"Výstup: {OUTPUT_FILE}")
+    print(f"Výstup: {output_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+"""
+Orchestrácia ETL: kroky ako DAG s cache podľa obsahu a paralelným behom.
+
+Každý krok (Stage) deklaruje skript, jeho vstupy a výstupy; závislosti medzi
+krokmi sa odvodia z toho, ktorý krok vyrába vstup iného. Krok sa preskočí, ak
+sa nezmenil jeho odtlačok – SHA-256 obsahu vstupných súborov, zdrojového kódu
+skriptu a lokálnych modulov, ktoré importuje, a argumentov – a jeho výstupy
+sú na disku také, ako ich zanechal posledný beh. Porovnáva sa obsah, takže
+krok, ktorý vyrobí rovnaký výstup ako minule, nespustí nasledujúce kroky.
+
+  songs          <- bronze/*/song
+  listeners      <- bronze/*/listeners
+  infer_duration <- songs
+  enrich         <- songs, infer_duration
+  silver         <- enrich
+  rollups        <- listeners, songs
+  sql            <- silver, listeners
+  analytics      <- silver, rollups
+
+Nezávislé kroky (skladby a poslucháči) bežia paralelne ako samostatné procesy.
+Všetky cesty sú pod jedným koreňom dát (--root, inak RADIO_ETL_ROOT, viď
+bronze_layout), ktorý sa krokom odovzdá cez prostredie. Prevod duration a
+mapovanie žánrov robí silver_pipeline v jednom prechode (namiesto
+duration_to_s -> genre_mapper).
+
+Stav a cache hashov (podľa veľkosti a mtime súboru) sú v pipeline_state.json,
+výstup jednotlivých krokov v pipeline_logs/<krok>.log pod koreňom.
+
+Použitie:
+  python pipeline.py [krok ...] [--root DIR] [--force] [--workers N] [--dry-run]
+Zadané kroky sa spustia spolu so všetkými krokmi, od ktorých závisia.
+"""
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import analytics_store
+import create_sql
+import infer_duration
+import listener_rollups
+import merge_listeners
+import silver_pipeline
+import transform_merge
+from bronze_layout import DATA_ROOT, ETL_DIR, KIND_LISTENERS, KIND_SONG, SILVER_ROOT
+
+STATE_FILE = "pipeline_state.json"
+LOG_DIR = "pipeline_logs"
+DEFAULT_WORKERS = 4
+HASH_CHUNK = 1 << 20
+
+
+class Stage(NamedTuple):
+    name: str
+    script: str              # skript v priečinku etl
+    inputs: Tuple[str, ...]  # súbory alebo glob vzory ('**' rekurzívne); chýbajúci súbor je tiež stav
+    outputs: Tuple[str, ...]
+    args: Tuple[str, ...] = ()
+
+
+def build_stages(data_root: str = DATA_ROOT, silver_root: str = SILVER_ROOT) -> List[Stage]:
+    """Kroky ETL s cestami pod zadaným koreňom (predvolene podľa bronze_layout)."""
+    bronze = os.path.join(data_root, "bronze")
+
+    def silver(path: Any) -> str:
+        # predvolené cesty modulov prenesené pod silver_root
+        return os.path.join(silver_root, os.path.relpath(str(path), SILVER_ROOT))
+
+    songs = silver(transform_merge.OUTPUT_FILE)
+    listeners = silver(merge_listeners.OUTPUT_FILE)
+    inferred = silver(infer_duration.OUTPUT_FILE)
+    enriched = silver(silver_pipeline.INPUT_FILE)
+    final_songs = silver(silver_pipeline.OUTPUT_FILE)
+    rollup_dir = silver(merge_listeners.OUTPUT_DIR)
+    rollups = tuple(os.path.join(rollup_dir, name) for name in (
+        listener_rollups.ROLLUP_MINUTE_FILE, listener_rollups.ROLLUP_HOUR_FILE, listener_rollups.ROLLUP_SESSION_FILE))
+
+    return [
+        Stage("songs", "transform_merge.py",
+              (os.path.join(bronze, "*", KIND_SONG, "**", "*.json"),), (songs,)),
+        Stage("listeners", "merge_listeners.py",
+              (os.path.join(bronze, "*", KIND_LISTENERS, "**", "*.json"),), (listeners,)),
+        Stage("infer_duration", "infer_duration.py", (songs,), (inferred,)),
+        Stage("enrich", "enrich_data.py", (songs, inferred), (enriched,)),
+        Stage("silver", "silver_pipeline.py", (enriched,), (final_songs,)),
+        Stage("rollups", "listener_rollups.py", (listeners, songs), rollups),
+        Stage("sql", "create_sql.py",
+              (final_songs, listeners, silver(create_sql.DDL_SQL_PATH)), (silver(create_sql.OUT_SQL_PATH),)),
+        Stage("analytics", "analytics_store.py",
+              (final_songs, silver(analytics_store.SESSIONS_FILE)), (silver(analytics_store.DB_PATH),),
+              ("refresh",)),
+    ]
+
+
+def dependencies(stages: Sequence[Stage]) -> Dict[str, Set[str]]:
+    """krok -> kroky, ktoré vyrábajú niektorý z jeho vstupov."""
+    producer = {}
+    for stage in stages:
+        for path in stage.outputs:
+            if path in producer:
+                raise SystemExit(f"Výstup {path} vyrábajú kroky {producer[path]} aj {stage.name}")
+            producer[path] = stage.name
+    return {s.name: {producer[p] for p in s.inputs if p in producer} for s in stages}
+
+
+def select(stages: Sequence[Stage], deps: Dict[str, Set[str]], targets: Iterable[str]) -> List[Stage]:
+    """Zadané kroky a všetky, od ktorých závisia, v topologickom poradí; kontroluje aj cykly."""
+    names = {s.name for s in stages}
+    wanted: Set[str] = set()
+    stack = list(targets) or list(names)
+    while stack:
+        name = stack.pop()
+        if name not in names:
+            raise SystemExit(f"Neznámy krok '{name}' (dostupné: {', '.join(s.name for s in stages)})")
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(deps[name])
+
+    ordered: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in ordered:
+            return
+        if name in visiting:
+            raise SystemExit(f"Cyklus v krokoch cez '{name}'")
+        visiting.add(name)
+        for dep in sorted(deps[name]):
+            visit(dep)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in sorted(wanted):
+        visit(name)
+    by_name = {s.name: s for s in stages}
+    return [by_name[name] for name in ordered]
+
+
+def local_modules(script: str, etl_dir: str = ETL_DIR) -> List[str]:
+    """Skript a lokálne moduly z etl, ktoré (aj nepriamo) importuje."""
+    found: List[str] = []
+    stack = [os.path.splitext(script)[0]]
+    while stack:
+        module = stack.pop()
+        path = os.path.join(etl_dir, module + ".py")
+        if module in found or not os.path.exists(path):
+            continue
+        found.append(module)
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                stack.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                stack.append(node.module.split(".")[0])
+    return sorted(found)
+
+
+class HashCache:
+    """SHA-256 obsahu súborov; prepočíta sa iba pri zmene veľkosti alebo mtime."""
+
+    def __init__(self, entries: Optional[Dict[str, List[Any]]] = None):
+        self.entries: Dict[str, List[Any]] = entries or {}
+        self.hashed = 0
+
+    def file_hash(self, path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        entry = self.entries.get(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        self.hashed += 1
+        self.entries[path] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def expand(self, pattern: str) -> List[str]:
+        if glob.has_magic(pattern):
+            return sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+        return [pattern]
+
+    def fingerprint(self, stage: Stage, root: str) -> str:
+        """Odtlačok kroku: argumenty, kód a obsah vstupov (cesty relatívne ku koreňu)."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([stage.script, stage.args]).encode("utf-8"))
+        for module in local_modules(stage.script):
+            digest.update(f"\ncode {module} {self.file_hash(os.path.join(ETL_DIR, module + '.py'))}".encode("utf-8"))
+        for pattern in stage.inputs:
+            for path in self.expand(pattern):
+                digest.update(f"\nin {os.path.relpath(path, root)} {self.file_hash(path)}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def output_hashes(self, stage: Stage) -> Dict[str, Optional[str]]:
+        return {path: self.file_hash(path) for path in stage.outputs}
+
+
+class PipelineState:
+    """Odtlačky krokov z posledných úspešných behov a cache hashov súborov."""
+
+    def __init__(self, stages: Optional[Dict[str, Dict[str, Any]]] = None,
+                 files: Optional[Dict[str, List[Any]]] = None):
+        self.stages: Dict[str, Dict[str, Any]] = stages or {}
+        self.hashes = HashCache(files)
+
+    @classmethod
+    def load(cls, path: str) -> "PipelineState":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("stages"), data.get("files"))
+
+    def save(self, path: str) -> None:
+        files = {p: e for p, e in self.hashes.entries.items() if os.path.exists(p)}
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages, "files": files}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def up_to_date(self, stage: Stage, fingerprint: str) -> bool:
+        prev = self.stages.get(stage.name)
+        if not prev or prev["fingerprint"] != fingerprint:
+            return False
+        outputs = self.hashes.output_hashes(stage)
+        return None not in outputs.values() and outputs == prev["outputs"]
+
+
+def run_stage(stage: Stage, env: Dict[str, str], log_path: str) -> Tuple[int, float]:
+    """Spustí skript kroku ako samostatný proces; výstup ide do logu. -> (návratový kód, trvanie)"""
+    start = time.time()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run([sys.executable, stage.script, *stage.args], cwd=ETL_DIR, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.time() - start
+
+
+def log_tail(path: str, lines: int = 10) -> List[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read().splitlines()[-lines:]
+
+
+def run_pipeline(stages: Sequence[Stage], state: PipelineState, root: str, env: Dict[str, str],
+                 state_path: str, workers: int = DEFAULT_WORKERS, force: bool = False) -> Dict[str, str]:
+    """
+    Spúšťa kroky (uzavreté na závislosti, viď select), keď sú hotové všetky
+    ich závislosti; nezávislé kroky bežia
+    súbežne. Po chybe kroku sa jeho nasledovníci nespustia, ostatné vetvy
+    dobehnú. -> krok -> výsledok ('ok', 'skip', 'fail', 'blocked')
+    """
+    deps = dependencies(stages)
+    log_dir = os.path.join(root, LOG_DIR)
+    os.makedirs(log_dir, exist_ok=True)
+
+    pending = {s.name: s for s in stages}
+    results: Dict[str, str] = {}
+    running: Dict[Future, Tuple[Stage, str]] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            progress = True
+            while progress:
+                progress = False
+                for name, stage in list(pending.items()):
+                    upstream = [results.get(d) for d in deps[name]]
+                    if any(r in ("fail", "blocked") for r in upstream):
+                        results[name] = "blocked"
+                        print(f"[{name}] nespustené, zlyhal predchádzajúci krok")
+                    elif None in upstream:
+                        continue
+                    else:
+                        fingerprint = state.hashes.fingerprint(stage, root)
+                        if not force and state.up_to_date(stage, fingerprint):
+                            results[name] = "skip"
+                            print(f"[{name}] bez zmeny vstupov, preskočené")
+                        else:
+                            print(f"[{name}] spúšťam {stage.script} {' '.join(stage.args)}".rstrip())
+                            log_path = os.path.join(log_dir, f"{name}.log")
+                            running[pool.submit(run_stage, stage, env, log_path)] = (stage, fingerprint)
+                    del pending[name]
+                    progress = True
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, fingerprint = running.pop(future)
+                code, seconds = future.result()
+                log_path = os.path.join(log_dir, f"{stage.name}.log")
+                outputs = state.hashes.output_hashes(stage)
+                missing = [p for p, h in outputs.items() if h is None]
+                if code != 0 or missing:
+                    results[stage.name] = "fail"
+                    reason = f"návratový kód {code}" if code else f"chýba výstup {', '.join(missing)}"
+                    print(f"[{stage.name}] ❌ {reason} ({seconds:.1f}s), log: {log_path}")
+                    for line in log_tail(log_path):
+                        print(f"    {line}")
+                    continue
+                results[stage.name] = "ok"
+                state.stages[stage.name] = {"fingerprint": fingerprint, "outputs": outputs,
+                                            "seconds": round(seconds, 1)}
+                state.save(state_path)
+                print(f"[{stage.name}] ✅ {seconds:.1f}s")
+    return results
+
+
+def plan(stages: Sequence[Stage], state: PipelineState, root: str, force: bool = False) -> Dict[str, str]:
+    """Čo by sa spustilo (--dry-run): 'run', 'skip' alebo 'after' (závisí od kroku, ktorý pobeží)."""
+    deps = dependencies(stages)
+    result: Dict[str, str] = {}
+    for stage in stages:  # stages sú v topologickom poradí
+        if any(result.get(d) in ("run", "after") for d in deps[stage.name]):
+            result[stage.name] = "after"
+        elif force or not state.up_to_date(stage, state.hashes.fingerprint(stage, root)):
+            result[stage.name] = "run"
+        else:
+            result[stage.name] = "skip"
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="ETL ako DAG krokov s cache podľa obsahu a paralelným behom.")
+    parser.add_argument("targets", nargs="*", metavar="krok", help="cieľové kroky (predvolene všetky)")
+    parser.add_argument("--root", default=None,
+                        help="koreň dát: bronze/ a všetky silver výstupy (predvolene RADIO_ETL_ROOT, inak repozitár)")
+    parser.add_argument("--force", action="store_true", help="spustiť kroky aj bez zmeny vstupov")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="najviac súbežných krokov")
+    parser.add_argument("--dry-run", action="store_true", help="iba vypíše, ktoré kroky by sa spustili")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    if args.root:
+        root = os.path.abspath(args.root)
+        env["RADIO_ETL_ROOT"] = root
+        all_stages = build_stages(root, root)
+    else:
+        root = SILVER_ROOT
+        all_stages = build_stages()
+
+    stages = select(all_stages, dependencies(all_stages), args.targets)
+    state_path = os.path.join(root, STATE_FILE)
+    state = PipelineState.load(state_path)
+
+    if args.dry_run:
+        for name, action in plan(stages, state, root, args.force).items():
+            print(f"  {name}: {action}")
+        return
+
+    start = time.time()
+    results = run_pipeline(stages, state, root, env, state_path, args.workers, args.force)
+    state.save(state_path)
+
+    print(f"Hotovo za {time.time() - start:.1f}s (hashovaných súborov: {state.hashes.hashed})")
+    for stage in stages:
+        print(f"  {stage.name}: {results.get(stage.name, '-')}")
+    if any(r in ("fail", "blocked") for r in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Lokálne náhrady (stand-ins) API zdrojov obohatenia.
+
+Server odpovedá na rovnaké cesty, aké volá enrich_data.py, s prefixom zdroja:
+  /musicbrainz/ws/2/recording/     /lastfm/2.0/        /itunes/search
+  /spotify_accounts/api/token      /spotify/v1/search  /listenbrainz/1/metadata/recording
+ISRC dotazy (MusicBrainz 'isrc:A OR isrc:B', Spotify 'isrc:A') dostanú odpoveď
+pre každý kód zvlášť, takže výsledok kódu nezávisí od toho, s čím bol v dávke.
+enrich_data sa naň presmeruje cez ENRICH_PROVIDER_BASE=http://127.0.0.1:PORT.
+
+Režimy:
+  synthetic – deterministické vymyslené odpovede (úspešnosť --hit-rate)
+  record    – požiadavky sa preposielajú na skutočné API a odpovede sa ukladajú do kazety
+  replay    – odpovede iba z kazety; chýbajúce podľa --on-miss (synthetic / 404)
+Voliteľne sa pridáva latencia (--latency, --jitter) a chyby (--error-rate).
+
+Použitie:
+  python provider_standins.py serve --mode replay --cassette kazeta.json --latency 0.2
+  python provider_standins.py bench --input silver_merged.json --limit 5000 --mode synthetic
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import enrich_data
+
+# parametre, ktoré sa neukladajú do kľúča kazety (tajomstvá)
+SECRET_PARAMS = {"api_key", "token"}
+
+GENRES = ("Pop", "Rock", "Dance", "Hip-Hop/Rap", "Electronic", "Jazz", "Alternative", "Folk")
+
+Response = Tuple[int, Any]
+
+ISRC_QUERY_RE = re.compile(r"isrc:([A-Z0-9]{12})", re.IGNORECASE)
+
+
+# --------- KAZETA ---------
+
+class Cassette:
+    """Nahraté odpovede: kľúč požiadavky -> {"status", "body"}; ukladá sa ako JSON."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(method: str, provider: str, path: str, query: Dict[str, str]) -> str:
+        params = sorted((k, v) for k, v in query.items() if k not in SECRET_PARAMS)
+        return f"{method} /{provider}{path}?{urlencode(params)}"
+
+    def get(self, key: str) -> Optional[Response]:
+        entry = self.entries.get(key)
+        return (entry["status"], entry["body"]) if entry else None
+
+    def put(self, key: str, status: int, body: Any) -> None:
+        with self._lock:
+            self.entries[key] = {"status": status, "body": body}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
+
+# --------- SYNTETICKÉ ODPOVEDE ---------
+
+def _rng(seed: int, provider: str, query: Dict[str, str]) -> random.Random:
+    text = f"{seed}|{provider}|" + "|".join(f"{k}={v}" for k, v in sorted(query.items()))
+    return random.Random(hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def synthetic_response(provider: str, path: str, query: Dict[str, str],
+                       hit_rate: float, seed: int) -> Response:
+    """Odpoveď v tvare, ktorý parsuje enrich_data; výsledok závisí iba od požiadavky."""
+    rng = _rng(seed, provider, query)
+    hit = rng.random() < hit_rate
+    duration_ms = rng.randint(120_000, 360_000)
+    year = rng.randint(1965, 2025)
+    genre = rng.choice(GENRES)
+
+    if provider == "spotify_accounts":
+        return 200, {"access_token": "standin-token", "token_type": "Bearer", "expires_in": 3600}
+    if provider == "musicbrainz":
+        codes = ISRC_QUERY_RE.findall(query.get("query", ""))
+        if codes:
+            return 200, {"recordings": [
+                rec for rec in (_synthetic_isrc_recording(code, hit_rate, seed) for code in codes) if rec
+            ]}
+        recordings = [{
+            "length": duration_ms,
+            "releases": [{"date": f"{year}-01-01"}],
+            "tags": [{"name": genre.lower()}] if rng.random() < 0.5 else [],
+        }] if hit else []
+        return 200, {"recordings": recordings}
+    if provider == "lastfm":
+        if not hit:
+            return 200, {"error": 6, "message": "Track not found"}
+        return 200, {"track": {
+            "duration": str(duration_ms),
+            "toptags": {"tag": [{"name": genre.lower()}]},
+        }}
+    if provider == "itunes":
+        results = [{
+            "trackTimeMillis": duration_ms,
+            "primaryGenreName": genre,
+            "releaseDate": f"{year}-01-01T08:00:00Z",
+        }] if hit else []
+        return 200, {"resultCount": len(results), "results": results}
+    if provider == "spotify":
+        items = [{"duration_ms": duration_ms, "album": {"release_date": f"{year}-01-01"}}] if hit else []
+        codes = ISRC_QUERY_RE.findall(query.get("q", ""))
+        if items and codes:
+            items[0]["external_ids"] = {"isrc": codes[0].upper()}
+        return 200, {"tracks": {"items": items}}
+    if provider == "listenbrainz":
+        recordings = [{
+            "length": duration_ms,
+            "first_release_date": f"{year}-01-01",
+            "tags": [{"name": genre.lower()}],
+        }] if hit else []
+        return 200, {"recordings": recordings}
+    return 404, {"error": f"neznámy zdroj {provider}"}
+
+
+def _synthetic_isrc_recording(code: str, hit_rate: float, seed: int) -> Optional[Dict[str, Any]]:
+    rng = _rng(seed, "musicbrainz", {"isrc": code.upper()})
+    if rng.random() >= hit_rate:
+        return None
+    return {
+        "length": rng.randint(120_000, 360_000),
+        "releases": [{"date": f"{rng.randint(1965, 2025)}-01-01"}],
+        "tags": [{"name": rng.choice(GENRES).lower()}] if rng.random() < 0.5 else [],
+        "isrcs": [code.upper()],
+    }
+
+
+# --------- SERVER ---------
+
+class StandinConfig:
+    def __init__(self, mode: str = "synthetic", latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, hit_rate: float = 0.8,
+                 on_miss: str = "synthetic", seed: int = 0):
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hit_rate = hit_rate
+        self.on_miss = on_miss
+        self.seed = seed
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StandinConfig, cassette: Cassette):
+        super().__init__(address, StandinHandler)
+        self.config = config
+        self.cassette = cassette
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+        self._stats_lock = threading.Lock()
+        self._error_rng = random.Random(config.seed)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, provider: str, what: str) -> None:
+        with self._stats_lock:
+            self.stats[provider][what] += 1
+
+    def inject_error(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._stats_lock:
+            return self._error_rng.random() < self.config.error_rate
+
+    def dispatch(self, method: str, raw_path: str, headers, body: bytes) -> Response:
+        parts = urlsplit(raw_path)
+        segments = parts.path.split("/", 2)
+        provider = segments[1] if len(segments) > 1 else ""
+        path = "/" + segments[2] if len(segments) > 2 else "/"
+        query = dict(parse_qsl(parts.query))
+        if method == "POST" and body:
+            query.update(parse_qsl(body.decode("utf-8", "replace")))
+
+        if provider == "__stats":
+            with self._stats_lock:
+                return 200, {name: dict(c) for name, c in self.stats.items()}
+        if provider not in enrich_data.UPSTREAM_URLS:
+            return 404, {"error": f"neznámy zdroj {provider}"}
+
+        self.count(provider, "requests")
+        cfg = self.config
+        if cfg.latency or cfg.jitter:
+            time.sleep(max(0.0, cfg.latency + random.uniform(-cfg.jitter, cfg.jitter)))
+        if self.inject_error():
+            self.count(provider, "injected_errors")
+            return cfg.error_status, {"error": "injected"}
+
+        key = Cassette.key(method, provider, path, query)
+        if cfg.mode == "record":
+            status, payload = self.forward(method, provider, parts, headers, body)
+            self.cassette.put(key, status, payload)
+            self.count(provider, "recorded")
+            return status, payload
+
+        if cfg.mode == "replay":
+            hit = self.cassette.get(key)
+            if hit is not None:
+                self.count(provider, "cassette_hits")
+                return hit
+            self.count(provider, "cassette_misses")
+            if cfg.on_miss != "synthetic":
+                return 404, {"error": "not in cassette"}
+
+        self.count(provider, "synthetic")
+        return synthetic_response(provider, path, query, cfg.hit_rate, cfg.seed)
+
+    def forward(self, method: str, provider: str, parts, headers, body: bytes) -> Response:
+        """Prepošle požiadavku na skutočné API (režim record)."""
+        upstream = enrich_data.UPSTREAM_URLS[provider] + parts.path[len(provider) + 1:]
+        if parts.query:
+            upstream += "?" + parts.query
+        fwd_headers = {k: v for k, v in headers.items()
+                       if k.lower() in ("user-agent", "authorization", "content-type", "accept")}
+        req = urllib.request.Request(upstream, data=body or None, headers=fwd_headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=15) as resp:
+                status, raw = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except urllib.error.URLError as e:
+            return 502, {"error": str(e.reason)}
+        try:
+            return status, json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return status, {"raw": raw.decode("utf-8", "replace")}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server: StandinServer
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, payload = self.server.dispatch(method, self.path, self.headers, body)
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # bez výpisu každej požiadavky
+
+
+def start_in_thread(config: StandinConfig, cassette: Cassette,
+                    host: str = "127.0.0.1", port: int = 0) -> StandinServer:
+    server = StandinServer((host, port), config, cassette)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --------- BENCHMARK ---------
+
+def run_bench(args: argparse.Namespace, config: StandinConfig, cassette: Cassette) -> None:
+    """Spustí enrich_data.main proti stand-in serveru v dočasnom priečinku a vypíše priepustnosť."""
+    server = start_in_thread(config, cassette)
+    enrich_data.use_provider_base(server.url)
+    if args.all_providers:
+        enrich_data.LASTFM_API_KEY = enrich_data.LASTFM_API_KEY or "standin"
+        enrich_data.SPOTIFY_CLIENT_ID = enrich_data.SPOTIFY_CLIENT_ID or "standin"
+        enrich_data.SPOTIFY_CLIENT_SECRET = enrich_data.SPOTIFY_CLIENT_SECRET or "standin"
+        enrich_data.LISTENBRAINZ_API_TOKEN = enrich_data.LISTENBRAINZ_API_TOKEN or "standin"
+
+    work_dir = tempfile.mkdtemp(prefix="enrich_bench_")
+    try:
+        input_path = args.input
+        if args.limit:
+            with open(args.input, "r", encoding="utf-8") as f:
+                records = json.load(f)[:args.limit]
+            input_path = os.path.join(work_dir, "input.json")
+            with open(input_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+
+        enrich_data.SILVER_INPUT = input_path
+        enrich_data.ENRICH_DIR = work_dir
+        enrich_data.ENRICH_OUTPUT = os.path.join(work_dir, "silver_enrich.json")
+        enrich_data.JOURNAL_PATH = os.path.join(work_dir, "journal.ndjson")
+        enrich_data.STATE_PATH = os.path.join(work_dir, "state.json")
+        enrich_data.PARTIAL_PATH = os.path.join(work_dir, "partial.json")
+        enrich_data.CACHE_PATH = args.cache or os.path.join(work_dir, "cache.sqlite")
+
+        started = time.time()
+        enrich_data.main([])
+        elapsed = time.time() - started
+
+        with open(enrich_data.ENRICH_OUTPUT, "r", encoding="utf-8") as f:
+            total = len(json.load(f))
+        print(f"Benchmark: {total} záznamov za {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} záznamov/s)")
+        for provider, counts in sorted(server.stats.items()):
+            print(f"  {provider}: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# --------- MAIN ---------
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Lokálne náhrady API zdrojov obohatenia")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--mode", choices=("synthetic", "record", "replay"), default="synthetic")
+        p.add_argument("--cassette", help="JSON súbor s nahratými odpoveďami")
+        p.add_argument("--on-miss", choices=("synthetic", "404"), default="synthetic",
+                       help="čo vrátiť v režime replay, ak požiadavka nie je v kazete")
+        p.add_argument("--latency", type=float, default=0.0, help="pridaná latencia v sekundách")
+        p.add_argument("--jitter", type=float, default=0.0, help="náhodný rozptyl latencie (±s)")
+        p.add_argument("--error-rate", type=float, default=0.0, help="podiel požiadaviek s chybou")
+        p.add_argument("--error-status", type=int, default=503)
+        p.add_argument("--hit-rate", type=float, default=0.8, help="úspešnosť syntetických odpovedí")
+        p.add_argument("--seed", type=int, default=0)
+
+    serve = sub.add_parser("serve", help="spustí stand-in server")
+    common(serve)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+
+    bench = sub.add_parser("bench", help="spustí enrich_data proti stand-in serveru")
+    common(bench)
+    bench.add_argument("--input", default=enrich_data.SILVER_INPUT)
+    bench.add_argument("--limit", type=int, default=0, help="iba prvých N záznamov")
+    bench.add_argument("--cache", help="existujúca cache (inak prázdna dočasná)")
+    bench.add_argument("--all-providers", action="store_true",
+                       help="zapne aj zdroje vyžadujúce kľúč (s fiktívnymi kľúčmi)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = StandinConfig(args.mode, args.latency, args.jitter, args.error_rate,
+                           args.error_status, args.hit_rate, args.on_miss, args.seed)
+    cassette = Cassette(args.cassette)
+
+    try:
+        if args.command == "bench":
+            run_bench(args, config, cassette)
+        else:
+            server = StandinServer((args.host, args.port), config, cassette)
+            print(f"Stand-in server: {server.url} (režim {config.mode}); "
+                  f"ENRICH_PROVIDER_BASE={server.url}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+    finally:
+        if config.mode == "record":
+            cassette.save()
+
+
+if __name__ == "__main__":
+    main()
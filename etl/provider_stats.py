@@ -0,0 +1,150 @@
+"""
+Adaptívne poradie zdrojov pri obohacovaní.
+
+Pre každý zdroj sa počíta, ako často vyplní jednotlivé polia (keď chýbali)
+a koľko trvá jedno volanie (vrátane čakania na rate limit). Pred každým
+ďalším volaním sa vyberie zdroj s najlepším pomerom
+  očakávaný počet vyplnených chýbajúcich polí / priemerná latencia.
+Zdroje, ktoré dané pole nevedia vrátiť (Spotify nemá žáner) alebo nemajú
+kľúč, sa nevolajú vôbec; zdroje, ktoré po MIN_CALLS volaniach chýbajúce
+polia takmer nikdy nevyplnia, sa preskakujú. Každé PROBE_EVERY-té preskočenie
+sa zdroj predsa zavolá; ak skúšobné volanie niečo vyplní, štatistiky zdroja sa
+vynulujú a zdroj dostane znova MIN_CALLS volaní. Volania s prechodnou chybou
+(výpadok, 429, 5xx) sa do úspešnosti nerátajú.
+"""
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Minimálny počet volaní, kým sa zdroj smie preskočiť kvôli nízkej úspešnosti
+MIN_CALLS = 30
+# Očakávaný počet vyplnených polí, pod ktorým sa zdroj preskočí
+SKIP_BELOW = 0.02
+# Po koľkých preskočeniach sa zdroj skúšobne zavolá
+PROBE_EVERY = 50
+# Apriórna latencia (s), kým o zdroji nič nevieme
+PRIOR_LATENCY = 1.0
+
+Provider = Callable[[str, List[str]], Optional[Dict[str, Optional[Any]]]]
+
+
+class ProviderStats:
+    __slots__ = ("name", "fields", "calls", "latency_total", "asked", "filled", "skipped", "since_probe",
+                 "failures")
+
+    def __init__(self, name: str, fields: Iterable[str]):
+        self.name = name
+        self.fields = frozenset(fields)
+        self.skipped = 0
+        self.since_probe = 0
+        self.failures = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Zabudne úspešnosť aj latenciu (počty preskočení a chýb ostanú)."""
+        self.calls = 0
+        self.latency_total = 0.0
+        self.asked: Dict[str, int] = {f: 0 for f in self.fields}
+        self.filled: Dict[str, int] = {f: 0 for f in self.fields}
+
+    def fill_rate(self, field: str) -> float:
+        """Laplaceov odhad pravdepodobnosti, že zdroj pole vyplní."""
+        if field not in self.fields:
+            return 0.0
+        return (self.filled[field] + 1) / (self.asked[field] + 2)
+
+    def expected_fills(self, missing: Set[str]) -> float:
+        return sum(self.fill_rate(f) for f in missing)
+
+    def avg_latency(self) -> float:
+        if not self.calls:
+            return PRIOR_LATENCY
+        return max(self.latency_total / self.calls, 1e-3)
+
+    def score(self, missing: Set[str]) -> float:
+        return self.expected_fills(missing) / self.avg_latency()
+
+    def hopeless(self, missing: Set[str]) -> bool:
+        """Zdroj po MIN_CALLS volaniach chýbajúce polia takmer nikdy nevyplní."""
+        return self.calls >= MIN_CALLS and self.expected_fills(missing) < SKIP_BELOW
+
+
+class ProviderPlanner:
+    """Vyberá poradie zdrojov podľa nazbieraných štatistík (bezpečné pre viac vlákien)."""
+
+    def __init__(self, providers: List[Tuple[str, Provider, Iterable[str]]],
+                 enabled: Callable[[str], bool] = lambda name: True):
+        self.providers = {name: fn for name, fn, _ in providers}
+        self.order = [name for name, _, _ in providers]  # pri zhode rozhoduje pôvodné poradie
+        self.stats = {name: ProviderStats(name, fields) for name, _, fields in providers}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    def next_provider(self, missing: Set[str], tried: Set[str],
+                      skipped: Optional[Set[str]] = None) -> Optional[Tuple[str, Provider]]:
+        """
+        Najlepší ešte nevyskúšaný zdroj pre chýbajúce polia, alebo None.
+        Zdroje preskočené kvôli nízkej úspešnosti sa pridajú do `skipped`;
+        na skúšobné volanie (každé PROBE_EVERY-té) sa vyberie preskakovaný zdroj.
+        """
+        best = None
+        best_score = 0.0
+        with self._lock:
+            for name in self.order:
+                if name in tried or not self.enabled(name):
+                    continue
+                st = self.stats[name]
+                useful = missing & st.fields
+                if not useful:
+                    continue
+                if st.hopeless(useful):
+                    st.since_probe += 1
+                    if st.since_probe >= PROBE_EVERY:
+                        st.since_probe = 0
+                        best = name
+                        break
+                    st.skipped += 1
+                    if skipped is not None:
+                        skipped.add(name)
+                    continue
+                score = st.score(useful)
+                if score > best_score:
+                    best, best_score = name, score
+        if best is None:
+            return None
+        return best, self.providers[best]
+
+    def record(self, name: str, missing: Set[str],
+               result: Optional[Dict[str, Optional[Any]]], latency: float, failed: bool = False) -> None:
+        """
+        Výsledok volania. Prechodná chyba (`failed`) sa iba zaráta – výpadok
+        nehovorí nič o tom, či zdroj polia vie vyplniť.
+        """
+        with self._lock:
+            st = self.stats[name]
+            if failed:
+                st.failures += 1
+                return
+            useful = missing & st.fields
+            if st.hopeless(useful) and result and any(result.get(f) is not None for f in useful):
+                st.reset()  # skúšobné volanie uspelo
+            st.calls += 1
+            st.latency_total += latency
+            for f in missing & st.fields:
+                st.asked[f] += 1
+                if result and result.get(f) is not None:
+                    st.filled[f] += 1
+
+    def report(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for name in self.order:
+                st = self.stats[name]
+                rates = ", ".join(
+                    f"{f} {st.filled[f]}/{st.asked[f]}" for f in sorted(st.fields)
+                )
+                state = "" if self.enabled(name) else " (vypnutý)"
+                lines.append(
+                    f"{name}{state}: {st.calls} volaní, priem. {st.avg_latency():.2f}s, "
+                    f"vyplnené {rates}, preskočené {st.skipped}x, chyby {st.failures}"
+                )
+        return lines
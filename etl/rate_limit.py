@@ -0,0 +1,36 @@
+"""
+Token-bucket limity požiadaviek pre externé API.
+
+Každý zdroj (MusicBrainz, Spotify, ...) má vlastný bucket, takže pri
+paralelnom obohacovaní je priepustnosť obmedzená kvótou zdroja a nie
+sériovou latenciou. acquire() si token "rezervuje" pod zámkom a čaká mimo
+neho, takže vlákna sa nezablokujú navzájom dlhšie, než je nutné.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """`rate` tokenov za sekundu, najviac `capacity` naraz (burst)."""
+        if rate <= 0:
+            raise ValueError("rate musí byť kladný")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0  # celkový čas čakania (pre štatistiky)
+        self.acquired = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            self.acquired += 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            time.sleep(wait)
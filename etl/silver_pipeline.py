@@ -0,0 +1,111 @@
+"""
+Spojená normalizácia obohatených silver skladieb v jednom prechode.
+
+Namiesto samostatných skriptov, ktoré každý načíta celý JSON, zmení jedno
+pole a zapíše novú úplnú kópiu (duration_to_s -> genre_mapper), sa záznamy
+čítajú postupne, prejdú reťazcom transformov a hneď sa zapíšu: jedno čítanie,
+jeden zápis, v pamäti vždy iba jeden záznam.
+
+Transform je funkcia (row, stats) -> row | None; None záznam vyradí.
+Vstavané transformy sú v TRANSFORMS, ďalšie sa dajú pripojiť ako
+'modul:funkcia' (--plugin).
+
+Použitie:
+  python silver_pipeline.py [--input FILE] [--output FILE]
+                            [--steps duration_s,genre] [--plugin modul:funkcia ...]
+"""
+import argparse
+import importlib
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import duration_to_s
+import genre_mapper
+from json_stream import JsonArrayWriter, iter_json_array
+
+INPUT_FILE = str(duration_to_s.INPUT_PATH)
+OUTPUT_FILE = str(genre_mapper.OUTPUT_PATH)
+
+Transform = Callable[[Dict[str, Any], Counter], Optional[Dict[str, Any]]]
+
+# Vstavané kroky v predvolenom poradí
+TRANSFORMS: Dict[str, Transform] = {
+    "duration_s": duration_to_s.duration_to_seconds,
+    "genre": genre_mapper.map_genre,
+}
+DEFAULT_STEPS = ("duration_s", "genre")
+
+
+def load_plugin(spec: str) -> Tuple[str, Transform]:
+    """'modul:funkcia' -> (názov kroku, funkcia)."""
+    module_name, sep, func_name = spec.partition(":")
+    if not sep or not module_name or not func_name:
+        raise SystemExit(f"Neplatný plugin '{spec}', očakáva sa modul:funkcia")
+    func = getattr(importlib.import_module(module_name), func_name, None)
+    if not callable(func):
+        raise SystemExit(f"Plugin '{spec}' nie je funkcia")
+    return spec, func
+
+
+def resolve_steps(names: Iterable[str], plugins: Iterable[str] = ()) -> List[Tuple[str, Transform]]:
+    steps = []
+    for name in names:
+        if name not in TRANSFORMS:
+            raise SystemExit(f"Neznámy krok '{name}' (dostupné: {', '.join(TRANSFORMS)})")
+        steps.append((name, TRANSFORMS[name]))
+    steps.extend(load_plugin(spec) for spec in plugins)
+    return steps
+
+
+def apply_steps(rows: Iterable[Dict[str, Any]],
+                steps: Sequence[Tuple[str, Transform]],
+                stats: Counter) -> Iterator[Dict[str, Any]]:
+    """Postupne aplikuje kroky na každý záznam; vyradené záznamy sa započítajú do stats."""
+    for row in rows:
+        stats["rows_in"] += 1
+        for name, transform in steps:
+            row = transform(row, stats)
+            if row is None:
+                stats[f"dropped_{name}"] += 1
+                break
+        else:
+            stats["rows_out"] += 1
+            yield row
+
+
+def run_pipeline(input_path: str, output_path: str,
+                 steps: Sequence[Tuple[str, Transform]]) -> Counter:
+    stats: Counter = Counter()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with JsonArrayWriter(output_path) as out:
+        for row in apply_steps(iter_json_array(input_path), steps, stats):
+            out.write(row)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalizácia obohatených silver skladieb v jednom prechode.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--steps", default=",".join(DEFAULT_STEPS),
+                        help=f"vstavané kroky v poradí (dostupné: {', '.join(TRANSFORMS)})")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODUL:FUNKCIA",
+                        help="ďalší transform (row, stats) -> row|None, spustí sa po vstavaných krokoch")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.steps.split(",") if n.strip()]
+    steps = resolve_steps(names, args.plugin)
+
+    start = time.time()
+    stats = run_pipeline(args.input, args.output, steps)
+
+    print(f"OK: {args.output} ({time.time() - start:.1f}s)")
+    print(f"Kroky: {' -> '.join(name for name, _ in steps) or '(žiadne)'}")
+    for key, count in sorted(stats.items()):
+        print(f"  {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Kanonická identita skladby.
+
+Tá istá skladba prichádza z rôznych rádií v rôznych tvaroch:
+  'Martin Garrix & Lauv' vs ['Martin Garrix', 'Lauv'], rozdiely vo veľkosti
+  písmen a diakritike, 'Coldplay Ft. Little Simz', 'Title (Radio Edit)',
+  'Title (feat. X)' ...
+identity_key() z nich spraví jeden kľúč (normalizovaný názov + zoradená množina
+autorov). SongIndex navyše zlúči kľúče, ktoré sa líšia len drobne (preklep
+v názve, skrátené meno autora), s už známou identitou – ešte pred volaním API.
+Iný počet autorov zlúčenie nepripustí: remix alebo spolupráca ('Kygo & Tina
+Turner') je samostatná skladba s vlastnou dĺžkou a rokom vydania.
+Kľúč sa používa v cache obohatenia aj ako kľúč dimenzie 'song' v create_sql.
+"""
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+# hosťujúci autor v názve alebo v mene autora
+_FEAT_RE = re.compile(r"\s*[\(\[]?\s*\b(?:feat\.?|ft\.?|featuring)\s+(.+?)\s*[\)\]]?\s*$", re.IGNORECASE)
+# oddeľovače viacerých autorov v jednom reťazci
+_ARTIST_SPLIT_RE = re.compile(r"\s*(?:,|&|;|\s+x\s+|\s+vs\.?\s+)\s*", re.IGNORECASE)
+# značky verzie, ktoré nemenia identitu skladby
+_VERSION_WORDS = r"(?:radio|single|album|clean|explicit|original)?\s*(?:edit|version|mix)|remaster(?:ed)?(?:\s+\d{4})?|\d{4}\s+remaster(?:ed)?"
+_VERSION_RE = re.compile(
+    rf"\s*(?:[\(\[]\s*(?:{_VERSION_WORDS})\s*[\)\]]|-\s+(?:{_VERSION_WORDS})\s*$)",
+    re.IGNORECASE,
+)
+_APOSTROPHE_RE = re.compile(r"['’`´]")
+_NON_WORD_RE = re.compile(r"[\W_]+")  # aj '_' ('Malvína_15' -> 'malvina 15')
+# čísla a rímske číslice v názve odlišujú samostatné skladby ('Spomienka 2', 'Connections II')
+_NUMBERING = {"i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x"}
+
+# minimálna podobnosť názvov pre zlúčenie s existujúcou identitou
+TITLE_SIMILARITY = 0.88
+# kratšie názvy sa porovnávajú iba presne ('Lava' vs 'Hlava')
+MIN_FUZZY_LENGTH = 8
+
+SEP = "\x1f"
+
+
+def fold(text: str) -> str:
+    """Malé písmená, bez diakritiky, iba písmená/číslice oddelené medzerou."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _APOSTROPHE_RE.sub("", text)
+    return " ".join(_NON_WORD_RE.sub(" ", text.lower()).split())
+
+
+def split_title(title: str) -> Tuple[str, List[str]]:
+    """Názov bez značiek verzie a hosťujúci autori uvedení v názve."""
+    title = str(title or "")
+    featured: List[str] = []
+    m = _FEAT_RE.search(title)
+    if m:
+        featured = [a for a in _ARTIST_SPLIT_RE.split(m.group(1)) if a.strip()]
+        title = title[:m.start()]
+    title = _VERSION_RE.sub("", title)
+    return fold(title), featured
+
+
+def split_artists(artists: Union[str, Iterable[str], None]) -> List[str]:
+    """Jednotlivé mená autorov z reťazca alebo zoznamu (vrátane 'feat.' častí)."""
+    if artists is None:
+        return []
+    items = [artists] if isinstance(artists, str) else list(artists)
+    names: List[str] = []
+    for item in items:
+        item = str(item)
+        m = _FEAT_RE.search(item)
+        if m:
+            names.extend(_ARTIST_SPLIT_RE.split(m.group(1)))
+            item = item[:m.start()]
+        names.extend(_ARTIST_SPLIT_RE.split(item))
+    return [n for n in names if n.strip()]
+
+
+def fold_artist(name: str) -> str:
+    """Kanonické meno autora; 'The Cranberries' aj 'Cranberries, The' -> 'cranberries'."""
+    name = fold(name)
+    if name.startswith("the "):
+        name = name[4:]
+    return "" if name == "the" else name
+
+
+def canonical(title: str, artists: Union[str, Iterable[str], None]) -> Tuple[str, FrozenSet[str]]:
+    """(kanonický názov, množina kanonických mien autorov)"""
+    title_c, featured = split_title(title)
+    names = {fold_artist(a) for a in split_artists(artists) + featured}
+    names.discard("")
+    return title_c, frozenset(names)
+
+
+def make_key(title_c: str, artist_set: FrozenSet[str]) -> str:
+    return title_c + SEP + "|".join(sorted(artist_set))
+
+
+def identity_key(title: str, artists: Union[str, Iterable[str], None]) -> str:
+    """Presná kanonická identita (bez fuzzy zlučovania)."""
+    return make_key(*canonical(title, artists))
+
+
+def parse_key(key: str) -> Tuple[str, FrozenSet[str]]:
+    title_c, _, names = key.partition(SEP)
+    return title_c, frozenset(n for n in names.split("|") if n)
+
+
+def _name_match(name: str, others: FrozenSet[str]) -> bool:
+    padded = f" {name} "
+    return any(padded in f" {other} " or f" {other} " in padded for other in others)
+
+
+def _artists_match(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    """Rovnaké množiny autorov, prípadne s menami, z ktorých jedno celými slovami obsahuje druhé ('beyonce knowles')."""
+    if a == b:
+        return True
+    if len(a) != len(b) or not a:
+        return False
+    return all(_name_match(n, b) for n in a) and all(_name_match(n, a) for n in b)
+
+
+def _numbering(title_c: str) -> List[str]:
+    return [t for t in title_c.split() if t.isdigit() or t in _NUMBERING]
+
+
+class SongIndex:
+    """
+    Index známych identít s podobnostným vyhľadávaním.
+    Kandidáti sa hľadajú cez bloky podľa mien autorov, takže porovnanie
+    názvov beží iba proti skladbám rovnakého autora.
+    """
+
+    def __init__(self, known_keys: Iterable[str] = ()):
+        self._aliases: Dict[str, str] = {}          # presný kľúč -> identita
+        self._by_artist: Dict[str, Set[str]] = {}   # meno autora -> identity
+        self._lock = threading.Lock()
+        self.fuzzy_matches = 0
+        for key in known_keys:
+            self._add(key, parse_key(key))
+
+    def __len__(self) -> int:
+        return len(set(self._aliases.values()))
+
+    def _add(self, key: str, parts: Tuple[str, FrozenSet[str]]) -> None:
+        self._aliases[key] = key
+        for name in parts[1]:
+            self._by_artist.setdefault(name, set()).add(key)
+
+    def _find_similar(self, title_c: str, artist_set: FrozenSet[str]) -> Optional[str]:
+        candidates: Set[str] = set()
+        for name in artist_set:
+            candidates |= self._by_artist.get(name, set())
+
+        best, best_ratio = None, TITLE_SIMILARITY
+        numbering = _numbering(title_c)
+        fuzzy = len(title_c) >= MIN_FUZZY_LENGTH
+        for cand in sorted(candidates):  # pri rovnakej podobnosti vyhrá deterministicky ten istý
+            cand_title, cand_artists = parse_key(cand)
+            if not _artists_match(artist_set, cand_artists):
+                continue
+            if cand_title == title_c:
+                return cand
+            if not fuzzy or _numbering(cand_title) != numbering:
+                continue
+            ratio = SequenceMatcher(None, title_c, cand_title).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = cand, ratio
+        return best
+
+    def resolve(self, title: str, artists: Union[str, Iterable[str], None]) -> str:
+        """Identita skladby; nové varianty sa zlúčia s podobnou známou identitou alebo sa pridajú."""
+        parts = canonical(title, artists)
+        key = make_key(*parts)
+        with self._lock:
+            known = self._aliases.get(key)
+            if known is not None:
+                return known
+            similar = self._find_similar(*parts)
+            if similar is not None:
+                self._aliases[key] = similar
+                self.fuzzy_matches += 1
+                return similar
+            self._add(key, parts)
+            return key
+
+    def aliases(self) -> Dict[str, str]:
+        """Varianty zlúčené s inou identitou (variant -> identita)."""
+        with self._lock:
+            return {k: v for k, v in self._aliases.items() if k != v}
@@ -0,0 +1,86 @@
+"""
+Testy delta režimu create_sql (bulk_rows s LoadState).
+
+Spustenie z priečinka etl:
+  python -m unittest test_create_sql
+"""
+import unittest
+
+import create_sql
+
+
+def song(session: str, time: str, title: str = "Song") -> dict:
+    return {"radio": "Rock", "title": title, "artists": ["Artist"], "genre": "rock",
+            "date": "01.12.2025", "time": time, "song_session_id": session}
+
+
+def measurement(session: str, recorded_at: str, listeners: int = 100) -> dict:
+    return {"song_session_id": session, "recorded_at": f"01.12.2025 {recorded_at}", "listeners": listeners}
+
+
+def rows(table: str, out: list) -> list:
+    return [row for t, row in out if t == table]
+
+
+class BulkRowsTest(unittest.TestCase):
+    def test_duplicate_measurements_are_loaded_once(self):
+        out = list(create_sql.bulk_rows(
+            [song("s1", "10:00:00"), song("s2", "10:03:00")],
+            [measurement("s1", "10:00:30"), measurement("s1", "10:00:30"), measurement("s1", "10:01:00"),
+             measurement("s2", "10:00:30")],
+        ))
+        measured = [(row[2], row[0]) for row in rows("listener_measurement", out)]
+        self.assertEqual(measured, [(1, "2025-12-01 10:00:30"), (1, "2025-12-01 10:01:00"),
+                                    (2, "2025-12-01 10:00:30")])
+
+
+class DeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.state = create_sql.LoadState()
+        first_songs = [song("s1", "10:00:00"), song("s2", "12:00:00")]
+        first_listeners = [measurement("s1", "10:00:30"), measurement("s2", "12:00:30")]
+        list(create_sql.bulk_rows(first_songs, first_listeners, self.state))
+
+    def delta(self, songs: list, listeners: list) -> list:
+        return list(create_sql.bulk_rows(songs, listeners, self.state))
+
+    def test_late_session_keeps_its_measurements(self):
+        # s3 začala pred vodoznakom (v okne DELTA_LATE_SECONDS) a jej meranie je pred vodoznakom recorded_at
+        out = self.delta(
+            [song("s1", "10:00:00"), song("s2", "12:00:00"), song("s3", "11:00:00"), song("s4", "13:00:00")],
+            [measurement("s1", "10:00:30"), measurement("s2", "12:00:30"),
+             measurement("s3", "11:00:30"), measurement("s4", "13:00:30")],
+        )
+        sessions = {row[1]: row[0] for row in rows("song_session", out)}
+        self.assertEqual(set(sessions), {"s3", "s4"})
+        measured = sorted((row[2], row[0]) for row in rows("listener_measurement", out))
+        self.assertEqual(measured, sorted([(sessions["s3"], "2025-12-01 11:00:30"),
+                                           (sessions["s4"], "2025-12-01 13:00:30")]))
+
+    def test_known_session_measurements_are_not_repeated(self):
+        out = self.delta([], [measurement("s2", "12:00:30"), measurement("s2", "12:01:30")])
+        self.assertEqual([row[0] for row in rows("listener_measurement", out)], ["2025-12-01 12:01:30"])
+
+    def test_known_session_late_measurement_is_loaded(self):
+        # s1 má meranie do 10:00:30, spoločný vodoznak je už 12:00:30 (s2)
+        out = self.delta([], [measurement("s1", "10:00:30"), measurement("s1", "10:01:00"),
+                              measurement("s2", "12:01:00")])
+        measured = [(row[2], row[0]) for row in rows("listener_measurement", out)]
+        self.assertEqual(measured, [(1, "2025-12-01 10:01:00"), (2, "2025-12-01 12:01:00")])
+
+    def test_state_without_session_watermark_uses_common_one(self):
+        for session in self.state.sessions.values():
+            del session[2:]
+        out = self.delta([], [measurement("s1", "10:01:00"), measurement("s2", "12:01:00")])
+        self.assertEqual([row[0] for row in rows("listener_measurement", out)], ["2025-12-01 12:01:00"])
+
+    def test_watermark_advances(self):
+        self.delta([song("s3", "11:00:00")], [measurement("s3", "11:00:30")])
+        self.assertEqual(create_sql.dt_to_mysql(self.state.last_played_at), "2025-12-01 12:00:00")
+        self.assertEqual(create_sql.dt_to_mysql(self.state.last_recorded_at), "2025-12-01 12:00:30")
+        out = self.delta([song("s3", "11:00:00")], [measurement("s3", "11:00:30")])
+        self.assertEqual(out, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Spoločné dekódovanie časových údajov pre ETL skripty.
+
+Bronzové dáta obsahujú iba niekoľko pevných formátov:
+  '2025-12-08T00:59:58.670285+01:00'   (recorded_at, ISO s offsetom)
+  '2025-12-08 00:59:31' / '2025-11-03T18:31:16'
+  '02.11.2025 22:32:47' / '07.11.2025'
+  '2025-11-07'
+  '06:02' / '06:02:15'
+Namiesto skúšania strptime formátov jeden po druhom sa hodnoty čítajú
+z pevných pozícií. Dátumová časť sa opakuje pri tisíckach záznamov,
+preto je memoizovaná zvlášť.
+
+Epoch hodnoty sú sekundy od 1.1.1970 v lokálnom (nástennom) čase rádia –
+offset sa ignoruje rovnako, ako ho doteraz ignoroval výstup DD.MM.YYYY HH:MM:SS.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# (rok, mesiac, deň, hodina, minúta, sekunda)
+DateTimeParts = Tuple[int, int, int, int, int, int]
+DateParts = Tuple[int, int, int]
+TimeParts = Tuple[int, int, int]
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# memo pre dátumovú časť (prvých 10 znakov) -> (y, m, d) alebo None
+_DATE_MEMO: Dict[str, Optional[DateParts]] = {}
+
+
+# --------- KALENDÁR ---------
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def _valid_date(year: int, month: int, day: int) -> bool:
+    if year < 1 or not 1 <= month <= 12 or day < 1:
+        return False
+    if month == 2 and _is_leap(year):
+        return day <= 29
+    return day <= _DAYS_IN_MONTH[month - 1]
+
+
+def days_from_civil(year: int, month: int, day: int) -> int:
+    """Počet dní od 1970-01-01 (Howard Hinnant, days_from_civil)."""
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def civil_from_days(days: int) -> DateParts:
+    """Inverzia k days_from_civil."""
+    days += 719468
+    era = days // 146097
+    doe = days - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + (3 if mp < 10 else -9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+
+# --------- DEKÓDOVANIE ---------
+
+def _decode_date_prefix(prefix: str) -> Optional[DateParts]:
+    """'YYYY-MM-DD' alebo 'DD.MM.YYYY' (presne 10 znakov)."""
+    try:
+        if prefix[4] == "-" and prefix[7] == "-":
+            year, month, day = int(prefix[0:4]), int(prefix[5:7]), int(prefix[8:10])
+        elif prefix[2] == "." and prefix[5] == ".":
+            day, month, year = int(prefix[0:2]), int(prefix[3:5]), int(prefix[6:10])
+        else:
+            return None
+    except (ValueError, IndexError):
+        return None
+    if not _valid_date(year, month, day):
+        return None
+    return year, month, day
+
+
+def decode_date(value: str) -> Optional[DateParts]:
+    """Dátumová časť hodnoty (ďalšie znaky za 10. pozíciou sa ignorujú)."""
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    prefix = value[:10]
+    try:
+        return _DATE_MEMO[prefix]
+    except KeyError:
+        parts = _DATE_MEMO[prefix] = _decode_date_prefix(prefix)
+        return parts
+
+
+def decode_time(value: str) -> Optional[TimeParts]:
+    """'HH:MM' alebo 'HH:MM:SS' (prípadné zlomky sekúnd a offset sa ignorujú)."""
+    if not isinstance(value, str) or len(value) < 5 or value[2] != ":":
+        return None
+    try:
+        hour, minute = int(value[0:2]), int(value[3:5])
+        second = 0
+        if len(value) >= 8 and value[5] == ":":
+            second = int(value[6:8])
+    except ValueError:
+        return None
+    if hour > 23 or minute > 59 or second > 59 or hour < 0 or minute < 0 or second < 0:
+        return None
+    return hour, minute, second
+
+
+@lru_cache(maxsize=65536)
+def decode(value: str) -> Optional[DateTimeParts]:
+    """
+    Dátum s voliteľným časom ('T' alebo medzera ako oddeľovač).
+    Vráti None pre neznámy formát – volajúci si vtedy môže zvoliť pomalú cestu.
+    """
+    date = decode_date(value)
+    if date is None:
+        return None
+    if len(value) == 10:
+        return date + (0, 0, 0)
+    if value[10] not in "T ":
+        return None
+    time = decode_time(value[11:])
+    if time is None:
+        return None
+    return date + time
+
+
+# --------- EPOCH A FORMÁTOVANIE ---------
+
+def parts_to_epoch(parts: DateTimeParts) -> int:
+    year, month, day, hour, minute, second = parts
+    return days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+
+
+def parse_epoch(value: str) -> Optional[int]:
+    """Hodnota s dátumom (a voliteľne časom) -> epoch sekundy, inak None."""
+    parts = decode(value)
+    return parts_to_epoch(parts) if parts is not None else None
+
+
+def combine_epoch(date_value: str, time_value: str) -> Optional[int]:
+    """Samostatný dátum a čas (napr. silver 'date' + 'time') -> epoch sekundy."""
+    date = decode_date(date_value)
+    if date is None or len(date_value) != 10:
+        return None
+    time = decode_time(time_value)
+    if time is None:
+        return None
+    return parts_to_epoch(date + time)
+
+
+def epoch_to_parts(epoch: int) -> DateTimeParts:
+    days, rem = divmod(epoch, 86400)
+    hour, rem = divmod(rem, 3600)
+    minute, second = divmod(rem, 60)
+    return civil_from_days(days) + (hour, minute, second)
+
+
+def format_date(parts) -> str:
+    """DD.MM.YYYY"""
+    return f"{parts[2]:02d}.{parts[1]:02d}.{parts[0]:04d}"
+
+
+def format_datetime(parts: DateTimeParts) -> str:
+    """DD.MM.YYYY HH:MM:SS"""
+    return (f"{parts[2]:02d}.{parts[1]:02d}.{parts[0]:04d} "
+            f"{parts[3]:02d}:{parts[4]:02d}:{parts[5]:02d}")
+
+
+def format_mysql(epoch: int) -> str:
+    """YYYY-MM-DD HH:MM:SS pre SQL výstup."""
+    y, mo, d, h, mi, s = epoch_to_parts(epoch)
+    return f"{y:04d}-{mo:02d}-{d:02d} {h:02d}:{mi:02d}:{s:02d}"
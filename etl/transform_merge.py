@@ -1,16 +1,38 @@
+import argparse
 import os
 import json
+import re
+from collections import Counter
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import timestamps as ts
+from bronze_layout import (BRONZE_DIR, KIND_SONG, NO_FILTER, SILVER_ROOT, BronzeFilter, add_filter_args,
+                           filter_from_args, iter_bronze_files, merge_pruned)
 
 # --------- KONFIGURÁCIA CESTY ---------
-# Koreňový adresár s bronzovými dátami (tam, kde je priečinok "bronze")
-ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-BRONZE_DIR = os.path.join(ROOT_DIR, "bronze")
-OUTPUT_ROOT = os.path.join(ROOT_DIR, "silver_transform_merged0")
+# Bronzové dáta aj výstup sa hľadajú podľa bronze_layout (RADIO_ETL_ROOT)
+OUTPUT_ROOT = os.path.join(SILVER_ROOT, "silver_transform_merged0")
 OUTPUT_FILE = os.path.join(OUTPUT_ROOT, "silver_merged.json")
 
 
+# Poradie kľúčov, v ktorom sa hľadajú jednotlivé polia (platí pre generickú
+# aj kompilovanú cestu, preto sú na jednom mieste).
+TITLE_KEYS = ("title", "song", "musicTitle")
+ARTISTS_KEYS = ("artists", "musicAuthor", "artist")
+TIME_KEYS = ("start_time", "startTime", "play_time", "time")
+DATE_KEYS = ("start_time", "recorded_at", "play_date", "date", "last_update")
+SESSION_KEYS = ("song_session_id",)
+ISRC_KEYS = ("isrc",)
+
+# Polia z vonkajšej úrovne, ktoré sa doplnia do vnoreného objektu 'song'
+PAYLOAD_FILL_KEYS = ("start_time", "recorded_at", "play_date", "play_time",
+                     "time", "date", "last_update", "song_session_id", "isrc")
+
+# ISRC: krajina (2 písmená), registrant (3 znaky), rok (2 číslice), kód (5 číslic)
+ISRC_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{3}\d{7}$")
+
+
 # --------- POMOCNÉ FUNKCIE PRE NORMALIZÁCIU ---------
 
 def normalize_radio_name(radio_dir_name: str) -> str:
@@ -49,6 +71,11 @@ def extract_date(value: str) -> Optional[str]:
     if not isinstance(value, str):
         return None
 
+    # rýchla cesta: pevné pozície 'YYYY-MM-DD...' / 'DD.MM.YYYY...'
+    parts = ts.decode_date(value)
+    if parts is not None and (len(value) == 10 or value[10] in "T "):
+        return ts.format_date(parts)
+
     if "T" in value:
         value = value.split("T", 1)[0]
     elif " " in value:
@@ -78,7 +105,7 @@ def extract_date(value: str) -> Optional[str]:
 
 def normalize_title(record: Dict[str, Any]) -> Optional[str]:
     """Nájde názov skladby z viacerých možných kľúčov."""
-    for key in ["title", "song", "musicTitle"]:
+    for key in TITLE_KEYS:
         if key in record and isinstance(record[key], str):
             return record[key]
     return None
@@ -89,26 +116,31 @@ def normalize_artists(record: Dict[str, Any]) -> List[str]:
     Nájde autorov z kľúčov artists, musicAuthor, artist.
     Výstup je zoznam reťazcov.
     """
-    for key in ["artists", "musicAuthor", "artist"]:
+    for key in ARTISTS_KEYS:
         if key in record:
             val = record[key]
-            if isinstance(val, list):
-                return [str(a) for a in val]
-            elif isinstance(val, str):
-                if "," in val:
-                    return [a.strip() for a in val.split(",") if a.strip()]
-                if "&" in val:
-                    return [a.strip() for a in val.split("&") if a.strip()]
-                return [val.strip()]
+            if isinstance(val, (list, str)):
+                return split_artists(val)
     return []
 
 
+def split_artists(val: Any) -> List[str]:
+    """Zoznam autorov z hodnoty typu list alebo reťazca oddeleného ',' / '&'."""
+    if isinstance(val, list):
+        return [str(a) for a in val]
+    if "," in val:
+        return [a.strip() for a in val.split(",") if a.strip()]
+    if "&" in val:
+        return [a.strip() for a in val.split("&") if a.strip()]
+    return [val.strip()]
+
+
 def normalize_time(record: Dict[str, Any]) -> Optional[str]:
     """
     Získa čas z kľúčov: start_time, startTime, play_time, time.
     Pri start_time sa berie len časová časť.
     """
-    for key in ["start_time", "startTime", "play_time", "time"]:
+    for key in TIME_KEYS:
         if key in record:
             return extract_time(str(record[key]))
     return None
@@ -119,7 +151,7 @@ def normalize_date(record: Dict[str, Any]) -> Optional[str]:
     Získa dátum z kľúčov: start_time, recorded_at, play_date, date, last_update.
     Pri start_time / recorded_at / last_update sa berie len dátumová časť.
     """
-    for key in ["start_time", "recorded_at", "play_date", "date", "last_update"]:
+    for key in DATE_KEYS:
         if key in record:
             return extract_date(str(record[key]))
     return None
@@ -133,6 +165,21 @@ def get_song_session_id(record: Dict[str, Any]) -> Optional[str]:
     return str(val)
 
 
+def normalize_isrc(val: Any) -> Optional[str]:
+    """'gb-ahs-23-00345' / 'GBAHS2300345' -> 'GBAHS2300345'; neplatný kód -> None."""
+    if not isinstance(val, str):
+        return None
+    code = val.replace("-", "").replace(" ", "").upper()
+    return code if ISRC_RE.match(code) else None
+
+
+def get_isrc(record: Dict[str, Any]) -> Optional[str]:
+    for k in ISRC_KEYS:
+        if k in record:
+            return normalize_isrc(record[k])
+    return None
+
+
 def get_payload(rec: Dict[str, Any]) -> Dict[str, Any]:
     """
     Zjednotí tvar záznamu:
@@ -144,20 +191,202 @@ def get_payload(rec: Dict[str, Any]) -> Dict[str, Any]:
     else:
         inner = rec.copy()
 
-    for k in ["start_time", "recorded_at", "play_date", "play_time",
-              "time", "date", "last_update", "song_session_id"]:
+    for k in PAYLOAD_FILL_KEYS:
         if k in rec and k not in inner:
             inner[k] = rec[k]
 
     return inner
 
 
+# --------- KOMPILOVANÉ EXTRAKTORY PODĽA SCHÉMY ---------
+#
+# Všetky záznamy jedného rádia (a spravidla celého súboru) majú rovnaký tvar.
+# Namiesto toho, aby sa pre každý riadok znova kopíroval payload a prechádzali
+# zoznamy kľúčov, sa tvar rozpozná raz a pre každé pole sa zapamätá, odkiaľ
+# sa berie (vonkajšia úroveň alebo vnorený 'song') a pod akým kľúčom.
+
+# (z vnoreného 'song'?, kľúč)
+FieldSpec = Tuple[bool, str]
+SchemaSignature = Tuple[FrozenSet[str], Optional[FrozenSet[str]]]
+
+
+class CompiledSchema:
+    """Špecializovaný extraktor pre jednu kombináciu kľúčov záznamu."""
+
+    __slots__ = ("name", "outer_keys", "inner_keys",
+                 "title", "artists", "time", "date", "session", "isrc")
+
+    def __init__(self, signature: SchemaSignature, title: FieldSpec,
+                 artists: Optional[FieldSpec], time: FieldSpec, date: FieldSpec,
+                 session: Optional[FieldSpec], isrc: Optional[FieldSpec] = None):
+        self.outer_keys, self.inner_keys = signature
+        self.title = title
+        self.artists = artists
+        self.time = time
+        self.date = date
+        self.session = session
+        self.isrc = isrc
+        prefix = "song." if self.inner_keys is not None else ""
+        self.name = prefix + "/".join(
+            spec[1] if spec else "-" for spec in (title, artists, time, date)
+        )
+
+    def matches(self, rec: Dict[str, Any]) -> bool:
+        """Rýchla kontrola, či má záznam presne tie kľúče, pre ktoré bol extraktor zostavený."""
+        if rec.keys() != self.outer_keys:
+            return False
+        if self.inner_keys is None:
+            return True
+        inner = rec["song"]
+        return isinstance(inner, dict) and inner.keys() == self.inner_keys
+
+    def extract(self, rec: Dict[str, Any], radio_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Vráti normalizovaný záznam, None ak ho treba zahodiť,
+        alebo NotImplemented, ak hodnota nemá očakávaný typ (rieši generická cesta).
+        """
+        inner = rec["song"] if self.inner_keys is not None else rec
+
+        from_inner, key = self.title
+        title = (inner if from_inner else rec)[key]
+        if not isinstance(title, str):
+            return NotImplemented
+
+        artists: List[str] = []
+        if self.artists is not None:
+            from_inner, key = self.artists
+            val = (inner if from_inner else rec)[key]
+            if not isinstance(val, (list, str)):
+                return NotImplemented
+            artists = split_artists(val)
+
+        from_inner, key = self.time
+        time_val = extract_time(str((inner if from_inner else rec)[key]))
+        from_inner, key = self.date
+        date_val = extract_date(str((inner if from_inner else rec)[key]))
+
+        if not date_val and "recorded_at" in rec:
+            date_val = extract_date(str(rec["recorded_at"]))
+
+        if not title or not time_val or not date_val:
+            return None
+
+        normalized = {
+            "radio": radio_name,
+            "title": title,
+            "artists": artists,
+            "time": time_val,
+            "date": date_val,
+        }
+        if self.session is not None:
+            from_inner, key = self.session
+            val = (inner if from_inner else rec)[key]
+            if val is not None:
+                normalized["song_session_id"] = str(val)
+        if self.isrc is not None:
+            from_inner, key = self.isrc
+            isrc = normalize_isrc((inner if from_inner else rec)[key])
+            if isrc is not None:
+                normalized["isrc"] = isrc
+
+        return normalized
+
+
+def schema_signature(rec: Dict[str, Any]) -> SchemaSignature:
+    inner = rec.get("song")
+    return frozenset(rec), frozenset(inner) if isinstance(inner, dict) else None
+
+
+def compile_schema(rec: Dict[str, Any]) -> Optional[CompiledSchema]:
+    """
+    Zostaví extraktor podľa tvaru záznamu tak, aby dával rovnaký výsledok
+    ako get_payload + normalize_*. Ak sa tvar nedá jednoznačne zachytiť
+    (chýba názov, čas alebo dátum), vráti None a záznam ide generickou cestou.
+    """
+    nested = isinstance(rec.get("song"), dict)
+    inner = rec["song"] if nested else rec
+
+    def locate(keys) -> Optional[FieldSpec]:
+        for k in keys:
+            if k in inner:
+                return nested, k
+            if nested and k in PAYLOAD_FILL_KEYS and k in rec:
+                return False, k
+        return None
+
+    title = locate(TITLE_KEYS)
+    if title is None or not isinstance(inner[title[1]], str):
+        return None
+
+    artists = locate(ARTISTS_KEYS)
+    time_spec = locate(TIME_KEYS)
+    date_spec = locate(DATE_KEYS)
+    if time_spec is None or date_spec is None:
+        return None
+
+    return CompiledSchema(
+        schema_signature(rec),
+        title,
+        artists,
+        time_spec,
+        date_spec,
+        locate(SESSION_KEYS),
+        locate(ISRC_KEYS),
+    )
+
+
+# Cache extraktorov podľa podpisu kľúčov; None = neznámy tvar
+_SCHEMA_CACHE: Dict[SchemaSignature, Optional[CompiledSchema]] = {}
+
+
+def schema_for(rec: Dict[str, Any]) -> Optional[CompiledSchema]:
+    signature = schema_signature(rec)
+    if signature not in _SCHEMA_CACHE:
+        _SCHEMA_CACHE[signature] = compile_schema(rec)
+    return _SCHEMA_CACHE[signature]
+
+
 # --------- HLAVNÁ EXTRAKCIA ---------
 
-def process_json_file(file_path: str, radio_name: str) -> List[Dict[str, Any]]:
+def normalize_record_generic(rec: Dict[str, Any], radio_name: str) -> Optional[Dict[str, Any]]:
+    """Pôvodná (pomalšia) cesta pre záznamy, ktorých tvar nepoznáme."""
+    payload = get_payload(rec)
+
+    title = normalize_title(payload)
+    artists = normalize_artists(payload)
+    time_val = normalize_time(payload)
+    date_val = normalize_date(payload)
+    song_session_id = get_song_session_id(payload)
+    isrc = get_isrc(payload)
+
+    # fallback: ak sa dátum nenašiel v payload, skús recorded_at na vonkajšej úrovni
+    if not date_val and "recorded_at" in rec:
+        date_val = extract_date(str(rec["recorded_at"]))
+
+    if not title or not time_val or not date_val:
+        return None
+
+    normalized = {
+        "radio": radio_name,
+        "title": title,
+        "artists": artists,
+        "time": time_val,
+        "date": date_val,
+    }
+    if song_session_id is not None:
+        normalized["song_session_id"] = song_session_id
+    if isrc is not None:
+        normalized["isrc"] = isrc
+
+    return normalized
+
+
+def process_json_file(file_path: str, radio_name: str,
+                      stats: Optional[Counter] = None) -> List[Dict[str, Any]]:
     """
     Načíta jeden JSON súbor a vráti zoznam normalizovaných záznamov.
     Súbor môže obsahovať buď zoznam, alebo 1 objekt.
+    Do `stats` sa pripočíta, koľko záznamov išlo ktorým extraktorom.
     """
     with open(file_path, "r", encoding="utf-8") as f:
         try:
@@ -165,44 +394,45 @@ def process_json_file(file_path: str, radio_name: str) -> List[Dict[str, Any]]:
         except json.JSONDecodeError:
             return []
 
-    records: List[Dict[str, Any]] = []
     iterable = data if isinstance(data, list) else [data]
+    return [normalized for _, normalized in iter_normalized(iterable, radio_name, stats)]
 
-    for rec in iterable:
-        if not isinstance(rec, dict):
-            continue
 
-        payload = get_payload(rec)
-
-        title = normalize_title(payload)
-        artists = normalize_artists(payload)
-        time_val = normalize_time(payload)
-        date_val = normalize_date(payload)
-        song_session_id = get_song_session_id(payload)
+def iter_normalized(iterable: Iterable[Any], radio_name: str,
+                    stats: Optional[Counter] = None) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Dvojice (surový záznam, normalizovaný záznam) pre záznamy, ktoré sa podarilo
+    normalizovať. Do `stats` sa pripočíta, koľko záznamov išlo ktorým extraktorom.
+    """
+    if stats is None:
+        stats = Counter()
 
-        # fallback: ak sa dátum nenašiel v payload, skús recorded_at na vonkajšej úrovni
-        if not date_val and "recorded_at" in rec:
-            date_val = extract_date(str(rec["recorded_at"]))
+    schema: Optional[CompiledSchema] = None
 
-        if not title or not time_val or not date_val:
+    for rec in iterable:
+        if not isinstance(rec, dict):
             continue
 
-        normalized = {
-            "radio": radio_name,
-            "title": title,
-            "artists": artists,
-            "time": time_val,
-            "date": date_val,
-        }
-        if song_session_id is not None:
-            normalized["song_session_id"] = song_session_id
+        # tvar sa rieši znova iba vtedy, keď sa zmenia kľúče oproti predošlému záznamu
+        if schema is None or not schema.matches(rec):
+            schema = schema_for(rec)
 
-        records.append(normalized)
+        normalized = NotImplemented
+        if schema is not None:
+            normalized = schema.extract(rec, radio_name)
+        if normalized is NotImplemented:
+            stats["generic"] += 1
+            normalized = normalize_record_generic(rec, radio_name)
+        else:
+            stats[schema.name] += 1
 
-    return records
+        if normalized is not None:
+            yield rec, normalized
 
 
-def walk_bronze_and_collect() -> List[Dict[str, Any]]:
+def walk_bronze_and_collect(stats: Optional[Counter] = None,
+                            bronze_dir: str = BRONZE_DIR,
+                            prune: BronzeFilter = NO_FILTER) -> List[Dict[str, Any]]:
     """
     Prejde štruktúru:
       bronze /
@@ -211,35 +441,15 @@ def walk_bronze_and_collect() -> List[Dict[str, Any]]:
           song /
             DATE_DIR /
               *.json
-    a vráti zoznam všetkých normalizovaných záznamov.
+    a vráti zoznam všetkých normalizovaných záznamov (v rozsahu `prune`).
     """
-    all_records: List[Dict[str, Any]] = []
+    if stats is None:
+        stats = Counter()
 
-    if not os.path.isdir(BRONZE_DIR):
-        raise FileNotFoundError(f"Adresár {BRONZE_DIR} neexistuje")
-
-    for radio_dir_name in os.listdir(BRONZE_DIR):
-        radio_path = os.path.join(BRONZE_DIR, radio_dir_name)
-        if not os.path.isdir(radio_path):
-            continue
-
-        radio_name = normalize_radio_name(radio_dir_name)
-
-        song_root = os.path.join(radio_path, "song")
-        if not os.path.isdir(song_root):
-            continue
-
-        for date_dir_name in os.listdir(song_root):
-            date_dir_path = os.path.join(song_root, date_dir_name)
-            if not os.path.isdir(date_dir_path):
-                continue
-
-            for fname in os.listdir(date_dir_path):
-                if not fname.lower().endswith(".json"):
-                    continue
-                fpath = os.path.join(date_dir_path, fname)
-                records = process_json_file(fpath, radio_name)
-                all_records.extend(records)
+    all_records: List[Dict[str, Any]] = []
+    for bf in iter_bronze_files(bronze_dir, kinds=(KIND_SONG,), prune=prune):
+        records = process_json_file(bf.path, normalize_radio_name(bf.radio), stats)
+        all_records.extend(records)
 
     return all_records
 
@@ -251,18 +461,49 @@ def ensure_output_dir():
     os.makedirs(OUTPUT_ROOT, exist_ok=True)
 
 
-def save_merged_json(records: List[Dict[str, Any]]):
-    """Uloží všetky záznamy do bronze_transform_merged/bronze_merged.json."""
-    ensure_output_dir()
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+def song_record_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Kľúč prehratia pre merge_pruned: rádio + song_session_id, bez neho čas a názov."""
+    session = record.get("song_session_id")
+    if session:
+        return record.get("radio"), session
+    return record.get("radio"), record.get("date"), record.get("time"), record.get("title")
+
+
+def save_merged_json(records: List[Dict[str, Any]], output_file: str = OUTPUT_FILE):
+    """Uloží všetky záznamy do silver_transform_merged0/silver_merged.json."""
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
         json.dump(records, f, ensure_ascii=False, indent=2)
 
 
 # --------- MAIN ---------
 
+def print_schema_stats(stats: Counter):
+    """Vypíše, koľko záznamov spracoval ktorý extraktor (generic = neznámy tvar)."""
+    for name, count in stats.most_common():
+        print(f"  {name}: {count}")
+
+
 def main():
-    records = walk_bronze_and_collect()
-    save_merged_json(records)
+    parser = argparse.ArgumentParser(description="Normalizácia bronze/*/song -> silver")
+    parser.add_argument("--bronze", default=BRONZE_DIR, help="koreň bronzovej vrstvy")
+    parser.add_argument("--output", help="výstupný JSON iba so spracovaným rozsahom "
+                                         "(orezaný beh bez --output sa zlúči do úplného výstupu)")
+    add_filter_args(parser)
+    args = parser.parse_args()
+
+    prune = filter_from_args(args)
+    output_file = args.output or OUTPUT_FILE
+
+    stats: Counter = Counter()
+    records = walk_bronze_and_collect(stats, args.bronze, prune)
+    if prune.active and not args.output:
+        fresh = len(records)
+        records, replaced = merge_pruned(records, output_file, song_record_key)
+        print(f"Orezaný beh: {fresh} záznamov, {replaced} nahradených v úplnom výstupe")
+    save_merged_json(records, output_file)
+    print(f"Uložených záznamov: {len(records)} -> {output_file}")
+    print_schema_stats(stats)
 
 
 if __name__ == "__main__":